@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Benchmarks of the database and validation hot paths (see __main__)"""
+
+# Imports - standard library
+
+# Imports - 3rd party packages
+
+# Imports - local source
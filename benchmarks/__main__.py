@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Runs benchmarks and compares them to a baseline
+
+    python -m benchmarks run [-o results.json]
+    python -m benchmarks compare [benchmarks/baseline.json] [results.json]
+"""
+
+# Imports - standard library
+from typing import List, Optional
+from pathlib import Path
+import argparse
+import tempfile
+import json
+import sys
+
+# Imports - 3rd party packages
+
+# Imports - local source
+from .generate import ConfigParams
+from .bench import BENCHMARKS, DEFAULT_THRESHOLD, DEFAULT_REPEAT
+from .bench import run_benchmarks, compare
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse arguments of benchmark CLI"""
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks toolbox on synthetic configurations")
+    parser.add_argument('action',
+                        choices=('run', 'compare'),
+                        help='Runs benchmarks or compares them to baseline.')
+    parser.add_argument(
+        'files',
+        nargs='*',
+        help=
+        f'compare: baseline (default: {BASELINE.name}) and results (default: run now).'
+    )
+    parser.add_argument('-o',
+                        '--output',
+                        help='Writes results (json) to this file.')
+    parser.add_argument('-r',
+                        '--repeat',
+                        type=int,
+                        default=DEFAULT_REPEAT,
+                        help='Repetitions (median is kept). '
+                        f'Default: {DEFAULT_REPEAT}')
+    parser.add_argument('-b',
+                        '--bench',
+                        action='append',
+                        choices=list(BENCHMARKS),
+                        help='Runs only these benchmarks. Default: all')
+    parser.add_argument(
+        '-t',
+        '--threshold',
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help='Smallest relative slowdown reported as regression (larger '
+        f'if results are noisy). Default: {DEFAULT_THRESHOLD}')
+    defaults = ConfigParams()
+    parser.add_argument('--keys', type=int, default=defaults.keys,
+                        help='Leaves of the user namespace.')
+    parser.add_argument('--depth', type=int, default=defaults.depth,
+                        help='Nesting depth of the user namespace.')
+    parser.add_argument('--ref-density', type=float,
+                        default=defaults.ref_density,
+                        help='Fraction of values that are ${} references.')
+    parser.add_argument('--list-size', type=int, default=defaults.list_size,
+                        help='Length of list values.')
+    parser.add_argument('--tools', type=int, default=defaults.tools,
+                        help='Number of tools.')
+    parser.add_argument('--properties', type=int,
+                        default=defaults.properties,
+                        help='Properties per tool.')
+    parser.add_argument('--seed', type=int, default=defaults.seed,
+                        help='Seed of the generator.')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs benchmark CLI
+    :return Exit code (1 if compare found a regression)
+    """
+    args = parse_args(argv)
+    params = ConfigParams(args.keys, args.depth, args.ref_density,
+                          args.list_size, args.tools, args.properties,
+                          args.seed)
+    if args.action == 'compare' and len(args.files) > 1:
+        with open(args.files[1], 'r') as fp:
+            results = json.load(fp)
+    else:
+        with tempfile.TemporaryDirectory() as root:
+            results = run_benchmarks(params, Path(root), args.repeat,
+                                     args.bench)
+    if args.output:
+        with open(args.output, 'w') as fp:
+            json.dump(results, fp, indent=2)
+    if args.action == 'run':
+        print(f"{'calibration':20} {results['calibration'] * 1e3:10.2f} ms")
+        for name, r in results["results"].items():
+            print(f"{name:20} {r['ratio']:10.3f}x calibration "
+                  f"(noise {r['noise']:.1%})")
+        return 0
+    with open(args.files[0] if args.files else BASELINE, 'r') as fp:
+        baseline = json.load(fp)
+    lines = compare(baseline, results, args.threshold)
+    print("\n".join(lines))
+    return int(any(line.startswith("REGRESSION") for line in lines))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Benchmarks of the database and validation hot paths"""
+
+# Imports - standard library
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from contextlib import contextmanager
+from dataclasses import asdict
+from pathlib import Path
+import os
+import gc
+import copy
+import json
+import math
+import time
+import atexit
+import platform
+import importlib
+import functools
+import statistics
+
+# Imports - 3rd party packages
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams
+from toolbox.logger import LogLevel, LoggerParams
+from toolbox.dot_dict import DotDict
+from toolbox.database import Database
+from toolbox.utils import YamaleValidator, load_yaml
+from .generate import ConfigParams, Workspace, write_workspace
+
+HOME_DIR = Path(__file__).resolve().parents[1]
+# Smallest relative slowdown (vs. baseline) reported as regression
+DEFAULT_THRESHOLD = 0.25
+# Slowdowns within this many times the measured noise are no regressions
+NOISE_FACTOR = 3.0
+DEFAULT_REPEAT = 15
+# Minimum seconds of a repetition (fast benchmarks are run several times)
+MIN_TIME = 0.05
+
+
+class BenchmarkError(Exception):
+    """Error for results that cannot be compared"""
+    pass
+
+
+@contextmanager
+def toolbox_home() -> Iterator[None]:
+    """Sets TOOLBOX_HOME to this checkout (unless set) within the context"""
+    previous = os.environ.get("TOOLBOX_HOME")
+    os.environ.setdefault("TOOLBOX_HOME", str(HOME_DIR))
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("TOOLBOX_HOME", None)
+
+
+def clear_file_caches() -> None:
+    """Drops parsed configs and schemas so that they are parsed again"""
+    load_yaml.clear()
+    YamaleValidator.schemas.clear()
+    YamaleValidator.datas.clear()
+
+
+def make_toolbox(ws: Workspace) -> ToolBox:
+    """Creates toolbox for the job of the workspace (no cleanup on exit)
+    TOOLBOX_HOME must be set (see toolbox_home)
+    """
+    args = ToolBoxParams(build_dir=str(ws.root / "build"),
+                         symlink=None,
+                         config=ws.configs,
+                         out_fname=None,
+                         log_params=LoggerParams(LogLevel.ERROR),
+                         job=ws.job)
+    tb = ToolBox(args)
+    atexit.unregister(tb.exit)
+    return tb
+
+
+def bench_flatten(ws: Workspace) -> Callable[[], Any]:
+    """DotDict.flatten of the nested config"""
+    return DotDict(copy.deepcopy(ws.config)).flatten
+
+
+def bench_resolve(ws: Workspace) -> Callable[[], Any]:
+    """DotDict.resolve of the ${} references of the config"""
+    return DotDict(copy.deepcopy(ws.config)).resolve
+
+
+def bench_load_dict(ws: Workspace) -> Callable[[], Any]:
+    """Database.load_dict of the config into an empty database"""
+    db = Database("internal")
+    return lambda: db.load_dict(ws.config)
+
+
+def bench_get_db(ws: Workspace) -> Callable[[], Any]:
+    """Database.get_db of every leaf of the user namespace"""
+    db = Database("internal")
+    db.load_dict(ws.config)
+    return lambda: [db.get_db(f"user.{key}") for key in ws.leaf_keys]
+
+
+def bench_validate(ws: Workspace) -> Callable[[], Any]:
+    """YamaleValidator of the populated database against toolbox.yml"""
+    tb = make_toolbox(ws)
+    schema = str(HOME_DIR / "toolbox" / "schemas" / "toolbox.yml")
+    return lambda: YamaleValidator.validate_dict_with_file(tb._db, schema)
+
+
+def bench_check_db(ws: Workspace) -> Callable[[], Any]:
+    """Tool.check_db of every tool"""
+    tb = make_toolbox(ws)
+    tb.setup_environment()
+    tools = []
+    for name, tool in tb.get_db("internal.tools").items():
+        module = importlib.import_module(Path(tool["path"]).stem)
+        tools.append(getattr(module, name)(tb, tb.log))
+    return lambda: [tool.check_db() for tool in tools]
+
+
+def bench_toolbox(ws: Workspace) -> Callable[[], Any]:
+    """Construction of ToolBox (parsing, loading, resolving and validating
+    configs). Parsed files are dropped so that every call parses them.
+    """
+    clear_file_caches()
+    return lambda: make_toolbox(ws)
+
+
+def calibration() -> None:
+    """Fixed workload of the interpreter (dicts, strings, json, sorting)
+    that benchmarks are measured relative to, so that results of machines
+    and runs of different speed can be compared
+    """
+    data = {
+        f"key{i}": [f"value{j}" for j in range(i % 16)]
+        for i in range(2000)
+    }
+    flat = json.loads(json.dumps(data))
+    sorted(flat.items(), key=lambda kv: (len(kv[1]), kv[0]))
+
+
+# Benchmarks by name. Each returns the function to be timed (called once
+# per repetition so that every repetition gets fresh inputs)
+BENCHMARKS: Dict[str, Callable[[Workspace], Callable[[], Any]]] = {
+    "dot_dict_flatten": bench_flatten,
+    "dot_dict_resolve": bench_resolve,
+    "database_load_dict": bench_load_dict,
+    "database_get_db": bench_get_db,
+    "yamale_validate": bench_validate,
+    "tool_check_db": bench_check_db,
+    "toolbox_init": bench_toolbox,
+}
+# Benchmarks whose function can be timed repeatedly (does not consume its
+# inputs), so that setup runs once per repetition
+REUSABLE = {"database_get_db", "yamale_validate", "tool_check_db"}
+
+
+def measure(setup: Callable[[], Callable[[], Any]],
+            number: int,
+            reusable: bool = False) -> float:
+    """Returns mean seconds of number calls of functions returned by setup
+    (one per call unless reusable, setup is not timed). Garbage collection
+    is paused.
+    """
+    total = 0.0
+    gc.collect()
+    gc.disable()
+    try:
+        fn = setup() if reusable else None
+        for _ in range(number):
+            if not reusable:
+                fn = setup()
+            start = time.perf_counter()
+            fn()
+            total += time.perf_counter() - start
+    finally:
+        gc.enable()
+    return total / number
+
+
+def calls_per_repetition(setup: Callable[[], Callable[[], Any]],
+                         reusable: bool = False) -> int:
+    """Returns number of calls that take at least MIN_TIME"""
+    seconds = measure(setup, 1, reusable)
+    return max(1, math.ceil(MIN_TIME / max(seconds, 1e-9)))
+
+
+def run_benchmarks(params: ConfigParams,
+                   root: Path,
+                   repeat: int = DEFAULT_REPEAT,
+                   names: Optional[List[str]] = None) -> dict:
+    """Runs benchmarks on a configuration generated in root
+    Every repetition of a benchmark is divided by a repetition of the
+    calibration run right after it, which cancels out the speed of the
+    machine and most of its drift (e.g. frequency scaling).
+    :param names Benchmarks to run (all if None)
+    :return Parameters and for every benchmark the median time relative to
+    the calibration ("ratio") and its median absolute deviation relative to
+    the median ("noise")
+    """
+    results = {}
+    with toolbox_home():
+        ws = write_workspace(params, root)
+        calibrate = lambda: calibration
+        calibrations = calls_per_repetition(calibrate)
+        for name in names or BENCHMARKS:
+            setup = functools.partial(BENCHMARKS[name], ws)
+            reusable = name in REUSABLE
+            number = calls_per_repetition(setup, reusable)
+            ratios = [
+                measure(setup, number, reusable) /
+                measure(calibrate, calibrations) for _ in range(repeat)
+            ]
+            median = statistics.median(ratios)
+            results[name] = {
+                "ratio": median,
+                "noise": statistics.median(abs(r - median)
+                                           for r in ratios) / median
+            }
+    return {
+        "params": asdict(params),
+        "python": platform.python_version(),
+        "calibration": measure(calibrate, calibrations),
+        "results": results
+    }
+
+
+def compare(baseline: dict,
+            current: dict,
+            threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Compares results of run_benchmarks
+    A benchmark regressed if it got slower by more than threshold and by
+    more than NOISE_FACTOR times the noise of both results
+    :return Lines of a report. Regressions start w/ "REGRESSION"
+    """
+    if baseline["params"] != current["params"]:
+        raise BenchmarkError(
+            "Results were generated w/ different configurations: "
+            f"{baseline['params']} vs. {current['params']}")
+    if "calibration" not in baseline:
+        raise BenchmarkError(
+            "Baseline has absolute timings. Run benchmarks again.")
+    lines = []
+    for name, old in baseline["results"].items():
+        new = current["results"].get(name)
+        if new is None:
+            continue
+        ratio = new["ratio"] / old["ratio"]
+        limit = max(threshold, NOISE_FACTOR * (old["noise"] + new["noise"]))
+        flag = "REGRESSION" if ratio > 1 + limit else "ok"
+        lines.append(f"{flag:10} {name:20} {old['ratio']:10.3f} "
+                     f"{new['ratio']:10.3f} {ratio:6.2f}x "
+                     f"(limit {1 + limit:.2f}x)")
+    return lines
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Generates synthetic configurations and tools of a given size"""
+
+# Imports - standard library
+from dataclasses import dataclass, field
+from typing import Any, List, Tuple
+from pathlib import Path
+import random
+
+# Imports - 3rd party packages
+import yaml
+
+# Imports - local source
+
+# Number of groups per nesting level of the user namespace
+FAN_OUT = 4
+# Every n-th leaf of the user namespace is a list
+LIST_EVERY = 5
+# Schemas and defaults of tool properties (used round robin)
+PROPERTY_TYPES = (("str()", "default"), ("int()", 0), ("list(str())", []))
+TOOL_SOURCE = '''from toolbox.tool import Tool
+
+
+class {name}(Tool):
+    def steps(self):
+        return []
+'''
+
+
+@dataclass(frozen=True)
+class ConfigParams:
+    """Shape of a synthetic configuration"""
+    keys: int = 1000
+    depth: int = 4
+    ref_density: float = 0.2
+    list_size: int = 8
+    tools: int = 10
+    properties: int = 10
+    seed: int = 0
+
+
+@dataclass
+class Workspace:
+    """Files of a generated configuration"""
+    root: Path
+    config: dict
+    leaf_keys: List[str] = field(default_factory=list)
+    configs: List[str] = field(default_factory=list)
+    job: str = "bench"
+
+
+def set_nested(db: dict, keys: List[str], value: Any) -> None:
+    """Sets value of db[keys[0]][keys[1]]... creating dicts on the way"""
+    for key in keys[:-1]:
+        db = db.setdefault(key, {})
+    db[keys[-1]] = value
+
+
+def generate_user(params: ConfigParams,
+                  rng: random.Random) -> Tuple[dict, List[str], List[str]]:
+    """Generates the user namespace
+    Leaves are nested depth levels deep. Every LIST_EVERY-th leaf is a list,
+    the others reference an earlier leaf (w/ probability ref_density) or are
+    plain strings.
+    :return Namespace, dot keys of all leaves and of the plain string leaves
+    """
+    user, keys, strings = {}, [], []
+    for i in range(params.keys):
+        path = [f"g{rng.randrange(FAN_OUT)}" for _ in range(params.depth - 1)]
+        path.append(f"k{i}")
+        if i % LIST_EVERY == 0:
+            value = [f"item{j}" for j in range(params.list_size)]
+        elif keys and rng.random() < params.ref_density:
+            value = f"${{user.{rng.choice(keys)}}}"
+        else:
+            value = f"value{i}"
+            strings.append(".".join(path))
+        set_nested(user, path, value)
+        keys.append(".".join(path))
+    return user, keys, strings
+
+
+def generate_tools(params: ConfigParams, rng: random.Random,
+                   strings: List[str]) -> Tuple[dict, dict]:
+    """Generates tool.yml of every tool and the config values of the tools
+    String properties reference plain string leaves of the user namespace
+    w/ probability ref_density
+    :return tool.yml contents by tool name, config values by namespace
+    """
+    tools, values = {}, {}
+    for t in range(params.tools):
+        ns = f"bench_tool_{t}"
+        properties, ns_values = {}, {}
+        for j in range(params.properties):
+            schema, default = PROPERTY_TYPES[j % len(PROPERTY_TYPES)]
+            properties[f"p{j}"] = {
+                "description": f"Property {j} of tool {t}",
+                "default": default,
+                "schema": schema
+            }
+            if isinstance(default, str):
+                value = (f"${{user.{rng.choice(strings)}}}"
+                         if strings and rng.random() < params.ref_density else
+                         f"value_{t}_{j}")
+            elif isinstance(default, int):
+                value = j
+            else:
+                value = [f"item{k}" for k in range(params.list_size)]
+            ns_values[f"p{j}"] = value
+        tools[f"BenchTool{t}"] = {
+            "tool": f"BenchTool{t}",
+            "namespace": ns,
+            "properties": properties
+        }
+        values[ns] = ns_values
+    return tools, values
+
+
+def generate_config(params: ConfigParams) -> Tuple[dict, dict, List[str]]:
+    """Generates user namespace and tool values (see generate_user and
+    generate_tools)
+    :return Config, tool.yml contents by tool name and dot keys of the leaves
+    of the user namespace
+    """
+    rng = random.Random(params.seed)
+    user, keys, strings = generate_user(params, rng)
+    tools, values = generate_tools(params, rng, strings)
+    return {"user": user, **values}, tools, keys
+
+
+def write_workspace(params: ConfigParams, root: Path) -> Workspace:
+    """Writes tools, tools.yml, config.yml and job.yml (job "bench" w/ a
+    task per tool) to root
+    """
+    config, tools, keys = generate_config(params)
+    tool_dirs = []
+    for name, tool in tools.items():
+        tool_dir = root / "tools" / tool["namespace"]
+        tool_dir.mkdir(parents=True, exist_ok=True)
+        with open(tool_dir / "tool.yml", 'w') as fp:
+            yaml.safe_dump(tool, fp)
+        with open(tool_dir / "__init__.py", 'w') as fp:
+            fp.write(TOOL_SOURCE.format(name=name))
+        tool_dirs.append(str(tool_dir))
+    files = {
+        "tools.yml": {
+            "tools": tool_dirs
+        },
+        "config.yml": config,
+        "job.yml": {
+            "jobs": {
+                "bench": {
+                    "tasks": [{
+                        "tool": name
+                    } for name in tools]
+                }
+            }
+        }
+    }
+    for fname, data in files.items():
+        with open(root / fname, 'w') as fp:
+            yaml.safe_dump(data, fp)
+    return Workspace(root, config, keys,
+                     [str(root / fname) for fname in files])
@@ -0,0 +1,21 @@
+import os
+from typing import List, Callable
+
+from toolbox.database import Database
+from toolbox.tool import Tool, cached_step
+from toolbox.logger import LogLevel
+
+
+class ToolCache(Tool):
+    def __init__(self, db: Database, log: Callable[[], None]):
+        super().__init__(db, log)
+
+    def steps(self) -> List[Callable[[], None]]:
+        return [self.write_output]
+
+    @cached_step(outputs=["out.txt"], inputs=["tool_cache"])
+    def write_output(self):
+        print("write_output!!!")
+        fname = os.path.join(self.get_db("internal.job_dir"), "out.txt")
+        with open(fname, 'w') as fp:
+            fp.write(self.get_db("tool_cache.message"))
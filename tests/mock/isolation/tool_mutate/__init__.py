@@ -0,0 +1,28 @@
+import os
+from typing import List, Callable
+
+from toolbox.database import Database
+from toolbox.tool import Tool, ToolError
+
+
+class UnpicklableError(Exception):
+    def __init__(self, step: str, reason: str):
+        super().__init__(f"{step}: {reason}")
+
+
+class ToolMutate(Tool):
+    def __init__(self, db: Database, log: Callable[[], None]):
+        super().__init__(db, log)
+
+    def steps(self) -> List[Callable[[], None]]:
+        return [self.check, self.mutate]
+
+    def check(self):
+        if "TOOLBOX_MUTATED" in os.environ or "mutated" in self.get_db("user"):
+            raise ToolError("Changes of a previous task are visible")
+
+    def mutate(self):
+        os.environ["TOOLBOX_MUTATED"] = "1"
+        self._db.load_dict({"user": {"mutated": True}})
+        if self.get_db("tool_mutate.fail"):
+            raise UnpicklableError("mutate", "failed on purpose")
@@ -0,0 +1,20 @@
+import os
+from typing import List, Callable
+
+from toolbox.database import Database
+from jinja_tool import JinjaTool
+
+
+class ToolRender(JinjaTool):
+    def __init__(self, db: Database, log: Callable[[], None]):
+        super().__init__(db, log)
+
+    def steps(self) -> List[Callable[[], None]]:
+        return [self.render_hello]
+
+    def render_hello(self):
+        self.render_to_file(
+            "hello.txt",
+            os.path.join(self.get_db("internal.job_dir"), "hello.txt"),
+            greeting=self.get_db("tool_render.greeting"),
+            name="world")
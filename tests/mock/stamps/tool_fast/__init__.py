@@ -0,0 +1,19 @@
+import os
+from typing import List, Callable
+
+from toolbox.database import Database
+from toolbox.tool import Tool
+
+
+class ToolFast(Tool):
+    def __init__(self, db: Database, log: Callable[[], None]):
+        super().__init__(db, log)
+
+    def steps(self) -> List[Callable[[], None]]:
+        return [self.write_output]
+
+    def write_output(self):
+        print("ToolFast!!!")
+        fname = os.path.join(self.get_db("internal.job_dir"), "fast.txt")
+        with open(fname, 'w') as fp:
+            fp.write(self.get_db(self.get_db("tool_fast.source")))
@@ -0,0 +1,20 @@
+import os
+import time
+from typing import List, Callable
+
+from toolbox.database import Database
+from toolbox.tool import Tool
+
+
+class ToolSlow(Tool):
+    def __init__(self, db: Database, log: Callable[[], None]):
+        super().__init__(db, log)
+
+    def steps(self) -> List[Callable[[], None]]:
+        return [self.write_output]
+
+    def write_output(self):
+        time.sleep(self.get_db("tool_slow.delay"))
+        fname = os.path.join(self.get_db("internal.job_dir"), "slow.txt")
+        with open(fname, 'w') as fp:
+            fp.write("slow")
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Tests of the synthetic config generator and benchmark comparison"""
+
+# Imports - standard library
+import copy
+import os
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.dot_dict import DotDict
+from benchmarks.generate import ConfigParams, generate_config
+from benchmarks.bench import BENCHMARKS, BenchmarkError, run_benchmarks
+from benchmarks.bench import compare
+
+
+def test_generate_config():
+    """Checks that generated configs have the requested shape and resolve"""
+    params = ConfigParams(keys=50, depth=3, ref_density=0.5, tools=3,
+                          properties=4)
+    config, tools, keys = generate_config(params)
+    assert len(keys) == 50 and all(k.count('.') == 2 for k in keys)
+    assert len(tools) == 3
+    assert all(len(t["properties"]) == 4 for t in tools.values())
+    flat = DotDict(copy.deepcopy(config)).flatten()
+    assert any("${" in str(v) for v in flat.values())
+    resolved = DotDict(copy.deepcopy(config))
+    resolved.resolve()
+    assert "${" not in str(resolved)
+    assert generate_config(params) == (config, tools, keys)
+
+
+def test_run_and_compare(tmp_path, monkeypatch):
+    """Checks that all benchmarks run and that regressions (beyond noise)
+    are flagged
+    """
+    monkeypatch.delenv("TOOLBOX_HOME", raising=False)
+    params = ConfigParams(keys=20, tools=2, properties=3)
+    results = run_benchmarks(params, tmp_path, repeat=1)
+    assert "TOOLBOX_HOME" not in os.environ
+    assert set(results["results"]) == set(BENCHMARKS)
+    slower = copy.deepcopy(results)
+    slower["results"]["toolbox_init"]["ratio"] *= 2
+    lines = compare(results, slower, 0.25)
+    assert [line.split()[1] for line in lines
+            if line.startswith("REGRESSION")] == ["toolbox_init"]
+    slower["results"]["toolbox_init"]["noise"] = 0.5
+    lines = compare(results, slower, 0.25)
+    assert not any(line.startswith("REGRESSION") for line in lines)
+    with pytest.raises(BenchmarkError):
+        compare(results, run_benchmarks(ConfigParams(keys=10), tmp_path / 'b',
+                                        repeat=1, names=["dot_dict_flatten"]))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Docstring for module test_cache"""
+
+# Imports - standard library
+from pathlib import Path
+import time
+import importlib
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams
+from toolbox.logger import LogLevel, LoggerParams
+from toolbox.cache import StepCache, CacheError
+from toolbox.tool import ToolError
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+
+
+def test_store_and_restore(tmp_path):
+    """Checks that stored outputs are restored into another directory"""
+    cache = StepCache(str(tmp_path / 'cache'))
+    src, dest = tmp_path / 'src', tmp_path / 'dest'
+    (src / 'sub').mkdir(parents=True)
+    (src / 'a.txt').write_text('a')
+    (src / 'sub' / 'b.txt').write_text('b')
+    assert not cache.restore('key', str(dest))
+    cache.store('key', str(src), ['a.txt', 'sub'])
+    assert cache.restore('key', str(dest))
+    assert (dest / 'a.txt').read_text() == 'a'
+    assert (dest / 'sub' / 'b.txt').read_text() == 'b'
+    with pytest.raises(CacheError):
+        cache.store('missing', str(src), ['missing.txt'])
+
+
+def test_lru_eviction(tmp_path):
+    """Checks that least recently used entries are evicted first"""
+    cache = StepCache(str(tmp_path / 'cache'))
+    for i in range(3):
+        # 0.6 MB each so that a limit of 1 MB keeps exactly one entry
+        (tmp_path / f'{i}.txt').write_text(str(i) * 600 * 1024)
+        cache.store(f'key{i}', str(tmp_path), [f'{i}.txt'])
+    assert cache.stats()["entries"] == 3
+    assert cache.restore('key0', str(tmp_path / 'dest'))
+    assert cache.prune(1) == 2
+    assert [e.stem for e in cache.entries()] == ['key0']
+    assert cache.stats()["objects"] == 1
+    assert cache.prune(0) == 1
+    assert cache.stats()["objects"] == 0
+
+
+def test_restore_mode(tmp_path):
+    """Checks that restored outputs keep their mode (e.g. exec bit)"""
+    cache = StepCache(str(tmp_path / 'cache'))
+    script = tmp_path / 'src' / 'run.sh'
+    script.parent.mkdir()
+    script.write_text('#!/bin/sh')
+    script.chmod(0o754)
+    cache.store('key', str(script.parent), ['run.sh'])
+    assert cache.restore('key', str(tmp_path / 'dest'))
+    assert (tmp_path / 'dest' / 'run.sh').stat().st_mode & 0o777 == 0o754
+
+
+def test_cached_step(tmp_path, capsys):
+    """Checks that a cached step is only executed on a cache miss"""
+    config = tmp_path / 'config.yml'
+    config.write_text(f'toolbox.cache.dir: {tmp_path / "cache"}')
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[f'{MOCK_DIR}/cache/tools.yml',
+                                 str(config)],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         force=True)
+    for executed in (True, False):
+        tb = ToolBox(args)
+        tb.execute()
+        assert ("write_output!!!" in capsys.readouterr().out) == executed
+        out = Path(tb.get_db('internal.job_dir')) / 'out.txt'
+        assert out.read_text() == 'hello'
+    # Cache specs are registered per step (lambdas cannot be told apart)
+    tool = importlib.import_module('tool_cache').ToolCache(tb, tb.log)
+    with pytest.raises(ToolError):
+        tool.cache_step(lambda: None, ['a.txt'])
+
+    def step_a():
+        pass
+
+    def step_b():
+        pass
+
+    tool.cache_step(step_a, ['a.txt'])
+    assert tool.get_cache_spec(step_a).outputs == ('a.txt', )
+    assert tool.get_cache_spec(step_b) is None
+
+
+def test_skipped_task_outputs(tmp_path, capsys):
+    """Checks that outputs of a skipped task are copied into the new job dir"""
+    config = tmp_path / 'config.yml'
+    config.write_text(f'toolbox.cache.dir: {tmp_path / "cache"}')
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[f'{MOCK_DIR}/cache/tools.yml',
+                                 str(config)],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job')
+    job_dirs = []
+    for _ in range(2):
+        tb = ToolBox(args)
+        tb.execute()
+        job_dirs.append(Path(tb.get_db('internal.job_dir')))
+        # Job directories are named by the second they were created in
+        time.sleep(1.1)
+    assert "is up to date" in capsys.readouterr().err
+    assert job_dirs[0] != job_dirs[1]
+    assert (job_dirs[1] / 'out.txt').read_text() == 'hello'
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Docstring for module test_daemon"""
+
+# Imports - standard library
+from pathlib import Path
+import subprocess
+import signal
+import time
+import sys
+import os
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.daemon_client import forward, owned_socket, socket_path
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+CLI = str(Path(__file__).resolve().parents[1] / 'bin' / 'toolbox-cli')
+
+
+def test_forward_without_daemon(tmp_path, monkeypatch):
+    """Checks that invocations run locally when no daemon is running"""
+    monkeypatch.setenv("TOOLBOX_DAEMON_SOCKET", str(tmp_path / 'none.sock'))
+    assert forward(['example_job']) is None
+    assert forward(['serve']) is None
+
+
+def test_daemon(tmp_path):
+    """Checks that jobs are forwarded to the daemon"""
+    sock = tmp_path / 'daemon.sock'
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(sys.path),
+               TOOLBOX_DAEMON_SOCKET=str(sock))
+    daemon = subprocess.Popen(
+        [sys.executable, '-m', 'toolbox.cli_driver', 'serve'],
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True)
+    try:
+        for _ in range(100):
+            if sock.exists():
+                break
+            time.sleep(0.1)
+
+        def run(config_a: str) -> subprocess.CompletedProcess:
+            return subprocess.run([
+                sys.executable, CLI, '-b',
+                str(tmp_path / 'build'), '-c', f'{MOCK_DIR}/basic/tools.yml',
+                '-c', config_a, '-c', f'{MOCK_DIR}/basic/config_b.yml', '-c',
+                f'{MOCK_DIR}/basic/job.yml', '-f', 'example_job'
+            ],
+                                  env=env,
+                                  capture_output=True,
+                                  text=True)
+
+        for _ in range(2):
+            result = run(f'{MOCK_DIR}/basic/config_a.yml')
+            assert result.returncode == 0
+            assert "test_fn!!!" in result.stdout
+        assert run(f'{MOCK_DIR}/basic/config_a_invalid.yml').returncode != 0
+    finally:
+        daemon.send_signal(signal.SIGINT)
+        output = daemon.communicate(timeout=10)[0]
+    assert not sock.exists()
+    # Requests were served by the daemon and not run locally
+    assert output.count("Served request (exit code 0)") == 2
+    assert output.count("Served request (exit code 1)") == 1
+
+
+def test_client_interrupt(tmp_path):
+    """Checks that a request is interrupted when its client exits"""
+    sock = tmp_path / 'daemon.sock'
+    env = dict(os.environ,
+               PYTHONPATH=os.pathsep.join(sys.path),
+               TOOLBOX_DAEMON_SOCKET=str(sock))
+    daemon = subprocess.Popen(
+        [sys.executable, '-m', 'toolbox.cli_driver', 'serve'],
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True)
+    try:
+        for _ in range(100):
+            if sock.exists():
+                break
+            time.sleep(0.1)
+        client = subprocess.Popen([
+            sys.executable, CLI, '-b',
+            str(tmp_path / 'build'), '-c', f'{MOCK_DIR}/basic/tools.yml',
+            '-c', f'{MOCK_DIR}/basic/config_a.yml', '-c',
+            f'{MOCK_DIR}/basic/config_b.yml', '-c',
+            f'{MOCK_DIR}/basic/job.yml', '-w', 'example_job'
+        ],
+                                  env=env,
+                                  stdout=subprocess.PIPE,
+                                  stderr=subprocess.STDOUT,
+                                  text=True)
+        for line in client.stdout:
+            if "Waiting for changes" in line:
+                break
+        client.send_signal(signal.SIGINT)
+        assert client.wait(timeout=10) == 128 + signal.SIGINT
+        assert daemon.stdout.readline().startswith("toolbox daemon")
+        assert "Served request" in daemon.stdout.readline()
+    finally:
+        daemon.send_signal(signal.SIGINT)
+        daemon.communicate(timeout=10)
+
+
+def test_socket_ownership(tmp_path, monkeypatch):
+    """Checks that sockets that are not sockets of this user are not used"""
+    fake = tmp_path / 'fake.sock'
+    fake.write_text('')
+    monkeypatch.setenv("TOOLBOX_DAEMON_SOCKET", str(fake))
+    assert not owned_socket(str(fake))
+    assert forward(['example_job']) is None
+    monkeypatch.delenv("TOOLBOX_DAEMON_SOCKET")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert socket_path() == str(tmp_path / 'toolbox.sock')
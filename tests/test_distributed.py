@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Docstring for module test_distributed"""
+
+# Imports - standard library
+from pathlib import Path
+import subprocess
+import sys
+import os
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams, ToolBoxError
+from toolbox.logger import LogLevel, LoggerParams
+from toolbox.distributed import parse_address, TaskServer, TaskWorker
+from toolbox.distributed import DistributedError, key_file
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+
+
+def distribute(tmp_path, configs, job):
+    """Runs job w/ two workers on a unix socket"""
+    address = str(tmp_path / 'toolbox.sock')
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=configs,
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job=job,
+                         distribute=address)
+    tb = ToolBox(args)
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    workers = [
+        subprocess.Popen(
+            [sys.executable, '-m', 'toolbox.cli_driver', 'worker', address],
+            env=env,
+            stdout=subprocess.PIPE,
+            text=True) for _ in range(2)
+    ]
+    try:
+        tb.execute()
+    finally:
+        outputs = [w.communicate(timeout=60)[0] for w in workers]
+    return ''.join(outputs)
+
+
+def test_parse_address():
+    """Checks TCP and unix socket addresses"""
+    assert parse_address("localhost:5000") == ("localhost", 5000)
+    assert parse_address(":5000") == ("localhost", 5000)
+    assert parse_address("/tmp/toolbox.sock") == "/tmp/toolbox.sock"
+
+
+def test_authkey(tmp_path, monkeypatch, capsys):
+    """Checks that servers never run w/o a key and workers need one"""
+    monkeypatch.delenv("TOOLBOX_AUTHKEY", raising=False)
+    log = lambda msg, level=None: None
+    server = TaskServer("localhost:0", {}, [], log)
+    assert "TOOLBOX_AUTHKEY=" in capsys.readouterr().err
+    server.listener.close()
+    address = str(tmp_path / 'toolbox.sock')
+    server = TaskServer(address, {}, [], log)
+    assert key_file(address).stat().st_mode & 0o777 == 0o600
+    server.serve()
+    assert not key_file(address).exists()
+    with pytest.raises(DistributedError):
+        TaskWorker("localhost:1", connect_timeout=0).connect()
+
+
+def test_distributed_job(tmp_path):
+    """Checks that workers run all tasks of a job"""
+    output = distribute(tmp_path, [
+        f'{MOCK_DIR}/basic/tools.yml', f'{MOCK_DIR}/basic/config_a.yml',
+        f'{MOCK_DIR}/basic/config_c.yml', f'{MOCK_DIR}/basic/job.yml',
+        f'{MOCK_DIR}/distributed/job.yml'
+    ], 'example_distributed_job')
+    assert output.count("test_fn!!!") == 2
+
+
+def test_distributed_job_failure(tmp_path):
+    """Checks that errors on workers are raised by the server"""
+    with pytest.raises(ToolBoxError):
+        distribute(tmp_path, [
+            f'{MOCK_DIR}/basic/tools.yml',
+            f'{MOCK_DIR}/basic/config_a_invalid.yml',
+            f'{MOCK_DIR}/basic/config_b.yml', f'{MOCK_DIR}/basic/job.yml'
+        ], 'example_job')
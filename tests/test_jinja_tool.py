@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Tests of the jinja tool"""
+
+# Imports - standard library
+from pathlib import Path
+import os
+import sys
+import json
+import hashlib
+
+# Imports - 3rd party packages
+import pytest
+from jinja2 import UndefinedError
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams
+from toolbox.logger import LogLevel, LoggerParams
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+sys.path.insert(
+    1,
+    str(Path(__file__).resolve().parents[1] / 'toolbox' / 'tools' /
+        'jinja_tool'))
+from jinja_tool import SourceBytecodeCache, RenderJob, current_umask
+
+
+def run_render_job(tmp_path: Path, *config: str) -> ToolBox:
+    """Runs render job w/ bytecode cache in tmp_path
+    :param config Additional lines of the config
+    """
+    config_file = tmp_path / 'config_jinja.yml'
+    lines = [f'jinja.bytecode_cache_dir: "{tmp_path / "bytecode"}"', *config]
+    config_file.write_text("\n".join(lines) + "\n")
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/jinja/tools.yml',
+                             str(config_file),
+                             f'{MOCK_DIR}/jinja/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='render_job',
+                         force=True)
+    tb = ToolBox(args)
+    tb.execute()
+    return tb
+
+
+def test_bytecode_cache(tmp_path):
+    """Checks that compiled templates are shared between runs"""
+    tb = run_render_job(tmp_path)
+    rendered = (Path(tb.get_db('internal.job_dir')) / 'hello.txt').read_text()
+    assert "hello world" in rendered
+    buckets = sorted((tmp_path / 'bytecode').iterdir())
+    assert len(buckets) == 2
+    inodes = [b.stat().st_ino for b in buckets]
+    os.utime(buckets[0], ns=(0, 0))
+    run_render_job(tmp_path)
+    # Buckets are loaded (and marked as used) instead of compiled again
+    assert sorted((tmp_path / 'bytecode').iterdir()) == buckets
+    assert [b.stat().st_ino for b in buckets] == inodes
+    assert buckets[0].stat().st_mtime_ns > 0
+
+
+def test_bytecode_cache_prune(tmp_path):
+    """Checks that least recently used buckets are evicted first"""
+    cache = SourceBytecodeCache(str(tmp_path), 0)
+    for i in range(3):
+        f = tmp_path / (cache.pattern % f"bucket{i}")
+        f.write_bytes(b'x' * 1024)
+        os.utime(f, (i, i))
+    cache.max_size = 1024
+    assert cache.prune() == 2
+    assert [f.name for f in tmp_path.iterdir()] == [cache.pattern % "bucket2"]
+
+
+def test_templates_in_place(tmp_path):
+    """Checks that templates are not copied, additional templates take
+    precedence and the used templates are recorded in the manifest
+    """
+    tb = run_render_job(tmp_path)
+    job_dir = Path(tb.get_db('internal.job_dir'))
+    assert [f.name for f in (job_dir / 'jinja_templates').iterdir()
+            ] == ['ToolRender.json']
+    manifest = json.loads(
+        (job_dir / 'jinja_templates' / 'ToolRender.json').read_text())
+    assert set(manifest) == {"hello.txt", "base.tcl"}
+    assert manifest["hello.txt"]["file"] == str(
+        MOCK_DIR / 'jinja' / 'tool_render' / 'templates' / 'hello.txt')
+    override = tmp_path / 'hello.txt'
+    override.write_text("override {{ name }}\n")
+    tb = run_render_job(tmp_path,
+                        f'jinja.additional_templates: ["{override}"]')
+    job_dir = Path(tb.get_db('internal.job_dir'))
+    assert (job_dir / 'hello.txt').read_text() == "override world"
+    manifest = json.loads(
+        (job_dir / 'jinja_templates' / 'ToolRender.json').read_text())
+    assert manifest == {
+        "hello.txt": {
+            "file": str(override),
+            "sha256": hashlib.sha256(override.read_bytes()).hexdigest()
+        }
+    }
+
+
+def test_render_to_file_atomic(tmp_path):
+    """Checks that failed renders leave the previous file untouched and that
+    rendered files get the mode of the previous file or the usual mode
+    """
+    tb = run_render_job(tmp_path)
+    from tool_render import ToolRender
+    tool = ToolRender(tb, tb.log)
+    outfile = tmp_path / 'out.txt'
+    outfile.write_text("previous")
+    with pytest.raises(UndefinedError):
+        tool.render_to_file("fail.txt", str(outfile))
+    assert [f.name for f in tmp_path.glob('*out.txt*')] == ['out.txt']
+    assert outfile.read_text() == "previous"
+    tool.render_to_file("hello.txt", str(outfile), greeting="hi", name="you")
+    assert "hi you" in outfile.read_text()
+    assert outfile.stat().st_mode & 0o777 == 0o666 & ~current_umask()
+    (tmp_path / 'plain.txt').write_text("")
+    plain_mode = (tmp_path / 'plain.txt').stat().st_mode & 0o777
+    assert plain_mode == 0o666 & ~current_umask()
+    outfile.chmod(0o640)
+    tool.render_to_file("hello.txt", str(outfile), greeting="hi", name="me")
+    assert outfile.stat().st_mode & 0o777 == 0o640
+
+
+def test_render_many(tmp_path):
+    """Checks that all jobs are rendered and errors returned per file"""
+    tb = run_render_job(tmp_path)
+    from tool_render import ToolRender
+    tool = ToolRender(tb, tb.log)
+    jobs = [
+        RenderJob("hello.txt", str(tmp_path / f"out{i}.txt"), {
+            "greeting": "hi",
+            "name": str(i)
+        }) for i in range(8)
+    ]
+    jobs.insert(3, RenderJob("fail.txt", str(tmp_path / "fail.txt")))
+    results = tool.render_many(jobs, max_workers=4)
+    assert [r.outfile for r in results] == [j.outfile for j in jobs]
+    assert isinstance(results[3].error, UndefinedError)
+    assert not (tmp_path / "fail.txt").exists()
+    for i in range(8):
+        assert f"hi {i}" in (tmp_path / f"out{i}.txt").read_text()
+    assert all(r.duration >= 0 for r in results)
+    assert sum(r.error is None and r.written for r in results) == 8
+
+
+def test_write_if_changed(tmp_path):
+    """Checks that files w/ unchanged contents are not written again"""
+    tb = run_render_job(tmp_path, 'jinja.date: "01/01/2020"')
+    from tool_render import ToolRender
+    tool = ToolRender(tb, tb.log)
+    outfile = tmp_path / 'out.txt'
+    tool.render_to_file("hello.txt", str(outfile), greeting="hi", name="you")
+    assert "Date Created: 01/01/2020" in outfile.read_text()
+    os.utime(outfile, ns=(0, 0))
+    ino = outfile.stat().st_ino
+    job = RenderJob("hello.txt", str(outfile), {
+        "greeting": "hi",
+        "name": "you"
+    })
+    assert not tool.render_many([job])[0].written
+    assert outfile.stat().st_mtime_ns == 0 and outfile.stat().st_ino == ino
+    tool.render_to_file("hello.txt", str(outfile), greeting="hi", name="me")
+    assert outfile.stat().st_mtime_ns > 0
+    assert "hi me" in outfile.read_text()
+    assert [f.name for f in tmp_path.glob('*out.txt*')] == ['out.txt']
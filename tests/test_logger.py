@@ -7,16 +7,59 @@
 
 # Imports - standard library
 from pathlib import Path
+from typing import List
+import os
+import logging
 
 # Imports - 3rd party packages
 import pytest
 
 # Imports - local source
 from toolbox.toolbox import ToolBox, ToolBoxParams
-from toolbox.logger import LogLevel, LoggerParams
+from toolbox.logger import Logger, LogLevel, LoggerParams
 from toolbox.dot_dict import DotDict, DictError
 
 
-# TODO implement me
-def test_logger():
-    """Placeholder for logger tests"""
+def read_log(tmp_path: Path, logger: Logger) -> List[str]:
+    """Returns lines of log file once all queued records are written"""
+    logger.flush()
+    return (tmp_path / "out.log").read_text().splitlines()
+
+
+def test_logger(tmp_path):
+    """Checks levels, prefixes and per level colors"""
+    logger = Logger(
+        LoggerParams(LogLevel.INFO,
+                     out_fname=str(tmp_path / "out.log"),
+                     name="test_logger",
+                     formatter="{begin_color}[%(levelname)s]{stop_color} "
+                     "%(message)s",
+                     color=True))
+    logger.log("hidden", LogLevel.DEBUG)
+    logger.log("shown", LogLevel.INFO, "[job] [tool] [step]")
+    logger.log("failed", LogLevel.ERROR)
+    assert read_log(tmp_path, logger) == [
+        "[INFO] [job] [tool] [step] shown", "[ERROR] failed"
+    ]
+    formatter = logger.stream_handler.formatter
+    record = logging.makeLogRecord({"levelno": logging.ERROR, "msg": "x"})
+    assert Logger.LOG_COLOR["ERROR"] in formatter.format(record)
+    logger.close()
+
+
+def test_logger_fork(tmp_path):
+    """Checks that records of forked children are written exactly once"""
+    logger = Logger(
+        LoggerParams(LogLevel.INFO,
+                     out_fname=str(tmp_path / "out.log"),
+                     name="test_logger_fork"))
+    logger.log("parent")
+    pid = os.fork()
+    if pid == 0:
+        logger.log("child")
+        logger.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    lines = read_log(tmp_path, logger)
+    assert sorted(line.split()[-1] for line in lines) == ["child", "parent"]
+    logger.close()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Docstring for module test_scheduler"""
+
+# Imports - standard library
+from pathlib import Path
+import json
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams
+from toolbox.logger import LogLevel, LoggerParams
+from toolbox.tool import ToolError
+from toolbox.scheduler import Resources, TaskScheduler, available_resources
+from toolbox.scheduler import SchedulerError, critical_paths, topological_order
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+
+
+def simulate(limits: Resources,
+             tasks: list,
+             max_tasks=None,
+             depends=None,
+             failing=()) -> list:
+    """Runs scheduler w/ tasks that finish in order of starting
+    :return List of sets of concurrently running tasks
+    """
+    running, snapshots = [], []
+
+    def start(key):
+        running.append(key)
+        snapshots.append(set(running))
+
+    def wait():
+        key = running.pop(0)
+        return key, Exception(key) if key in failing else None
+
+    TaskScheduler(limits, max_tasks).run(tasks,
+                                         start,
+                                         wait,
+                                         fail_fast=False,
+                                         depends=depends)
+    return snapshots
+
+
+def test_packing():
+    """Checks that running tasks never exceed the limits"""
+    tasks = [("big", Resources(4, 32)), ("small0", Resources(1, 1)),
+             ("small1", Resources(1, 1)), ("huge", Resources(16, 128))]
+    snapshots = simulate(Resources(5, 33), tasks)
+    assert snapshots == [{"big"}, {"big", "small0"}, {"small0", "small1"},
+                         {"huge"}]
+    assert simulate(Resources(100, 100), tasks, 2)[1] == {"big", "small0"}
+
+
+def test_dependencies():
+    """Checks that tasks only start once their dependencies succeeded"""
+    tasks = [(k, Resources(1, 0)) for k in ("a", "b", "c", "d")]
+    depends = {"a": ["c"], "b": ["a"]}
+    assert simulate(Resources(4, 0), tasks,
+                    depends=depends) == [{"c"}, {"c", "d"}, {"d", "a"}, {"b"}]
+    assert simulate(Resources(4, 0), tasks, depends=depends,
+                    failing=("c", )) == [{"c"}, {"c", "d"}]
+    with pytest.raises(SchedulerError):
+        topological_order(["a", "b"], {"a": ["b"], "b": ["a"]})
+
+
+def test_critical_paths():
+    """Checks longest path from every task to the end of the job"""
+    durations = {"a": 1, "b": 5, "c": 2, "d": 4}
+    paths = critical_paths(durations, {"b": ["a"], "d": ["c"]})
+    assert paths == {"a": 6, "b": 5, "c": 6, "d": 4}
+    assert topological_order(["b", "a"], {"b": ["a"]}) == ["a", "b"]
+
+
+def test_available_resources():
+    """Checks that machine resources are detected"""
+    available = available_resources()
+    assert available.cpus >= 1 and available.memory > 0
+
+
+@pytest.mark.parametrize("config,error", [
+    ('config_a.yml', None),
+    ('config_a_invalid.yml', ToolError),
+])
+def test_parallel_job(tmp_path, config, error):
+    """Checks that tasks of a job run concurrently"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/{config}',
+                             f'{MOCK_DIR}/basic/config_c.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             f'{MOCK_DIR}/distributed/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_distributed_job',
+                         jobs=2,
+                         cpus=2)
+    tb = ToolBox(args)
+    if error is None:
+        tb.execute()
+        # Tasks that ran at the same time as another are not stamped
+        job_dir = Path(tb.get_db('internal.job_dir'))
+        for i, tool in enumerate(('ToolA', 'ToolC')):
+            stamped = (tmp_path / args.job / 'stamps' / f'{i}_{tool}.json')
+            log = (job_dir / 'logs' / f'{i}_{tool}.log').read_text()
+            assert stamped.exists() != ('ran concurrently' in log)
+    else:
+        with pytest.raises(error):
+            tb.execute()
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_dependent_job(tmp_path, jobs):
+    """Checks dependency order and that task durations are recorded"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_c.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             f'{MOCK_DIR}/distributed/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_dependent_job',
+                         jobs=jobs,
+                         cpus=2)
+    ToolBox(args).execute()
+    stamps = tmp_path / args.job / 'stamps'
+    assert (stamps / '1_ToolC.json').stat().st_mtime_ns <= (
+        stamps / '0_ToolA.json').stat().st_mtime_ns
+    history = tmp_path / args.job / 'history' / '0_ToolA.json'
+    with open(history, 'r') as fp:
+        recorded = json.load(fp)
+    assert recorded["runs"] == 1 and recorded["duration"] > 0
+    assert set(recorded["steps"]) == {"<lambda>", "simple_fn", "test_fn"}
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_parallel_stamps(tmp_path, jobs):
+    """Checks that a task is only stamped w/ the outputs it wrote itself"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[f'{MOCK_DIR}/stamps/tools.yml'],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='parallel_job',
+                         jobs=jobs,
+                         cpus=4)
+    ToolBox(args).execute()
+    stamps = {}
+    for f in (tmp_path / args.job / 'stamps').glob('*.json'):
+        with open(f, 'r') as fp:
+            stamps[f.stem] = json.load(fp)["outputs"]
+    if jobs == 1:
+        assert stamps == {
+            '0_ToolSlow': ['slow.txt'],
+            '1_ToolFast': ['fast.txt']
+        }
+    else:
+        assert stamps == {}
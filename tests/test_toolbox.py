@@ -7,7 +7,11 @@
 
 # Imports - standard library
 from pathlib import Path
+import os
 import shutil
+import json
+import tracemalloc
+import fcntl
 
 # Imports - 3rd party packages
 import pytest
@@ -292,3 +296,388 @@ def test_tool_nested_schemas():
                          job='test')
     tb = ToolBox(args)
     tb.execute()
+
+
+def test_task_stamp_skip(tmp_path, capsys):
+    """Makes sure unchanged tasks are skipped unless forced"""
+    def run(force: bool):
+        args = ToolBoxParams(build_dir=str(tmp_path),
+                             symlink=None,
+                             config=[
+                                 f'{MOCK_DIR}/basic/tools.yml',
+                                 f'{MOCK_DIR}/basic/config_a.yml',
+                                 f'{MOCK_DIR}/basic/config_b.yml',
+                                 f'{MOCK_DIR}/basic/job.yml'
+                             ],
+                             out_fname="toolbox.log",
+                             log_params=LoggerParams(LogLevel.DEBUG),
+                             job='example_job',
+                             force=force)
+        ToolBox(args).execute()
+        return capsys.readouterr().out
+
+    assert "test_fn!!!" in run(False)
+    assert (tmp_path / 'example_job' / 'stamps' / '0_ToolA.json').is_file()
+    assert "test_fn!!!" not in run(False)
+    assert "test_fn!!!" in run(True)
+
+
+def test_task_stamp_filelists(tmp_path, capsys):
+    """Makes sure tasks rerun when a file of the filelists namespace changes"""
+    source = tmp_path / 'source.v'
+    source.write_text('module a;')
+    config = tmp_path / 'filelists.yml'
+    config.write_text(f'filelists: {{sources: [{source}]}}')
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             str(config)
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job')
+    ToolBox(args).execute()
+    ToolBox(args).execute()
+    assert capsys.readouterr().out.count("test_fn!!!") == 1
+    source.write_text('module b;')
+    ToolBox(args).execute()
+    assert "test_fn!!!" in capsys.readouterr().out
+
+
+def test_task_stamp_upstream(tmp_path, capsys):
+    """Makes sure tasks rerun when a task they depend on ran w/ other inputs
+    or when another namespace they read changed
+    """
+    config = tmp_path / 'config.yml'
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[f'{MOCK_DIR}/stamps/tools.yml',
+                                 str(config)],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='chain_job')
+
+    def run(delay: float, value: str) -> bool:
+        config.write_text(f'tool_slow.delay: {delay}\n'
+                          'tool_fast.source: extra.value\n'
+                          f'extra.value: {value}')
+        ToolBox(args).execute()
+        return "ToolFast!!!" in capsys.readouterr().out
+
+    assert run(0, 'a')
+    assert not run(0, 'a')
+    assert run(0.01, 'a')
+    assert not run(0.01, 'a')
+    assert run(0.01, 'b')
+    job_dir = tmp_path / 'chain_job' / 'current'
+    assert (job_dir / 'fast.txt').read_text() == 'b'
+
+
+@pytest.mark.parametrize("config,error", [
+    ('config_a.yml', None),
+    ('config_a_invalid.yml', ToolError),
+])
+def test_fork_isolation(tmp_path, config, error):
+    """Checks that tasks run in forked processes and errors are raised"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/{config}',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         isolation='fork')
+    tb = ToolBox(args)
+    if error is None:
+        tb.execute()
+        assert (tmp_path / 'example_job' / 'stamps' / '0_ToolA.json').is_file()
+    else:
+        with pytest.raises(error):
+            tb.execute()
+
+
+@pytest.mark.parametrize("configs", [[], ['config_fail.yml']])
+def test_fork_state_isolation(tmp_path, configs):
+    """Checks that changes of os.environ and database in a forked task are
+    neither visible to the next task nor to the parent and that exceptions
+    which cannot be unpickled are raised w/ the traceback of the child
+    """
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/isolation/tools.yml',
+                             *(f'{MOCK_DIR}/isolation/{c}' for c in configs),
+                             f'{MOCK_DIR}/isolation/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='isolation_job',
+                         isolation='fork')
+    tb = ToolBox(args)
+    if configs:
+        with pytest.raises(ToolBoxError) as err:
+            tb.execute()
+        assert "UnpicklableError" in str(err.value)
+        assert "failed on purpose" in str(err.value)
+    else:
+        tb.execute()
+    assert "TOOLBOX_MUTATED" not in os.environ
+    assert "mutated" not in tb.get_db("user")
+
+
+@pytest.mark.parametrize("config,status", [
+    ('config_a.yml', "success"),
+    ('config_a_invalid.yml', "failed"),
+])
+def test_event_log(tmp_path, config, status):
+    """Checks task/step events, log records and exit status of event log"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/{config}',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         isolation='fork')
+    tb = ToolBox(args)
+    try:
+        tb.execute()
+    except ToolError:
+        pass
+    fname = Path(tb.get_db('internal.job_dir')) / 'events.jsonl'
+    with open(fname, 'r') as fp:
+        events = [json.loads(line) for line in fp]
+    names = [e["event"] for e in events if e["event"] != "log"]
+    job = names.index("job_start")
+    assert job and all(n.startswith("populate_") for n in names[:job])
+    assert names[-1] == "job_end"
+    assert events[-1]["status"] == status
+    assert all(e["job"] == 'example_job' for e in events)
+    if status == "success":
+        assert names.count("step_end") == 3
+        steps = [e for e in events if e["event"] == "step_end"]
+        assert all(e["tool"] == "ToolA" and e["duration"] >= 0 for e in steps)
+        logs = [e for e in events if e["event"] == "log" and "step" in e]
+        assert logs and logs[0]["msg"] == "Log test"
+
+
+def test_task_logs(tmp_path):
+    """Checks that task messages go to task log files and combined.log"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_c.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             f'{MOCK_DIR}/distributed/job.yml'
+                         ],
+                         out_fname=str(tmp_path / "toolbox.log"),
+                         log_params=LoggerParams(
+                             LogLevel.DEBUG,
+                             out_fname=str(tmp_path / "toolbox.log")),
+                         job='example_distributed_job',
+                         jobs=2)
+    tb = ToolBox(args)
+    tb.execute()
+    job_dir = Path(tb.get_db('internal.job_dir'))
+    for i, tool in enumerate(["ToolA", "ToolC"]):
+        task_log = (job_dir / 'logs' / f'{i}_{tool}.log').read_text()
+        assert f"[{args.job}] [{tool}] [test_fn] Log test" in task_log
+    assert "Log test" not in (tmp_path / "toolbox.log").read_text()
+    combined = (job_dir / 'combined.log').read_text().splitlines()
+    assert sum("Log test" in line for line in combined) == 2
+    stamps = [line[:25] for line in combined if line.startswith('[20')]
+    assert stamps == sorted(stamps)
+
+
+@pytest.mark.parametrize("mode,ext", [('cprofile', 'pstats'),
+                                      ('sample', 'stacks')])
+def test_profile(tmp_path, mode, ext):
+    """Checks that phases, tasks and steps (also forked) are profiled"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         isolation='fork',
+                         profile=mode)
+    tb = ToolBox(args)
+    tb.execute()
+    profile_dir = Path(tb.get_db('internal.job_dir')) / 'profile'
+    for name in ("populate_tools", "populate_validate", "task_0_ToolA",
+                 "import_0_ToolA", "step_0_ToolA_test_fn"):
+        assert (profile_dir / f"{name}.{ext}").is_file()
+    summary = (profile_dir / 'summary.txt').read_text()
+    assert "task_0_ToolA" in summary
+    stamp = json.loads((tmp_path / 'example_job' / 'stamps' /
+                        '0_ToolA.json').read_text())
+    assert not any(f.startswith('profile') for f in stamp["outputs"])
+
+
+def test_trace(tmp_path):
+    """Checks that spans of phases, tasks and steps are exported to
+    trace.json and that forked tasks get a track of their own
+    """
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         isolation='fork',
+                         trace=True)
+    tb = ToolBox(args)
+    tb.execute()
+    trace = json.loads(
+        (Path(tb.get_db('internal.job_dir')) / 'trace.json').read_text())
+    spans = {e["name"]: e for e in trace["traceEvents"] if e["ph"] == "X"}
+    for name in ("populate tools", "job", "snapshot", "task ToolA",
+                 "validate", "import", "steps", "step test_fn"):
+        assert name in spans and spans[name]["dur"] >= 0
+    assert spans["task ToolA"]["pid"] != spans["job"]["pid"]
+    assert spans["step test_fn"]["pid"] == spans["task ToolA"]["pid"]
+    assert spans["step test_fn"]["args"]["tool"] == "ToolA"
+
+
+def test_memprofile(tmp_path):
+    """Checks that memory is reported at phase boundaries and for tasks"""
+    args = ToolBoxParams(build_dir=str(tmp_path),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml'
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         memprofile=True)
+    try:
+        tb = ToolBox(args)
+        tb.execute()
+    finally:
+        tracemalloc.stop()
+    report = (Path(tb.get_db('internal.job_dir')) / 'profile' /
+              'memory.txt').read_text()
+    phases = [line for line in report.splitlines() if line.startswith("==")]
+    assert any('config_a.yml' in p for p in phases)
+    for label in ("load_tools", "resolve", "validate",
+                  'before task 0 "ToolA"', 'after task 0 "ToolA"'):
+        assert any(label in p for p in phases)
+    assert report.count("peak rss:") == len(phases)
+    assert "Largest changes since previous snapshot:" in report
+
+
+def test_retention(tmp_path):
+    """Checks that expired build dirs are removed in the background while
+    recent ones, the current one, those referenced by stamps and those of
+    running jobs are kept
+    """
+    job_root = tmp_path / 'build' / 'example_job'
+    old = [f'01-0{i}-2020-00-00-00' for i in range(1, 6)]
+    for name in old:
+        (job_root / name).mkdir(parents=True)
+    (job_root / 'stamps').mkdir()
+    (job_root / 'stamps' / '0_ToolA.json').write_text(
+        json.dumps({"job_dir": str(job_root / old[0])}))
+    # A concurrent run still using old[1]
+    running = ToolBox.lock_build_dir(job_root / old[1], fcntl.LOCK_SH)
+    config = tmp_path / 'config.yml'
+    config.write_text('toolbox.retention.keep: 3')
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             str(config)
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job')
+    tb = ToolBox(args)
+    tb.pruner.join()
+    job_dir = Path(tb.get_db('internal.job_dir'))
+    remaining = sorted(d.name for d in job_root.iterdir())
+    assert remaining == sorted(
+        [old[0], old[1], old[3], old[4], job_dir.name, 'current', 'locks',
+         'stamps'])
+    assert not (job_root / 'locks' / f'{old[2]}.lock').exists()
+    config.write_text('toolbox.retention.max_age: 1')
+    tb = ToolBox(args)
+    tb.pruner.join()
+    assert not (job_root / old[3]).exists()
+    assert (job_root / old[0]).exists() and job_dir.exists()
+    assert (job_root / old[1]).exists()
+    running.close()
+
+
+def test_seed_build_dir(tmp_path):
+    """Checks that the job dir is seeded w/ the files of the previous run
+    if toolbox.seed.enabled and that files written by toolbox are neither
+    seeded nor changed in the previous run
+    """
+    job_root = tmp_path / 'build' / 'example_job'
+    previous = job_root / '01-01-2020-00-00-00'
+    (previous / 'out').mkdir(parents=True)
+    (previous / 'out' / 'result.txt').write_text('result')
+    owned = [
+        'events.jsonl', 'toolbox.log', 'ToolA.metrics.jsonl',
+        'jinja_templates/ToolA.json', 'logs/0_ToolA.log'
+    ]
+    for rel in owned:
+        (previous / rel).parent.mkdir(parents=True, exist_ok=True)
+        (previous / rel).write_text('previous run')
+    (job_root / 'current').symlink_to(previous, target_is_directory=True)
+    config = tmp_path / 'config.yml'
+    config.write_text('toolbox.seed.enabled: true')
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/config_a.yml',
+                             f'{MOCK_DIR}/basic/config_b.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             str(config)
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(
+                             LogLevel.DEBUG,
+                             out_fname=str(tmp_path / 'toolbox.log')),
+                         job='example_job')
+    tb = ToolBox(args)
+    job_dir = Path(tb.get_db('internal.job_dir'))
+    assert tb.get_db('internal.previous_job_dir') == str(previous)
+    assert (job_dir / 'out' / 'result.txt').read_text() == 'result'
+    for rel in owned:
+        assert not (job_dir / rel).exists()
+    tb.execute()
+    assert 'Seeded job dir' in (job_dir / 'toolbox.log').read_text()
+    for rel in owned:
+        assert (previous / rel).read_text() == 'previous run'
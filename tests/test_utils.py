@@ -7,6 +7,11 @@
 
 # Imports - standard library
 from pathlib import Path
+import sys
+import asyncio
+import subprocess
+import json
+import importlib
 
 # Imports - 3rd party packages
 import pytest
@@ -16,6 +21,8 @@ from toolbox.toolbox import ToolBox, ToolBoxParams
 from toolbox.utils import *
 from toolbox.logger import LogLevel, LoggerParams
 from toolbox.dot_dict import DotDict, DictError
+from toolbox.events import EventLog
+from toolbox.tool import Tool
 
 
 def test_bin_driver():
@@ -60,3 +67,187 @@ def test_list_of_file_and_dir_check():
     d = check_dirs([str(f[0].parent), str(f[1].parent)])
     print(f"Directories [True]: {d}")
     assert (d is not None and len(d) == 2)
+
+
+def test_bin_driver_concurrent():
+    """Checks that binaries run concurrently and stream their output"""
+    lines = []
+    drivers = []
+    for i in range(4):
+        binary = BinaryDriver(sys.executable)
+        binary.add_option(flag='-c', value=f'print({i}); print({i})')
+        drivers.append(binary)
+    codes = execute_concurrently(drivers,
+                                 max_jobs=2,
+                                 log=lambda msg, level: lines.append(msg))
+    assert codes == [0, 0, 0, 0]
+    assert len(lines) == 8
+    assert f"[{Path(sys.executable).name}] 3" in lines
+
+
+def test_bin_driver_timeout_and_failure():
+    """Checks that timeouts and failures are reported"""
+    slow = BinaryDriver(sys.executable)
+    slow.add_option(flag='-c', value='import time; time.sleep(10)')
+    fail = BinaryDriver(sys.executable)
+    fail.add_option(flag='-c', value='raise SystemExit(3)')
+    with pytest.raises(asyncio.TimeoutError):
+        execute_concurrently([slow], timeout=0.1)
+    results = execute_concurrently([fail], fail_fast=False)
+    assert isinstance(results[0], subprocess.CalledProcessError)
+    assert results[0].returncode == 3
+
+
+def test_bin_driver_log_and_metrics(tmp_path):
+    """Checks that output goes to a log file and metrics are recorded"""
+    metrics = tmp_path / 'metrics.jsonl'
+    binary = BinaryDriver(sys.executable)
+    binary.add_option(flag='-c',
+                      value='for i in range(1000): print(i)\nexit(2)')
+    with pytest.raises(BinaryError) as err:
+        binary.execute(log_dir=str(tmp_path / 'logs'),
+                       metrics_file=str(metrics))
+    assert err.value.returncode == 2
+    assert err.value.output.splitlines()[-1] == '999'
+    assert len(err.value.output.splitlines()) == TAIL_LINES
+    assert len(Path(err.value.log_file).read_text().splitlines()) == 1000
+    record = json.loads(metrics.read_text())
+    assert record["returncode"] == 2 and record["max_rss_kb"] > 0
+
+
+
+def test_bin_driver_tool_defaults(tmp_path):
+    """Checks that binaries run by a tool (sync or async) are logged and
+    measured in its job dir by default
+    """
+    class ToolBinary(Tool, BinaryDriver):
+        def __init__(self):
+            BinaryDriver.__init__(self, sys.executable)
+
+        def get_db(self, dot_str: str):
+            return {"internal.job_dir": str(tmp_path)}[dot_str]
+
+        def steps(self):
+            return []
+
+    tool = ToolBinary()
+    tool.add_option(flag='-c', value='for i in range(1000): print(i)\nexit(2)')
+    lines = []
+    results = execute_concurrently([tool],
+                                   log=lambda msg, level: lines.append(msg),
+                                   fail_fast=False)
+    with pytest.raises(BinaryError) as err:
+        tool.execute()
+    for error in (results[0], err.value):
+        assert isinstance(error, BinaryError) and error.returncode == 2
+        assert Path(error.log_file).parent == tmp_path / 'logs' / 'ToolBinary'
+        assert len(Path(error.log_file).read_text().splitlines()) == 1000
+        assert error.output.splitlines()[-1] == '999'
+        assert len(error.output.splitlines()) == TAIL_LINES
+    assert len(lines) == 1000
+    records = [json.loads(r) for r in
+               (tmp_path / 'ToolBinary.metrics.jsonl').read_text().splitlines()]
+    assert len(records) == 2
+    assert all(r["returncode"] == 2 and r["max_rss_kb"] > 0 for r in records)
+
+def test_bin_driver_trace(tmp_path):
+    """Checks that children are recorded in the active event log and get a
+    track of their own in the trace
+    """
+    events = EventLog(tmp_path / 'events.jsonl')
+    events.activate()
+    try:
+        binary = BinaryDriver(sys.executable)
+        binary.add_option(flag='-c', value='pass')
+        binary.execute()
+        execute_concurrently([binary, binary])
+        events.flush()
+    finally:
+        EventLog(None).activate()
+    events.write_trace(tmp_path / 'trace.json')
+    trace = json.loads((tmp_path / 'trace.json').read_text())["traceEvents"]
+    spans = [e for e in trace if e["ph"] == "X"]
+    assert len(spans) == 3
+    assert len({e["tid"] for e in spans}) == 3
+    assert all(e["args"]["returncode"] == 0 for e in spans)
+    names = [e["args"]["name"] for e in trace if e["ph"] == "M"]
+    assert all(n.startswith(Path(sys.executable).name) for n in names)
+
+
+def test_resolve_cache(tmp_path):
+    """Checks that existing paths are memoized until the cache is cleared
+    and that missing paths are checked again
+    """
+    (tmp_path / 'a').write_text('a')
+    (tmp_path / 'b').write_text('b')
+    link = tmp_path / 'link'
+    link.symlink_to(tmp_path / 'a')
+    clear_resolve_cache()
+    assert resolve_path(str(link)) == tmp_path / 'a'
+    link.unlink()
+    link.symlink_to(tmp_path / 'b')
+    assert resolve_path(str(link)) == tmp_path / 'a'
+    clear_resolve_cache()
+    assert resolve_path(str(link)) == tmp_path / 'b'
+    missing = tmp_path / 'missing'
+    assert check_file(str(missing)) is None
+    missing.write_text('')
+    assert check_file(str(missing)) == missing
+    assert check_dir(str(missing)) is None
+    paths = [str(link), str(tmp_path / 'a')] * RESOLVE_BATCH
+    assert resolve_paths(paths) == [Path(p).resolve() for p in paths]
+    clear_resolve_cache()
+
+
+def test_clone_tree(tmp_path):
+    """Checks that trees are cloned w/ links or copies, keeping symlinks and
+    existing files and leaving out excluded paths
+    """
+    src = tmp_path / 'src'
+    (src / 'sub' / 'deep').mkdir(parents=True)
+    (src / 'a.txt').write_text('a')
+    (src / 'sub' / 'deep' / 'b.txt').write_text('b')
+    (src / 'skip.log').write_text('skip')
+    (src / 'link').symlink_to('a.txt')
+    counts = clone_tree(str(src), str(tmp_path / 'linked'),
+                        exclude=lambda rel: rel == 'skip.log')
+    assert sum(counts.values()) == 2 and "copy" not in counts
+    assert (tmp_path / 'linked' / 'sub' / 'deep' / 'b.txt').read_text() == 'b'
+    assert os.readlink(tmp_path / 'linked' / 'link') == 'a.txt'
+    assert not (tmp_path / 'linked' / 'skip.log').exists()
+    shared = tmp_path / 'linked' / 'a.txt'
+    if counts.get("hardlink"):
+        assert shared.stat().st_nlink == 2
+    unshare_file(str(shared))
+    with open(shared, 'a') as fp:
+        fp.write('b')
+    assert shared.stat().st_nlink == 1
+    assert (src / 'a.txt').read_text() == 'a'
+    dst = tmp_path / 'copied'
+    dst.mkdir()
+    (dst / 'a.txt').write_text('kept')
+    counts = clone_tree(str(src), str(dst), hardlink=False)
+    assert sum(counts.values()) == 2 and "hardlink" not in counts
+    assert (dst / 'a.txt').read_text() == 'kept'
+    (dst / 'skip.log').write_text('changed')
+    assert (src / 'skip.log').read_text() == 'skip'
+
+
+def test_use_tool_path(tmp_path, monkeypatch):
+    """Checks that a tool is imported from the path in use even if a tool
+    of the same name was imported from another path before
+    """
+    monkeypatch.setattr(sys, "path", list(sys.path))
+    for checkout in ('a', 'b'):
+        tool_dir = tmp_path / checkout / 'tool_synth'
+        tool_dir.mkdir(parents=True)
+        (tool_dir / '__init__.py').write_text(f'CHECKOUT = "{checkout}"')
+        (tool_dir / 'sub.py').write_text(f'CHECKOUT = "{checkout}"')
+    try:
+        for checkout in ('a', 'b', 'a'):
+            use_tool_path(str(tmp_path / checkout / 'tool_synth'))
+            assert importlib.import_module('tool_synth').CHECKOUT == checkout
+            assert importlib.import_module(
+                'tool_synth.sub').CHECKOUT == checkout
+    finally:
+        unload_modules(str(tmp_path))
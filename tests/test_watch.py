@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Docstring for module test_watch"""
+
+# Imports - standard library
+from pathlib import Path
+import threading
+import time
+
+# Imports - 3rd party packages
+import pytest
+
+# Imports - local source
+from toolbox.toolbox import ToolBox, ToolBoxParams
+from toolbox.logger import LogLevel, LoggerParams
+from toolbox.watch import PollingWatcher, InotifyWatcher
+
+MOCK_DIR = Path(__file__).resolve().parent / 'mock'
+
+
+def modify_later(fname: Path) -> None:
+    """Modifies file from another thread after a short delay"""
+    def modify():
+        time.sleep(0.3)
+        fname.write_text("changed: true")
+
+    threading.Thread(target=modify).start()
+
+
+@pytest.mark.parametrize("watcher", [
+    PollingWatcher(interval=0.1),
+    pytest.param(InotifyWatcher() if InotifyWatcher.available() else None,
+                 marks=pytest.mark.skipif(not InotifyWatcher.available(),
+                                          reason="inotify not available"))
+])
+def test_watcher(tmp_path, watcher):
+    """Checks that modified files are reported"""
+    a, b = tmp_path / 'a.yml', tmp_path / 'b.yml'
+    a.write_text("a: 0")
+    b.write_text("b: 0")
+    modify_later(b)
+    assert watcher.wait([str(a), str(b)]) == {str(b)}
+
+
+def test_reload_database(tmp_path):
+    """Checks that watched files are found and changes are reloaded"""
+    config = tmp_path / 'config.yml'
+    config.write_text("tool_a.property1: 1")
+    args = ToolBoxParams(build_dir=str(tmp_path / 'build'),
+                         symlink=None,
+                         config=[
+                             f'{MOCK_DIR}/basic/tools.yml',
+                             f'{MOCK_DIR}/basic/job.yml',
+                             str(config)
+                         ],
+                         out_fname="toolbox.log",
+                         log_params=LoggerParams(LogLevel.DEBUG),
+                         job='example_job',
+                         watch=True)
+    tb = ToolBox(args)
+    files = tb.watched_files()
+    assert str(config.resolve()) in files
+    assert str(MOCK_DIR / 'basic' / 'tool_a' / '__init__.py') in files
+    config.write_text("tool_a.property1: 2")
+    tb.reload_database()
+    assert tb.get_db("tool_a.property1") == 2
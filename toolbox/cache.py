@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Content addressed cache for the outputs of deterministic steps"""
+
+# Imports - standard library
+from dataclasses import dataclass
+from typing import Tuple, List, Optional
+from pathlib import Path
+import os
+import json
+import stat
+import shutil
+import tempfile
+
+# Imports - 3rd party packages
+
+# Imports - local source
+from .utils import hash_file
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'toolbox')
+DEFAULT_CACHE_SIZE = 10 * 1024  # MB
+
+
+class CacheError(Exception):
+    """Error for step cache"""
+    pass
+
+
+@dataclass(frozen=True)
+class CacheSpec:
+    """Declared inputs and outputs of a cached step
+    :param outputs Output files/dirs relative to internal.job_dir
+    :param inputs Database dot strings (subtrees) the step depends on
+    :param files Files the step depends on
+    """
+    outputs: Tuple[str, ...]
+    inputs: Tuple[str, ...] = ()
+    files: Tuple[str, ...] = ()
+
+
+class StepCache:
+    """Local content addressed store of step outputs
+    objects/ holds files named by the hash of their contents and entries/
+    holds one json file per step key mapping output paths to objects. The
+    mtime of an entry is its last use and is used for LRU eviction.
+    """
+    def __init__(self,
+                 directory: str = DEFAULT_CACHE_DIR,
+                 max_size: int = DEFAULT_CACHE_SIZE,
+                 hardlink: bool = False):
+        """
+        :param directory Location of the store
+        :param max_size Size limit of the store in MB
+        :param hardlink Restore outputs w/ hardlinks instead of copies
+        """
+        self.directory = Path(directory).expanduser().resolve()
+        self.max_size = max_size * 1024 * 1024
+        self.hardlink = hardlink
+        self.objects_dir = self.directory / 'objects'
+        self.entries_dir = self.directory / 'entries'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, digest: str) -> Path:
+        """Returns location of object with given digest"""
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    def entry_path(self, key: str) -> Path:
+        """Returns location of entry with given key"""
+        return self.entries_dir / f'{key}.json'
+
+    def restore(self, key: str, job_dir: str) -> bool:
+        """Restores cached outputs for key into job_dir
+        :return True on a cache hit
+        """
+        entry = self.entry_path(key)
+        try:
+            with open(entry, 'r') as fp:
+                data = json.load(fp)
+            outputs, modes = data["outputs"], data.get("modes", {})
+        except (FileNotFoundError, ValueError, KeyError):
+            return False
+        objects = [self.object_path(d) for d in outputs.values()]
+        if not all(o.is_file() for o in objects):
+            return False
+        for rel_path, obj in zip(outputs.keys(), objects):
+            dest = Path(job_dir) / rel_path
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if dest.exists() or dest.is_symlink():
+                dest.unlink()
+            if self.hardlink:
+                try:
+                    os.link(obj, dest)
+                    continue
+                except OSError:
+                    pass
+            shutil.copyfile(str(obj), str(dest))
+            if rel_path in modes:
+                os.chmod(dest, modes[rel_path])
+        os.utime(entry)
+        return True
+
+    def store(self, key: str, job_dir: str, outputs: List[str]) -> None:
+        """Stores outputs (relative to job_dir) of a step under key"""
+        files = {}
+        for output in outputs:
+            path = Path(job_dir) / output
+            if path.is_dir():
+                for f in sorted(p for p in path.rglob('*') if p.is_file()):
+                    files[str(f.relative_to(job_dir))] = f
+            elif path.is_file():
+                files[output] = path
+            else:
+                raise CacheError(f'Cached output "{path}" was not created.')
+        entry = {"outputs": {}, "modes": {}}
+        for rel_path, path in files.items():
+            digest = hash_file(str(path))
+            mode = stat.S_IMODE(path.stat().st_mode)
+            obj = self.object_path(digest)
+            if not obj.is_file():
+                obj.parent.mkdir(parents=True, exist_ok=True)
+                self._atomic_copy(path, obj, mode)
+            entry["outputs"][rel_path] = digest
+            entry["modes"][rel_path] = mode
+        with tempfile.NamedTemporaryFile('w',
+                                         dir=self.entries_dir,
+                                         delete=False) as fp:
+            json.dump(entry, fp)
+        os.replace(fp.name, self.entry_path(key))
+        self.prune()
+
+    def _atomic_copy(self, src: Path, dest: Path, mode: int) -> None:
+        """Copies file so that dest is never partially written
+        Objects are read-only but keep the execute bits of src (hardlinks)
+        """
+        fd, tmp = tempfile.mkstemp(dir=dest.parent)
+        os.close(fd)
+        shutil.copy(str(src), tmp)
+        os.chmod(tmp, 0o444 | (mode & 0o111))
+        os.replace(tmp, dest)
+
+    def entries(self) -> List[Path]:
+        """Returns all entries from least to most recently used"""
+        return sorted(self.entries_dir.glob('*.json'),
+                      key=lambda e: e.stat().st_mtime)
+
+    def objects(self) -> List[Path]:
+        """Returns all objects in the store"""
+        return [o for o in self.objects_dir.glob('*/*') if o.is_file()]
+
+    def size(self) -> int:
+        """Returns the size of all objects in bytes"""
+        return sum(o.stat().st_size for o in self.objects())
+
+    def stats(self) -> dict:
+        """Returns basic statistics of the store"""
+        return {
+            "directory": str(self.directory),
+            "entries": len(self.entries()),
+            "objects": len(self.objects()),
+            "size": self.size(),
+            "max_size": self.max_size
+        }
+
+    def prune(self, max_size: Optional[int] = None) -> int:
+        """Evicts least recently used entries until store fits in max_size
+        :param max_size Size limit in MB (defaults to the limit of the store)
+        :return Number of evicted entries
+        """
+        limit = self.max_size if max_size is None else max_size * 1024 * 1024
+        sizes = {
+            o.parent.name + o.name: o.stat().st_size
+            for o in self.objects()
+        }
+        size = sum(sizes.values())
+        if size <= limit:
+            return 0
+        entries = [(e, self._entry_objects(e)) for e in self.entries()]
+        refs = {}
+        for _, digests in entries:
+            for d in digests:
+                refs[d] = refs.get(d, 0) + 1
+        evicted = 0
+        for entry, digests in entries:
+            if size <= limit:
+                break
+            entry.unlink()
+            evicted += 1
+            for d in digests:
+                refs[d] -= 1
+                if refs[d] == 0:
+                    size -= sizes.get(d, 0)
+        self.collect_garbage()
+        return evicted
+
+    def _entry_objects(self, entry: Path) -> set:
+        """Returns the digests of all objects referenced by an entry"""
+        try:
+            with open(entry, 'r') as fp:
+                return set(json.load(fp)["outputs"].values())
+        except (FileNotFoundError, ValueError, KeyError):
+            return set()
+
+    def collect_garbage(self) -> None:
+        """Removes all objects that are not referenced by an entry"""
+        referenced = set()
+        for entry in self.entries():
+            referenced.update(self._entry_objects(entry))
+        for obj in self.objects():
+            if obj.parent.name + obj.name not in referenced:
+                obj.unlink()
+
+    def clear(self) -> None:
+        """Removes everything from the store"""
+        for entry in self.entries():
+            entry.unlink()
+        self.collect_garbage()
@@ -8,17 +8,23 @@
 # Imports - standard library
 import argparse
 from dataclasses import dataclass
+from typing import List, Optional
+import sys
 
 # Imports - 3rd party packages
 
 # Imports - local source
 from .toolbox import ToolBox, ToolBoxParams
 from .logger import LogLevel, LoggerParams
+from .cache import StepCache, DEFAULT_CACHE_DIR
+from .daemon import ToolBoxDaemon
+from .profiler import PROFILE_MODES
 
 
 class ToolBoxCLIDriver:
     """Command line driver for pyproject invocation"""
-    def parse_args(self) -> argparse.Namespace:
+    def parse_args(self,
+                   argv: Optional[List[str]] = None) -> argparse.Namespace:
         ''' Parse arguments for PyProjectCLIDriver CLI Driver'''
         parser = argparse.ArgumentParser(description="Runs jobs using tools")
         parser.add_argument('job',
@@ -57,11 +63,172 @@ class ToolBoxCLIDriver:
             '--output',
             default='toolbox',
             help='Specifies the log filename. Default: toolbox.log')
-        return parser.parse_args()
+        parser.add_argument(
+            '-f',
+            '--force',
+            action='store_true',
+            help='Runs all tasks even if their inputs have not changed.')
+        parser.add_argument(
+            '-d',
+            '--distribute',
+            metavar='ADDRESS',
+            help=
+            'Publishes the tasks of the job on ADDRESS (host:port or unix socket) for "toolbox-cli worker" processes. Workers authenticate w/ TOOLBOX_AUTHKEY (a random key is generated if unset).'
+        )
+        parser.add_argument(
+            '-w',
+            '--watch',
+            action='store_true',
+            help='Reruns the tasks of the job whenever their inputs change.')
+        parser.add_argument(
+            '-i',
+            '--isolation',
+            default='copy',
+            choices=('copy', 'fork'),
+            help=
+            'Specifies how tasks are isolated from each other. "copy" restores a copy of the database after each task. "fork" runs each task in a forked process. Default: copy'
+        )
+        parser.add_argument(
+            '-j',
+            '--jobs',
+            type=int,
+            default=1,
+            help=
+            'Specifies the maximum number of tasks run concurrently (each in a forked process). Default: 1'
+        )
+        parser.add_argument(
+            '--cpus',
+            type=int,
+            help=
+            'Specifies the cpus shared by concurrent tasks. Default: detected')
+        parser.add_argument(
+            '--memory',
+            type=float,
+            help=
+            'Specifies the memory (GB) shared by concurrent tasks. Default: detected'
+        )
+        parser.add_argument(
+            '--profile',
+            nargs='?',
+            const='cprofile',
+            choices=PROFILE_MODES,
+            help=
+            'Profiles each phase, task and step into the "profile" directory of the job (*.pstats and summary.txt). "sample" samples the stack instead (cheap enough to leave on). Default: cprofile'
+        )
+        parser.add_argument(
+            '--trace',
+            action='store_true',
+            help=
+            'Writes trace.json (Chrome trace event format, see Perfetto) w/ the populate phases, tasks, steps and binaries of the job to its directory.'
+        )
+        parser.add_argument(
+            '--memprofile',
+            action='store_true',
+            help=
+            'Snapshots memory (tracemalloc) after every config load, load of the tools, resolution, validation and before/after every task. Top allocation sites, changes and peak rss per phase are written to profile/memory.txt in the job directory.'
+        )
+        parser.add_argument(
+            '--no-daemon',
+            action='store_true',
+            help='Runs job in this process even if a daemon is running.')
+        return parser.parse_args(argv)
+
+    def parse_serve_args(self, argv: List[str]) -> argparse.Namespace:
+        ''' Parse arguments for serve subcommand'''
+        parser = argparse.ArgumentParser(
+            prog="toolbox-cli serve",
+            description=
+            "Starts a daemon that toolbox-cli forwards invocations to")
+        parser.add_argument(
+            '-s',
+            '--socket',
+            help='Specifies the unix socket. Default: $TOOLBOX_DAEMON_SOCKET'
+        )
+        return parser.parse_args(argv)
+
+    def serve_main(self, argv: List[str]) -> None:
+        """Runs serve subcommand"""
+        args = self.parse_serve_args(argv)
+        ToolBoxDaemon(self.run, args.socket).serve()
+
+    def parse_worker_args(self, argv: List[str]) -> argparse.Namespace:
+        ''' Parse arguments for worker subcommand'''
+        parser = argparse.ArgumentParser(
+            prog="toolbox-cli worker",
+            description="Runs tasks published by toolbox-cli --distribute")
+        parser.add_argument(
+            'address',
+            help='Specifies address (host:port or unix socket) of the job.')
+        parser.add_argument('-co',
+                            '--color',
+                            action='store_true',
+                            help='Adds simple color to logs.')
+        parser.add_argument(
+            '-l',
+            '--log-level',
+            default='info',
+            choices=('notset', 'info', 'debug', 'warning', 'error',
+                     'critical'),
+            help='Specifies the global logging level. Default: info')
+        return parser.parse_args(argv)
+
+    def worker_main(self, argv: List[str]) -> None:
+        """Runs worker subcommand"""
+        args = self.parse_worker_args(argv)
+        log_params = LoggerParams(
+            level=LogLevel[(args.log_level).upper()],
+            formatter=
+            "[worker] {begin_color}[%(levelname)s]{stop_color} %(message)s",
+            color=args.color)
+        ToolBox.work(args.address, log_params)
+
+    def parse_cache_args(self, argv: List[str]) -> argparse.Namespace:
+        ''' Parse arguments for cache subcommand'''
+        parser = argparse.ArgumentParser(
+            prog="toolbox-cli cache",
+            description="Shows statistics of and prunes the step cache")
+        parser.add_argument('action',
+                            choices=('stats', 'prune', 'clear'),
+                            help='Specifies cache action to be executed.')
+        parser.add_argument(
+            '-d',
+            '--dir',
+            default=DEFAULT_CACHE_DIR,
+            help=f'Specifies the cache directory. Default: {DEFAULT_CACHE_DIR}'
+        )
+        parser.add_argument(
+            '-s',
+            '--max-size',
+            type=int,
+            help='Size limit (MB) used when pruning. Default: 10240')
+        return parser.parse_args(argv)
+
+    def cache_main(self, argv: List[str]) -> None:
+        """Runs cache subcommand"""
+        args = self.parse_cache_args(argv)
+        cache = StepCache(args.dir)
+        if args.action == 'prune':
+            print(f"Evicted {cache.prune(args.max_size)} entries")
+        elif args.action == 'clear':
+            cache.clear()
+        for k, v in cache.stats().items():
+            print(f"{k}: {v}")
 
     def main(self) -> None:
         """Creates project manager and launches job"""
-        args = self.parse_args()
+        subcommands = {
+            'cache': self.cache_main,
+            'worker': self.worker_main,
+            'serve': self.serve_main
+        }
+        if sys.argv[1:2] and sys.argv[1] in subcommands:
+            subcommands[sys.argv[1]](sys.argv[2:])
+            return
+        self.run(sys.argv[1:])
+
+    def run(self, argv: List[str]) -> ToolBox:
+        """Creates project manager from argv and launches job"""
+        args = self.parse_args(argv)
         log_params = LoggerParams(
             level=LogLevel[(args.log_level).upper()],
             out_fname=args.output + '.log',
@@ -69,9 +236,17 @@ class ToolBoxCLIDriver:
             "[toolbox] {begin_color}[%(levelname)s]{stop_color} %(message)s",
             color=args.color)
         tb_args = ToolBoxParams(args.build_dir, args.symlink, args.config,
-                                log_params, args.output, args.job)
+                                log_params, args.output, args.job,
+                                args.force, args.distribute, args.watch,
+                                args.isolation, args.jobs, args.cpus,
+                                args.memory, args.profile, args.trace,
+                                args.memprofile)
         tb = ToolBox(tb_args)
-        tb.execute()
+        if args.watch:
+            tb.watch()
+        else:
+            tb.execute()
+        return tb
 
 
 if __name__ == '__main__':
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Long lived toolbox process that runs forwarded toolbox-cli invocations"""
+
+# Imports - standard library
+from typing import Callable, List, Optional, Any
+from pathlib import Path
+import os
+import sys
+import json
+import atexit
+import signal
+import socket
+import struct
+import threading
+import importlib
+import selectors
+import traceback
+
+# Imports - 3rd party packages
+
+# Imports - local source
+from .utils import YamaleValidator, load_yaml, unlink_missing_ok
+from .utils import dir_signature, unload_modules, use_tool_path
+from .daemon_client import socket_path, recv_exactly, peer_uid
+
+
+class ToolBoxDaemon:
+    """Runs every request in a child forked from a warm parent process
+    After each request the parent parses the configs, tool.yml files and
+    schemas the child used and imports its tools so that the next child
+    starts w/ them. Configs and schemas are dropped from the caches when
+    they change on disk (see FileCache), tool modules when their sources do.
+    """
+    def __init__(self,
+                 run: Callable[[List[str]], Any],
+                 path: Optional[str] = None):
+        """
+        :param run Runs "toolbox-cli argv" and returns the ToolBox
+        :param path Socket to listen on
+        """
+        self.run = run
+        self.path = path or socket_path()
+        self.tool_signatures = {}
+
+    def serve(self) -> None:
+        """Accepts requests (of the same user) until interrupted"""
+        unlink_missing_ok(Path(self.path))
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        os.chmod(self.path, 0o600)
+        server.listen()
+        sel = selectors.DefaultSelector()
+        sel.register(server, selectors.EVENT_READ, None)
+        print(f'toolbox daemon listening on "{self.path}"', flush=True)
+        try:
+            while True:
+                for key, _ in sel.select():
+                    if key.data is None:
+                        conn, _ = server.accept()
+                        if peer_uid(conn) not in (None, os.getuid()):
+                            conn.close()
+                            continue
+                        pid, rfd = self.spawn(server, conn)
+                        sel.register(rfd, selectors.EVENT_READ, pid)
+                    else:
+                        sel.unregister(key.fd)
+                        self.collect(key.fd, key.data)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            unlink_missing_ok(Path(self.path))
+
+    def spawn(self, server: socket.socket, conn: socket.socket) -> tuple:
+        """Forks a child that handles the request on conn
+        :return pid of child and pipe that child reports used files on
+        """
+        self.invalidate_tools()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            # Own process group so that the request (w/ its forked tasks and
+            # binaries) can be interrupted as a whole (see watch_client)
+            os.setpgid(0, 0)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            os.close(rfd)
+            server.close()
+            os._exit(self.handle(conn, wfd))
+        os.close(wfd)
+        conn.close()
+        return pid, rfd
+
+    def handle(self, conn: socket.socket, wfd: int) -> int:
+        """Runs request in child process
+        :return Exit code of request
+        """
+        msg, fds, _, _ = socket.recv_fds(conn, 8, 3)
+        payload = json.loads(recv_exactly(conn, struct.unpack('!Q', msg)[0]))
+        for fd, target in zip(fds, (0, 1, 2)):
+            os.dup2(fd, target)
+            os.close(fd)
+        os.chdir(payload["cwd"])
+        os.environ.clear()
+        os.environ.update(payload["env"])
+        sys.argv = ['toolbox-cli'] + payload["argv"]
+        done = threading.Event()
+        threading.Thread(target=self.watch_client,
+                         args=(conn, done),
+                         daemon=True).start()
+        code, tb = 0, None
+        try:
+            tb = self.run(payload["argv"])
+        except SystemExit as err:
+            code = err.code if isinstance(err.code, int) else int(
+                err.code is not None)
+        except KeyboardInterrupt:
+            code = 128 + signal.SIGINT
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        done.set()
+        try:
+            atexit._run_exitfuncs()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        if tb is not None:
+            used = {
+                "configs": sorted(tb.loaded_configs),
+                "tools": [
+                    t["path"] for t in tb.get_db("internal.tools").values()
+                ],
+                "schemas": [
+                    os.path.join(tb.get_db("internal.home_dir"),
+                                 "toolbox/schemas", s)
+                    for s in ("toolbox.yml", "tool.yml")
+                ]
+            }
+            os.write(wfd, json.dumps(used).encode())
+        os.close(wfd)
+        try:
+            conn.sendall(struct.pack('!i', code))
+        except OSError:
+            pass  # Client is gone (see watch_client)
+        conn.close()
+        return code
+
+    @staticmethod
+    def watch_client(conn: socket.socket, done: threading.Event) -> None:
+        """Interrupts the request (SIGINT to its process group) once the
+        client is gone (e.g. Ctrl-C or kill) before the request is done
+        """
+        try:
+            while conn.recv(1):
+                pass
+        except OSError:
+            pass
+        if not done.is_set():
+            os.killpg(os.getpgid(0), signal.SIGINT)
+
+    def collect(self, rfd: int, pid: int) -> None:
+        """Reaps child and warms up caches w/ the files it used"""
+        data = b''
+        while True:
+            chunk = os.read(rfd, 1 << 16)
+            if not chunk:
+                break
+            data += chunk
+        os.close(rfd)
+        _, status = os.waitpid(pid, 0)
+        print(f"Served request (exit code "
+              f"{os.waitstatus_to_exitcode(status)})",
+              flush=True)
+        if data:
+            self.warm(json.loads(data))
+
+    def warm(self, used: dict) -> None:
+        """Parses configs/schemas and imports tools in the parent"""
+        schema, tool_schema = used["schemas"]
+        for fname in used["configs"]:
+            self.try_warm(load_yaml, fname)
+        for path in used["tools"]:
+            self.try_warm(YamaleValidator.validate_files,
+                          os.path.join(path, "tool.yml"), tool_schema)
+            if path not in self.tool_signatures:
+                self.tool_signatures[path] = dir_signature(path)
+            use_tool_path(path)
+            self.try_warm(importlib.import_module, Path(path).stem)
+        self.try_warm(YamaleValidator.make_schema, schema)
+
+    @staticmethod
+    def try_warm(fn: Callable, *args: Any) -> None:
+        """Warming is best effort. Errors are reported by the next request"""
+        try:
+            fn(*args)
+        except Exception:
+            pass
+
+    def invalidate_tools(self) -> None:
+        """Unloads tool modules whose source changed"""
+        for path, signature in list(self.tool_signatures.items()):
+            if os.path.isdir(path) and dir_signature(path) == signature:
+                continue
+            del self.tool_signatures[path]
+            unload_modules(path)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Thin client that forwards toolbox-cli invocations to a running daemon
+Only uses the standard library so that forwarding stays cheap
+"""
+
+# Imports - standard library
+from typing import List, Optional
+import os
+import sys
+import stat
+import signal
+import json
+import socket
+import struct
+import tempfile
+
+# Imports - 3rd party packages
+
+# Imports - local source
+
+LOCAL_ONLY = ('serve', 'worker', 'cache', '--no-daemon', '-h', '--help')
+
+
+def socket_path() -> str:
+    """Returns socket of the daemon (TOOLBOX_DAEMON_SOCKET)
+    Defaults to the user's runtime directory (XDG_RUNTIME_DIR) if it exists
+    """
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        default = os.path.join(runtime_dir, "toolbox.sock")
+    else:
+        default = os.path.join(tempfile.gettempdir(),
+                               f"toolbox-{os.getuid()}.sock")
+    return os.getenv("TOOLBOX_DAEMON_SOCKET", default)
+
+
+def peer_uid(sock: socket.socket) -> Optional[int]:
+    """Returns uid of the process on the other end of a unix socket
+    None if the platform has no SO_PEERCRED
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                            struct.calcsize('3i'))
+    return struct.unpack('3i', creds)[1]
+
+
+def owned_socket(path: str) -> bool:
+    """True if path is a socket owned by this user (not planted by others)"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """Receives size bytes (less if connection is closed)"""
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            break
+        data += chunk
+    return data
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """Runs "toolbox-cli argv" in the daemon w/ this process' stdio
+    The environment and stdio are only sent to a daemon of the same user.
+    The daemon interrupts the request once this process exits (e.g. Ctrl-C).
+    :return Exit code or None if invocation must run locally
+    """
+    if not argv or any(a in LOCAL_ONLY for a in argv):
+        return None
+    path = socket_path()
+    if not owned_socket(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    if peer_uid(sock) not in (None, os.getuid()):
+        sock.close()
+        return None
+    with sock:
+        payload = json.dumps({
+            "argv": argv,
+            "cwd": os.getcwd(),
+            "env": dict(os.environ)
+        }).encode()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        socket.send_fds(sock, [struct.pack('!Q', len(payload))], [0, 1, 2])
+        sock.sendall(payload)
+        try:
+            reply = recv_exactly(sock, 4)
+        except KeyboardInterrupt:
+            return 128 + signal.SIGINT
+    if len(reply) < 4:
+        return 1
+    return struct.unpack('!i', reply)[0]
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Distributes the tasks of a job to worker processes over a socket"""
+
+# Imports - standard library
+from typing import Any, Callable, List, Union, Tuple, Optional
+from multiprocessing.connection import Listener, Client, Connection
+from multiprocessing import AuthenticationError
+from pathlib import Path
+import os
+import sys
+import queue
+import secrets
+import pickle
+import logging
+import time
+import itertools
+import threading
+import traceback
+
+# Imports - 3rd party packages
+
+# Imports - local source
+from .logger import LogLevel
+from .utils import unlink_missing_ok
+
+
+
+class DistributedError(Exception):
+    """Error for task servers and workers"""
+    pass
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """Converts "host:port" to a TCP address. Anything else is a unix socket"""
+    if ':' in address and '/' not in address:
+        host, port = address.rsplit(':', 1)
+        return (host or 'localhost', int(port))
+    return address
+
+
+def get_authkey(authkey: Optional[str] = None) -> Optional[bytes]:
+    """Returns authkey shared by server and workers (TOOLBOX_AUTHKEY)"""
+    authkey = authkey or os.getenv("TOOLBOX_AUTHKEY")
+    return authkey.encode() if authkey else None
+
+
+def key_file(address: str) -> Path:
+    """Returns file that a server on a unix socket stores its authkey in"""
+    return Path(f"{address}.key")
+
+
+def make_authkey(address: Union[str, Tuple[str, int]]) -> bytes:
+    """Generates a random authkey for a server w/o TOOLBOX_AUTHKEY
+    Unix socket servers store it in a file only readable by the user (see
+    key_file). TCP servers print it since workers may run on other hosts.
+    """
+    authkey = secrets.token_hex(16)
+    if isinstance(address, str):
+        fname = key_file(address)
+        unlink_missing_ok(fname)
+        fd = os.open(fname, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w') as fp:
+            fp.write(authkey)
+    else:
+        print(f"Start workers w/ TOOLBOX_AUTHKEY={authkey}",
+              file=sys.stderr,
+              flush=True)
+    return authkey.encode()
+
+
+class TaskServer:
+    """Publishes the tasks of a job and collects their results
+    Protocol (pickled dicts):
+      worker -> server: {"type": "ready"}
+      server -> worker: {"type": "task", ...} or {"type": "done"}
+      worker -> server: {"type": "log", ...}* then {"type": "result", ...}
+    Tasks of workers that disconnect are handed to the next worker.
+    """
+    def __init__(self,
+                 address: str,
+                 snapshot: Any,
+                 tasks: List[Any],
+                 log: Callable[[str, LogLevel], None],
+                 authkey: Optional[str] = None):
+        """
+        :param address host:port or path of a unix socket
+        :param snapshot Database that workers run the tasks with
+        :param tasks Tasks to be published
+        :param log Log function for worker logs and status
+        """
+        address = parse_address(address)
+        if isinstance(address, str):
+            unlink_missing_ok(Path(address))
+        self.address = address
+        self.listener = Listener(address,
+                                 authkey=get_authkey(authkey)
+                                 or make_authkey(address))
+        self.snapshot = pickle.dumps(snapshot)
+        self.log = log
+        self.num_tasks = len(tasks)
+        self.pending = queue.Queue()
+        for i, task in enumerate(tasks):
+            self.pending.put((i, task))
+        self.results = {}
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.worker_ids = itertools.count()
+
+    def serve(self) -> dict:
+        """Blocks until every task has been run by a worker
+        :return Dictionary mapping task index to error (None on success)
+        """
+        if self.num_tasks:
+            threading.Thread(target=self._accept, daemon=True).start()
+            self.done.wait()
+        self.listener.close()
+        if isinstance(self.address, str):
+            unlink_missing_ok(key_file(self.address))
+        return self.results
+
+    def _accept(self) -> None:
+        """Accepts workers until all tasks are done"""
+        while not self.done.is_set():
+            try:
+                conn = self.listener.accept()
+            except (OSError, EOFError, AuthenticationError) as err:
+                if not self.done.is_set():
+                    self.log(f"Rejected worker: {err}", LogLevel.WARNING)
+                continue
+            threading.Thread(target=self._handle,
+                             args=(conn, next(self.worker_ids)),
+                             daemon=True).start()
+
+    def _next_task(self) -> Optional[Tuple[int, Any]]:
+        """Waits for a pending task. Returns None once all tasks are done"""
+        while not self.done.is_set():
+            try:
+                return self.pending.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        return None
+
+    def _handle(self, conn: Connection, worker: int) -> None:
+        """Hands out tasks to a single worker"""
+        item = None
+        try:
+            while conn.recv()["type"] == "ready":
+                item = self._next_task()
+                if item is None:
+                    conn.send({"type": "done"})
+                    break
+                index, task = item
+                self.log(f'Sending task "{task.tool}" to worker {worker}')
+                conn.send({
+                    "type": "task",
+                    "index": index,
+                    "task": task,
+                    "snapshot": self.snapshot
+                })
+                while True:
+                    msg = conn.recv()
+                    if msg["type"] == "log":
+                        self.log(f"[worker {worker}] {msg['msg']}",
+                                 LogLevel(msg["level"]))
+                    elif msg["type"] == "result":
+                        break
+                item = None
+                with self.lock:
+                    self.results[index] = msg["error"]
+                    if len(self.results) == self.num_tasks:
+                        self.done.set()
+        except (EOFError, OSError):
+            if item is not None:
+                self.log(f'Worker {worker} lost. Requeueing its task.',
+                         LogLevel.WARNING)
+                self.pending.put(item)
+        finally:
+            conn.close()
+
+
+class ConnectionHandler(logging.Handler):
+    """Forwards log records of a worker to the task server"""
+    def __init__(self, conn: Connection):
+        super().__init__()
+        self.conn = conn
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.conn.send({
+            "type": "log",
+            "level": record.levelno,
+            "msg": record.getMessage()
+        })
+
+
+class TaskWorker:
+    """Pulls tasks from a TaskServer and runs them until the job is done"""
+    def __init__(self,
+                 address: str,
+                 authkey: Optional[str] = None,
+                 connect_timeout: float = 30.0):
+        """
+        :param address host:port or path of a unix socket
+        :param connect_timeout Seconds to wait for the server to come up
+        """
+        self.address = parse_address(address)
+        self.authkey = get_authkey(authkey)
+        self.connect_timeout = connect_timeout
+
+    def get_authkey(self) -> bytes:
+        """Returns authkey (TOOLBOX_AUTHKEY or key file of a unix socket)"""
+        if self.authkey is not None:
+            return self.authkey
+        if isinstance(self.address, str) and key_file(self.address).is_file():
+            return key_file(self.address).read_text().strip().encode()
+        raise DistributedError(
+            "TOOLBOX_AUTHKEY must be set to the key printed by the server")
+
+    def connect(self) -> Connection:
+        """Connects to server (retries until connect_timeout)"""
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(self.address, authkey=self.get_authkey())
+            except (FileNotFoundError, ConnectionRefusedError,
+                    DistributedError):
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def serve(self, run: Callable[[Any, Any, int], None],
+              logger_name: str) -> int:
+        """Runs tasks until server has none left
+        :param run Function(snapshot, task, index) that runs a task
+        :param logger_name Logger whose records are sent to the server
+        :return Number of tasks run
+        """
+        conn = self.connect()
+        handler = ConnectionHandler(conn)
+        logger = logging.getLogger(logger_name)
+        logger.addHandler(handler)
+        num_run = 0
+        try:
+            while True:
+                conn.send({"type": "ready"})
+                msg = conn.recv()
+                if msg["type"] == "done":
+                    break
+                error = None
+                try:
+                    run(pickle.loads(msg["snapshot"]), msg["task"],
+                        msg["index"])
+                except Exception as err:
+                    logger.error(traceback.format_exc())
+                    error = f"{type(err).__name__}: {err}"
+                conn.send({
+                    "type": "result",
+                    "index": msg["index"],
+                    "error": error
+                })
+                num_run += 1
+        except EOFError:
+            pass
+        finally:
+            logger.removeHandler(handler)
+            conn.close()
+        return num_run
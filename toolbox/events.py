@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Machine readable event log of a job (JSON lines)"""
+
+# Imports - standard library
+from typing import Any, Optional, Iterator, List
+from pathlib import Path
+from contextlib import contextmanager
+from datetime import datetime
+import os
+import json
+import time
+import threading
+
+# Imports - 3rd party packages
+
+# Imports - local source
+
+BUFFER_SIZE = 1 << 16
+# Field that names the spans of an event in the trace (see write_trace)
+TRACE_LABELS = {
+    "populate": "phase",
+    "task": "tool",
+    "step": "step",
+    "binary": "binary"
+}
+# Event log of the running toolbox (see EventLog.activate)
+_ACTIVE: Optional['EventLog'] = None
+
+
+def active_log() -> Optional['EventLog']:
+    """Returns the event log of the running toolbox (None if there is none)"""
+    return _ACTIVE
+
+
+class EventLog:
+    """Appends one JSON object per event to a file
+    Lines are buffered and written w/ a single O_APPEND write per flush so
+    that forked tasks can share the file w/o splitting lines. Every event
+    has "time" (seconds since epoch), "event", "pid", "tid" and the fields
+    of context (job/task/tool/step). Events w/ a "duration" are spans that
+    ended at "time".
+    """
+    def __init__(self, fname: Optional[Path], **context: Any):
+        """
+        :param fname JSON lines file (appended to). Events are dropped if None
+        :param context Fields added to every event
+        """
+        self.fname = fname
+        self.context = context
+        self.lines = []
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def emit(self, event: str, **fields: Any) -> None:
+        """Adds event to buffer (written once buffer is full)"""
+        line = json.dumps(
+            {
+                "time": time.time(),
+                "event": event,
+                "pid": os.getpid(),
+                "tid": threading.get_native_id(),
+                **self.context,
+                **fields
+            },
+            default=str) + "\n"
+        with self.lock:
+            self.lines.append(line)
+            self.size += len(line)
+            if self.size >= BUFFER_SIZE:
+                self._write()
+
+    @contextmanager
+    def span(self, name: str, **fields: Any) -> Iterator[dict]:
+        """Emits "<name>_start" and "<name>_end" (w/ duration and status)
+        Fields are added to the context of all events emitted within the span
+        :yield Dictionary that is added to the end event (e.g. status)
+        """
+        outer = self.context
+        self.context = {**outer, **fields}
+        self.emit(f"{name}_start")
+        result = {"status": "success"}
+        start = time.perf_counter()
+        try:
+            yield result
+        except BaseException as err:
+            result.update(status="failed", error=f"{type(err).__name__}: {err}")
+            raise
+        finally:
+            self.emit(f"{name}_end",
+                      duration=time.perf_counter() - start,
+                      **result)
+            self.context = outer
+
+    def flush(self) -> None:
+        """Writes all buffered events"""
+        with self.lock:
+            self._write()
+
+    def activate(self) -> None:
+        """Makes this the event log returned by active_log (e.g. used by
+        BinaryDriver to record its children)
+        """
+        global _ACTIVE
+        _ACTIVE = self
+
+    def read(self) -> List[dict]:
+        """Returns events of all processes (empty if there is no file)"""
+        if self.fname is None or not os.path.isfile(self.fname):
+            return []
+        with open(self.fname, 'r') as fp:
+            return [json.loads(line) for line in fp]
+
+    def write_log(self, fname: Path) -> None:
+        """Writes log events of all processes ordered by time to fname"""
+        if self.fname is None or not os.path.isfile(self.fname):
+            return
+        records = sorted((r for r in self.read() if r["event"] == "log"),
+                         key=lambda r: r["time"])
+        with open(fname, 'w') as fp:
+            for r in records:
+                tags = "".join(f" [{r[k]}]" for k in ("job", "tool", "step")
+                               if k in r)
+                stamp = datetime.fromtimestamp(r["time"]).isoformat(
+                    sep=' ', timespec='milliseconds')
+                fp.write(f"[{stamp}] [{r['level']}]{tags} {r['msg']}\n")
+
+    def write_trace(self, fname: Path) -> None:
+        """Writes spans of all processes in Chrome trace event format (see
+        Perfetto or chrome://tracing) to fname. Every process and thread is a
+        track. Children of BinaryDriver get a track of their own.
+        """
+        trace = []
+        for r in self.read():
+            if "duration" not in r:
+                continue
+            kind = r["event"][:-len("_end")] if r["event"].endswith(
+                "_end") else r["event"]
+            label = r.get(TRACE_LABELS.get(kind))
+            args = {
+                k: v
+                for k, v in r.items()
+                if k not in ("time", "event", "pid", "tid", "duration")
+            }
+            tid = r.get("child", r.get("tid", r["pid"]))
+            trace.append({
+                "name": kind if label is None else f"{kind} {label}",
+                "cat": kind,
+                "ph": "X",
+                "ts": round((r["time"] - r["duration"]) * 1e6),
+                "dur": round(r["duration"] * 1e6),
+                "pid": r["pid"],
+                "tid": tid,
+                "args": args
+            })
+            if kind == "binary":
+                trace.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": r["pid"],
+                    "tid": tid,
+                    "args": {
+                        "name": f"{r['binary']} ({tid})"
+                    }
+                })
+        with open(fname, 'w') as fp:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, fp)
+
+    def _write(self) -> None:
+        """Appends buffered lines (os.write raises instead of dropping them)"""
+        data = "".join(self.lines).encode()
+        self.lines, self.size = [], 0
+        if not data or self.fname is None:
+            return
+        fd = os.open(self.fname, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        finally:
+            os.close(fd)
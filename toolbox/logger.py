@@ -9,8 +9,15 @@
 from dataclasses import dataclass
 from enum import Enum
 import logging
+import logging.handlers
 from logging import Formatter
-from typing import Optional, List
+from typing import Optional, List, Iterator
+from contextlib import contextmanager
+import os
+import queue
+import atexit
+import weakref
+import threading
 from abc import ABC, abstractmethod
 from pathlib import Path
 
@@ -84,8 +91,102 @@ def unlink_missing_ok(dirname: Path) -> None:
         pass
 
 
+class LevelFormatter(Formatter):
+    """Formats records w/ the formatter of their level"""
+    def __init__(self, formatters: dict):
+        """
+        :param formatters Dictionary mapping levelno to Formatter
+        """
+        super().__init__()
+        self.formatters = formatters
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.formatters[record.levelno].format(record)
+
+
+class TaskFileHandler(logging.Handler):
+    """Writes records of tasks to the log file of their task
+    Records carry the log file of their task in "task_log" (see Logger.task)
+    """
+    def __init__(self, formatter: Formatter):
+        super().__init__()
+        self.setFormatter(formatter)
+        self.handlers = {}
+
+    def emit(self, record: logging.LogRecord) -> None:
+        fname = getattr(record, "task_log", None)
+        if fname is None:
+            return
+        if fname not in self.handlers:
+            self.handlers[fname] = logging.FileHandler(fname, mode='w')
+            self.handlers[fname].setFormatter(self.formatter)
+        self.handlers[fname].emit(record)
+
+    def close_task_log(self, fname: str) -> None:
+        """Closes log file of a finished task"""
+        handler = self.handlers.pop(fname, None)
+        if handler is not None:
+            handler.close()
+
+    def flush(self) -> None:
+        for handler in self.handlers.values():
+            handler.flush()
+
+    def close(self) -> None:
+        for fname in list(self.handlers):
+            self.close_task_log(fname)
+        super().close()
+
+
+class FlushableListener(logging.handlers.QueueListener):
+    """Queue listener that sets events put on its queue (see Logger.flush)"""
+    def handle(self, record: logging.LogRecord) -> None:
+        if isinstance(record, threading.Event):
+            record.set()
+        else:
+            super().handle(record)
+
+
+# Loggers whose listeners are stopped around fork so that no listener thread
+# holds a lock when forking and no queued record is written twice
+_LOGGERS = weakref.WeakSet()
+_STOPPED = []
+
+
+def _stop_listeners() -> None:
+    """Drains queues and stops listener threads"""
+    for logger in list(_LOGGERS):
+        if logger.listening:
+            logger.stop_listener()
+            _STOPPED.append(logger)
+
+
+def _start_listeners() -> None:
+    """Restarts listener threads stopped by _stop_listeners"""
+    while _STOPPED:
+        _STOPPED.pop().start_listener()
+
+
+def _flush_loggers() -> None:
+    """Writes all queued records at exit"""
+    for logger in list(_LOGGERS):
+        logger.flush()
+
+
+atexit.register(_flush_loggers)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(before=_stop_listeners,
+                        after_in_parent=_start_listeners,
+                        after_in_child=_start_listeners)
+
+
 class Logger:
-    """Configurable logger for ToolBox"""
+    """Configurable logger for ToolBox
+    Records are put on a queue and written to the file and console by a
+    listener thread so that logging does not block on I/O. Records of a
+    task (see task) go to the log file of the task instead of the shared
+    log file and are prefixed on the console.
+    """
     LOG_COLOR = {
         "NOTSET": "\u001b[37m",
         "DEBUG": "\u001b[36m",
@@ -100,38 +201,110 @@ class Logger:
         self.p = p
         self._logger = logging.getLogger(p.name)
         self._logger.setLevel(p.level.value)
-        formatter = Formatter(p.formatter)
+        self.task_log = None
+        self.task_prefix = None
+        plain = Formatter(p.formatter.format(begin_color='', stop_color=''))
+        self.task_handler = TaskFileHandler(plain)
+        handlers = [self.task_handler]
         # Output file setup
         if p.out_fname:
             self.file_handler = logging.FileHandler(p.out_fname, mode='w')
-            self.file_handler.setFormatter(formatter)
-            self._logger.addHandler(self.file_handler)
-        # Stream Handler setup
+            self.file_handler.setFormatter(plain)
+            self.file_handler.addFilter(
+                lambda record: getattr(record, "task_log", None) is None)
+            handlers.append(self.file_handler)
+        # Stream Handler setup (colored formatters are created once per level)
         self.stream_handler = logging.StreamHandler()
-        self.stream_handler.setFormatter(formatter)
-        self._logger.addHandler(self.stream_handler)
+        if p.color:
+            self.stream_handler.setFormatter(
+                LevelFormatter({
+                    level.value: Formatter("\u001b[36m" + p.formatter.format(
+                        begin_color=self.LOG_COLOR[level.name],
+                        stop_color="\u001b[0m"))
+                    for level in LogLevel
+                }))
+        else:
+            self.stream_handler.setFormatter(plain)
+        handlers.append(self.stream_handler)
+        # Queue pipeline (replaces pipeline of previous logger w/ same name)
+        for other in list(_LOGGERS):
+            if other.p.name == p.name:
+                other.close()
+        self.queue = queue.SimpleQueue()
+        self.listener = FlushableListener(self.queue, *handlers)
+        self.listening = False
+        self.start_listener()
+        self.queue_handler = logging.handlers.QueueHandler(self.queue)
+        self._logger.addHandler(self.queue_handler)
+        _LOGGERS.add(self)
+
+    def start_listener(self) -> None:
+        """Starts thread that writes queued records"""
+        self.listener.start()
+        self.listening = True
+
+    def stop_listener(self) -> None:
+        """Writes queued records and stops thread"""
+        self.listener.stop()
+        self.listening = False
+
+    def flush(self) -> None:
+        """Blocks until all queued records have been written"""
+        if self.listening:
+            written = threading.Event()
+            self.queue.put(written)
+            written.wait()
+        for handler in self.listener.handlers:
+            try:
+                handler.flush()
+            except (OSError, ValueError):
+                # Stream may be closed already (e.g. at exit)
+                pass
 
-    def log(self, msg: str, level: LogLevel = LogLevel.INFO) -> None:
+    @contextmanager
+    def task(self, fname: str, prefix: str) -> Iterator[None]:
+        """Logs to fname instead of the log file while running a task
+        :param fname Log file of the task
+        :param prefix Prepended to all messages of the task (e.g. "[job] [tool]")
+        """
+        self.task_log, self.task_prefix = fname, prefix
+        try:
+            yield
+        finally:
+            self.task_log = self.task_prefix = None
+            self.flush()
+            self.task_handler.close_task_log(fname)
+
+    def enabled(self, level: LogLevel) -> bool:
+        """True if messages of level are logged"""
+        return self._logger.isEnabledFor(level.value)
+
+    def close(self) -> None:
+        """Writes queued records and detaches handlers from the logger"""
+        _LOGGERS.discard(self)
+        self._logger.removeHandler(self.queue_handler)
+        if self.listening:
+            self.stop_listener()
+        for handler in self.listener.handlers:
+            handler.close()
+
+    def log(self,
+            msg: str,
+            level: LogLevel = LogLevel.INFO,
+            prefix: Optional[str] = None) -> None:
         """Basic log function for logger class
         :param msg Message to be logged
         :param level LogLevel to use when logging msg
-        :param prefix Will add prefix to the logger formatter
+        :param prefix Will be prepended to msg (e.g. "[job] [tool] [step]")
         """
         # Log information
         if self._logger.level == LogLevel.NOTSET.value:
             print(msg)
-        else:
-            # Update formatter
-            if self.p.out_fname:
-                formatter = self.p.formatter.format(begin_color='',
-                                                    stop_color='')
-                self.file_handler.setFormatter(Formatter(formatter))
-            if self.p.color:
-                formatter = "\u001b[36m" + self.p.formatter.format(
-                    begin_color=self.LOG_COLOR[level.name],
-                    stop_color="\u001b[0m")
-            else:
-                formatter = self.p.formatter.format(begin_color='',
-                                                    stop_color='')
-            self.stream_handler.setFormatter(Formatter(formatter))
-            self._logger.log(level.value, msg)
+        elif self._logger.isEnabledFor(level.value):
+            if prefix is not None:
+                msg = f"{prefix} {msg}"
+            if self.task_prefix is not None:
+                msg = f"{self.task_prefix} {msg}"
+            self._logger.log(level.value,
+                             msg,
+                             extra={"task_log": self.task_log})
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Profiles time and memory of the phases, tasks and steps of a toolbox run"""
+
+# Imports - standard library
+from typing import Optional, Iterator, List, Dict, Tuple
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+import cProfile
+import pstats
+import signal
+import tracemalloc
+import resource
+import threading
+import io
+import os
+
+# Imports - 3rd party packages
+
+# Imports - local source
+
+PROFILE_MODES = ("cprofile", "sample")
+# Seconds of cpu time between two samples of the sampling profiler
+SAMPLE_INTERVAL = 0.01
+# Number of functions listed in the summary
+SUMMARY_LINES = 30
+# Number of allocation sites listed per memory snapshot
+MEMORY_LINES = 10
+# Traces of these files are left out of memory snapshots
+MEMORY_IGNORE = ("<frozen importlib._bootstrap>",
+                 "<frozen importlib._bootstrap_external>", tracemalloc.__file__)
+
+
+class ProfilerError(Exception):
+    """Error for invalid profiler configuration"""
+    pass
+
+
+class Profiler:
+    """Profiles named phases w/ cProfile ("cprofile") or by sampling the
+    stack every SAMPLE_INTERVAL seconds of cpu time ("sample")
+    Time spent in a nested phase is only counted in the nested phase.
+    Each phase is written when it ends (so forked tasks write their own
+    files): "<name>.pstats" for cProfile, "<name>.stacks" (collapsed stacks,
+    one "frame;frame;... count" per line) for sampling.
+    """
+    def __init__(self, mode: Optional[str], out_dir: Optional[Path] = None):
+        """
+        :param mode One of PROFILE_MODES. Nothing is profiled if None
+        :param out_dir Directory profiles are written to
+        """
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ProfilerError(f'Unknown profile mode "{mode}"')
+        self.mode = mode
+        self.out_dir = out_dir
+        self.stack: List[Tuple[str, object]] = []
+        if mode == "sample":
+            if threading.current_thread() is not threading.main_thread():
+                raise ProfilerError(
+                    "Sampling profiler must be created in the main thread")
+            signal.signal(signal.SIGPROF, self._sample)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Profiles everything run within the context as phase name"""
+        if self.mode is None:
+            yield
+            return
+        if self.mode == "cprofile":
+            if self.stack:
+                self.stack[-1][1].disable()
+            data = cProfile.Profile()
+            data.enable()
+        else:
+            data = Counter()
+            if not self.stack:
+                signal.setitimer(signal.ITIMER_PROF, SAMPLE_INTERVAL,
+                                 SAMPLE_INTERVAL)
+        self.stack.append((name, data))
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            if self.mode == "cprofile":
+                data.disable()
+                if self.stack:
+                    self.stack[-1][1].enable()
+            elif not self.stack:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+            self.write(name, data)
+
+    def _sample(self, signum: int, frame) -> None:
+        """Adds stack of interrupted frame to the innermost phase"""
+        if not self.stack:
+            return
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} "
+                          f"({os.path.basename(code.co_filename)}:"
+                          f"{code.co_firstlineno})")
+            frame = frame.f_back
+        self.stack[-1][1][";".join(reversed(frames))] += 1
+
+    def write(self, name: str, data) -> None:
+        """Writes profile of a phase to out_dir"""
+        if self.out_dir is None:
+            return
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        if self.mode == "cprofile":
+            data.dump_stats(str(self.out_dir / f"{name}.pstats"))
+        else:
+            with open(self.out_dir / f"{name}.stacks", 'w') as fp:
+                for stack, count in data.items():
+                    fp.write(f"{stack} {count}\n")
+
+    def write_summary(self, fname: Path) -> None:
+        """Writes the time of each phase and the top functions of all
+        phases (by cumulative time or by samples of own time) to fname
+        """
+        if self.mode is None or self.out_dir is None:
+            return
+        if self.mode == "cprofile":
+            text = self.summarize_pstats()
+        else:
+            text = self.summarize_stacks()
+        with open(fname, 'w') as fp:
+            fp.write(text)
+
+    def summarize_pstats(self) -> str:
+        """Summary of all .pstats files in out_dir"""
+        files = sorted(self.out_dir.glob("*.pstats"))
+        if not files:
+            return ""
+        out = io.StringIO()
+        out.write("Phase times (s):\n")
+        for f in files:
+            out.write(f"{pstats.Stats(str(f)).total_tt:10.3f}  {f.stem}\n")
+        out.write("\n")
+        stats = pstats.Stats(*map(str, files), stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(SUMMARY_LINES)
+        return out.getvalue()
+
+    def summarize_stacks(self) -> str:
+        """Summary of all .stacks files in out_dir"""
+        phases: Dict[str, int] = {}
+        own = Counter()
+        for f in sorted(self.out_dir.glob("*.stacks")):
+            phases[f.stem] = 0
+            with open(f, 'r') as fp:
+                for line in fp:
+                    stack, count = line.rstrip("\n").rsplit(" ", 1)
+                    phases[f.stem] += int(count)
+                    own[stack.rsplit(";", 1)[-1]] += int(count)
+        total = sum(phases.values()) or 1
+        lines = ["Phase samples:"]
+        lines += [f"{n:10d}  {name}" for name, n in phases.items()]
+        lines += ["", "Top functions by own samples:"]
+        lines += [
+            f"{n:10d} {100 * n / total:6.1f}%  {func}"
+            for func, n in own.most_common(SUMMARY_LINES)
+        ]
+        return "\n".join(lines) + "\n"
+
+
+def reset_peak_rss() -> None:
+    """Resets the peak resident set size of this process (Linux only)"""
+    try:
+        with open("/proc/self/clear_refs", 'w') as fp:
+            fp.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss() -> int:
+    """Returns peak resident set size (KB) of this process since the last
+    reset_peak_rss (since start of process if it cannot be reset)
+    """
+    try:
+        with open("/proc/self/status", 'r') as fp:
+            for line in fp:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class MemoryProfiler:
+    """Takes tracemalloc snapshots at phase boundaries
+    Each snapshot ends a phase. Traced and peak memory of the phase, the
+    peak resident set size of the process during the phase, the top
+    allocation sites and the largest changes since the previous snapshot
+    are appended to "memory.txt" in out_dir.
+    """
+    def __init__(self, enabled: bool, out_dir: Optional[Path] = None):
+        """
+        :param enabled Nothing is traced if False
+        :param out_dir Directory the report is written to
+        """
+        self.enabled = enabled
+        self.out_dir = out_dir
+        self.previous: Optional[tracemalloc.Snapshot] = None
+        if enabled:
+            tracemalloc.start()
+            reset_peak_rss()
+
+    @contextmanager
+    def phase(self, label: str) -> Iterator[None]:
+        """Snapshots "before <label>" and "after <label>" (also on errors)"""
+        self.snapshot(f"before {label}")
+        try:
+            yield
+        finally:
+            self.snapshot(f"after {label}")
+
+    def snapshot(self, label: str) -> None:
+        """Ends the current phase w/ a snapshot labelled label"""
+        if not self.enabled:
+            return
+        snap = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, f) for f in MEMORY_IGNORE])
+        current, peak = tracemalloc.get_traced_memory()
+        lines = [
+            f"== {label} (pid {os.getpid()}) ==",
+            f"traced: {current / 2**20:.1f} MiB (peak {peak / 2**20:.1f} MiB), "
+            f"peak rss: {peak_rss() / 2**10:.1f} MiB", "Top allocation sites:"
+        ]
+        lines += [
+            f"  {stat}" for stat in snap.statistics("lineno")[:MEMORY_LINES]
+        ]
+        if self.previous is not None:
+            lines.append("Largest changes since previous snapshot:")
+            lines += [
+                f"  {stat}"
+                for stat in snap.compare_to(self.previous, "lineno")
+                [:MEMORY_LINES]
+            ]
+        self.previous = snap
+        if self.out_dir is not None:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.out_dir / "memory.txt", 'a') as fp:
+                fp.write("\n".join(lines) + "\n\n")
+        tracemalloc.reset_peak()
+        reset_peak_rss()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Packs concurrently running tasks within the resources of the machine"""
+
+# Imports - standard library
+from dataclasses import dataclass
+from typing import Any, Callable, List, Tuple, Optional, Dict
+import os
+import mmap
+import struct
+
+# Imports - 3rd party packages
+
+# Imports - local source
+
+
+class SchedulerError(Exception):
+    """Error for invalid task dependencies"""
+    pass
+
+
+@dataclass(frozen=True)
+class Resources:
+    """Cpus and memory (GB) required by a task or available to a job"""
+    cpus: int = 1
+    memory: float = 0
+
+    def fits_in(self, other: 'Resources') -> bool:
+        """True if these resources fit within other"""
+        return self.cpus <= other.cpus and self.memory <= other.memory
+
+    def __add__(self, other: 'Resources') -> 'Resources':
+        return Resources(self.cpus + other.cpus, self.memory + other.memory)
+
+    def __sub__(self, other: 'Resources') -> 'Resources':
+        return Resources(self.cpus - other.cpus, self.memory - other.memory)
+
+
+def available_resources() -> Resources:
+    """Detects cpus (respecting affinity) and physical memory of machine"""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    try:
+        memory = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError):
+        memory = 0
+    return Resources(cpus, memory / 1024**3)
+
+
+def topological_order(keys: List[Any], depends: Dict[Any,
+                                                    List[Any]]) -> List[Any]:
+    """Orders keys so that every key comes after its dependencies
+    Keys that don't depend on each other keep their original order
+    """
+    order, done = [], set()
+    pending = list(keys)
+    while pending:
+        for key in pending:
+            if all(d in done for d in depends.get(key, ())):
+                pending.remove(key)
+                order.append(key)
+                done.add(key)
+                break
+        else:
+            raise SchedulerError(f"Circular task dependencies: {pending}")
+    return order
+
+
+def critical_paths(durations: Dict[Any, float],
+                   depends: Dict[Any, List[Any]]) -> Dict[Any, float]:
+    """Returns length of longest path from each task to the end of the job
+    :param durations Expected duration of every task
+    :param depends Dependencies of every task
+    """
+    dependents = {key: [] for key in durations}
+    for key, deps in depends.items():
+        for d in deps:
+            dependents[d].append(key)
+    lengths = {}
+    for key in reversed(topological_order(list(durations), depends)):
+        lengths[key] = durations[key] + max(
+            (lengths[d] for d in dependents[key]), default=0)
+    return lengths
+
+
+class RunningTasks:
+    """Counts started and running tasks in memory shared w/ forked tasks
+    so that a task can tell whether another task ran at the same time
+    (see overlapped). Counters are only changed by the parent.
+    """
+    FORMAT = '!QQ'
+
+    def __init__(self):
+        self.counters = mmap.mmap(-1, struct.calcsize(self.FORMAT))
+
+    def read(self) -> Tuple[int, int]:
+        """Returns number of started and of running tasks"""
+        return struct.unpack_from(self.FORMAT, self.counters)
+
+    def start(self) -> None:
+        """Counts a task that is started"""
+        started, running = self.read()
+        struct.pack_into(self.FORMAT, self.counters, 0, started + 1,
+                         running + 1)
+
+    def finish(self) -> None:
+        """Counts a task that finished"""
+        started, running = self.read()
+        struct.pack_into(self.FORMAT, self.counters, 0, started,
+                         running - 1)
+
+    def overlapped(self, mark: Tuple[int, int]) -> bool:
+        """True if another task was running when read returned mark (from
+        within a running task) or was started since
+        """
+        return mark[1] > 1 or self.read()[0] != mark[0]
+
+
+class TaskScheduler:
+    """Starts tasks in order as long as they fit in the free resources
+    Tasks that are larger than the limits run alone instead of never running
+    """
+    def __init__(self, limits: Resources, max_tasks: Optional[int] = None):
+        """
+        :param limits Resources shared by all running tasks
+        :param max_tasks Maximum number of concurrently running tasks
+        """
+        self.limits = limits
+        self.max_tasks = max_tasks
+
+    def run(self,
+            tasks: List[Tuple[Any, Resources]],
+            start: Callable[[Any], None],
+            wait: Callable[[], Tuple[Any, Optional[Exception]]],
+            fail_fast: bool = True,
+            depends: Optional[Dict[Any, List[Any]]] = None) -> dict:
+        """Runs all tasks
+        :param tasks Keys of tasks and their resources in order of priority
+        :param start Starts task w/ given key (must not block)
+        :param wait Blocks until any task finishes. Returns its key and error
+        :param fail_fast No new tasks are started once one has failed
+        :param depends Keys of tasks that must succeed before a task starts
+        :return Dictionary mapping keys of failed tasks to their errors
+        """
+        depends = depends or {}
+        topological_order([key for key, _ in tasks], depends)
+        pending = list(tasks)
+        running = {}
+        used = Resources(0, 0)
+        errors = {}
+        done = set()
+        while pending or running:
+            for item in list(pending):
+                key, required = item
+                if self.max_tasks and len(running) >= self.max_tasks:
+                    break
+                deps = depends.get(key, ())
+                if any(d in errors for d in deps):
+                    pending.remove(item)
+                    errors[key] = SchedulerError(f"Dependency of {key} failed")
+                    continue
+                if not all(d in done for d in deps):
+                    continue
+                if running and not required.fits_in(self.limits - used):
+                    continue
+                pending.remove(item)
+                running[key] = required
+                used = used + required
+                start(key)
+            if not running:
+                continue
+            key, error = wait()
+            used = used - running.pop(key)
+            if error is not None:
+                errors[key] = error
+                if fail_fast:
+                    pending.clear()
+            else:
+                done.add(key)
+        return errors
@@ -19,21 +19,44 @@ from jinja2 import StrictUndefined, FileSystemLoader, Environment
 # Imports - local source
 from .database import Database
 from .logger import LogLevel, HasLogFunction
-from .utils import YamaleValidator
+from .utils import YamaleValidator, hash_data, hash_dir, hash_file
+from .utils import hash_referenced_files
+from .cache import CacheSpec
+
+# Suffix of the resource metrics of a tool in the job dir (see metrics_file)
+METRICS_SUFFIX = ".metrics.jsonl"
 
 
 class ToolError(Exception):
     """Error to show that tool implementation has hit exception"""
 
 
+def cached_step(outputs: List[str],
+                inputs: Optional[List[str]] = None,
+                files: Optional[List[str]] = None):
+    """Decorator that marks a step as deterministic so its outputs are cached
+    :param outputs Output files/dirs relative to internal.job_dir
+    :param inputs Database dot strings (subtrees) the step depends on
+    :param files Files the step depends on
+    """
+    def decorator(step: Callable[[], None]) -> Callable[[], None]:
+        step.cache_spec = CacheSpec(tuple(outputs), tuple(inputs or ()),
+                                    tuple(files or ()))
+        return step
+
+    return decorator
+
+
 class Tool(HasLogFunction, ABC):
     """Base class that all tools must inherit from
     Inherits from HasLogFunction which is also an abstract class
     """
     def __init__(self, db: Database, log: Callable[[str, LogLevel], None]):
         """Just sets the database"""
+        self.read_namespaces = set()
         self._db = db
         self._log = log
+        self._cache_specs = {}
         self.path = self.get_db(f'internal.tools.{type(self).__name__}.path')
         self.check_db()
         self.ts = self.gen_toolspace()
@@ -55,6 +78,18 @@ class Tool(HasLogFunction, ABC):
             self.get_db(f"internal.tools.{t}.namespace") for t in self.tools
         ]
 
+    @property
+    def binary_log_dir(self) -> str:
+        """Directory for the output logs of binaries (see BinaryDriver)"""
+        return os.path.join(self.get_db("internal.job_dir"), "logs",
+                            type(self).__name__)
+
+    @property
+    def metrics_file(self) -> str:
+        """Resource metrics of binaries run by this tool (see BinaryDriver)"""
+        return os.path.join(self.get_db("internal.job_dir"),
+                            f"{type(self).__name__}{METRICS_SUFFIX}")
+
     def get_namespace(self, tool_name: str) -> str:
         """Returns namespace/alias given a tool name"""
         return self.get_db(f"internal.tools.{tool_name}.namespace")
@@ -101,6 +136,43 @@ class Tool(HasLogFunction, ABC):
                     f'Invalid value for property "{dot_str}".\nDescription: {descr}{err_msg}'
                 )
 
+    def cache_step(self,
+                   step: Callable[[], None],
+                   outputs: List[str],
+                   inputs: Optional[List[str]] = None,
+                   files: Optional[List[str]] = None):
+        """Registers a step as deterministic so its outputs are cached
+        Same as the cached_step decorator (works for bound methods/functions)
+        Lambdas are rejected since they have no name to key the cache by
+        """
+        if step.__name__ == "<lambda>":
+            raise ToolError("Lambda steps cannot be cached. Use a named step.")
+        self._cache_specs[step] = CacheSpec(tuple(outputs),
+                                            tuple(inputs or ()),
+                                            tuple(files or ()))
+
+    def get_cache_spec(self, step: Callable[[], None]) -> Optional[CacheSpec]:
+        """Returns cache spec of step or None if step is not cached"""
+        if step in self._cache_specs:
+            return self._cache_specs[step]
+        return getattr(step, "cache_spec", None)
+
+    def cache_key(self, step: Callable[[], None], spec: CacheSpec) -> str:
+        """Hashes the declared inputs of a step along with the tool source"""
+        inputs = {dot_str: self.get_db(dot_str) for dot_str in spec.inputs}
+        files = hash_referenced_files(inputs)
+        files.update({f: hash_file(f) for f in spec.files})
+        return hash_data({
+            "step": f"{type(self).__name__}.{step.__qualname__}",
+            "outputs": spec.outputs,
+            "source": [
+                hash_dir(self.get_db(f"internal.tools.{t}.path"))
+                for t in self.tools
+            ],
+            "inputs": inputs,
+            "files": files
+        })
+
     def set_log_fn(self, log: Callable[[str, LogLevel], None]):
         """For changing the logging functionality between steps"""
         self._log = log
@@ -111,8 +183,10 @@ class Tool(HasLogFunction, ABC):
 
     def get_db(self, dot_str: str):
         """Allows for accessing database w/o touching _db
+        Namespaces that are read are recorded (see read_namespaces)
         :param dot_str Dot string for accessing database (key1.key2 etc...)
         """
+        self.read_namespaces.add(dot_str.split('.', 1)[0])
         return self._db.get_db(dot_str)
 
     @abstractmethod
@@ -129,6 +203,13 @@ class Tool(HasLogFunction, ABC):
             rstr += " -ln {args['symlnk']}"
         if args["log_params"].color:
             rstr += " --color"
+        if args["force"]:
+            rstr += " --force"
+        rstr += f" --isolation {args['isolation']} -j {args['jobs']}"
+        if args["cpus"]:
+            rstr += f" --cpus {args['cpus']}"
+        if args["memory"]:
+            rstr += f" --memory {args['memory']}"
         rstr += f" -l {args['log_params'].level.name.lower()}"
         rstr += f" -b {args['build_dir']}"
         rstr += f" -o {args['out_fname']}"
@@ -8,6 +8,8 @@
 # Imports - standard library
 from argparse import Namespace
 from typing import Union, Tuple, Optional, NamedTuple, Any, Callable, List
+from typing import Dict, Iterator
+from contextlib import contextmanager
 from enum import Enum
 from dataclasses import dataclass
 import os, sys
@@ -18,6 +20,15 @@ import re
 import copy
 import importlib
 import atexit
+import json
+import pickle
+import io
+import traceback
+import selectors
+import time
+import functools
+import threading
+import fcntl
 
 # Imports - 3rd party packages
 import yaml
@@ -29,7 +40,32 @@ from .logger import Logger, HasLogFunction, LogLevel, LoggerParams
 from .utils import *
 from .dot_dict import DotDict
 from .database import Database
-from .tool import Tool
+from .tool import Tool, METRICS_SUFFIX
+from .cache import StepCache, DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE
+from .distributed import TaskServer, TaskWorker
+from .watch import make_watcher
+from .scheduler import Resources, TaskScheduler, RunningTasks
+from .scheduler import available_resources
+from .scheduler import topological_order, critical_paths
+from .events import EventLog
+from .profiler import Profiler, MemoryProfiler
+
+# Files of the job directory that are written by toolbox itself
+JOB_LOGS = ("events.jsonl", "combined.log", "trace.json")
+# Directory of the job directory profiles are written to (see --profile)
+PROFILE_DIR = "profile"
+# Directories of the job directory that are written by toolbox and its tools
+# (binary logs, profiles, jinja template manifests). Never seeded.
+JOB_LOG_DIRS = ("logs", PROFILE_DIR, "jinja_templates")
+# Weight of the latest run in the recorded (moving average) durations
+HISTORY_WEIGHT = 0.5
+# Namespaces every task depends on (see task_stamp)
+SHARED_NAMESPACES = ("user", "files", "dirs", "filelists", "dirlists")
+# Name of the timestamped directory of a run (see make_build_dir)
+BUILD_DIR_FORMAT = "%m-%d-%Y-%H-%M-%S"
+# Directory (next to the build directories) w/ a lock file per build dir
+LOCK_DIR = "locks"
+BUILD_DIR_PATTERN = re.compile(r"\d{2}-\d{2}-\d{4}-\d{2}-\d{2}-\d{2}")
 
 
 class ToolBoxError(Exception):
@@ -45,6 +81,7 @@ class ToolSchema:
     properties: dict
     path: str
     schema_includes: Optional[List[str]] = None
+    resources: Optional[dict] = None
 
 
 @dataclass(frozen=True)
@@ -52,6 +89,9 @@ class Task:
     """simple dataclass for Task (substep of job)"""
     tool: str
     additional_configs: Optional[List[str]] = None
+    cpus: Optional[int] = None
+    memory: Optional[float] = None
+    depends: Optional[List[str]] = None
 
 
 @dataclass(frozen=True)
@@ -63,16 +103,32 @@ class ToolBoxParams:
     log_params: LoggerParams
     out_fname: str
     job: str
+    force: bool = False
+    distribute: Optional[str] = None
+    watch: bool = False
+    isolation: str = "copy"
+    jobs: int = 1
+    cpus: Optional[int] = None
+    memory: Optional[float] = None
+    profile: Optional[str] = None
+    trace: bool = False
+    memprofile: bool = False
 
 
 class ToolBox(Database, HasLogFunction):
     """Coordinates the running of tools and jobs"""
+    restricted_ns = [
+        "jobs", "user", "tools", "toolbox", "files", "dirs", "filelists",
+        "dirlists"
+    ]
+
     def __init__(self, args: ToolBoxParams) -> None:
         """Inializes project manager with global namespace from args list"""
         super().__init__("internal")
         # Create logger and log function
         self._logger = Logger(args.log_params)
         self._log = self._logger.log
+        self.loaded_configs = set()
         # Ensure that home directory is set
         home_dir = check_dir(os.getenv('TOOLBOX_HOME'))
         if home_dir is None:
@@ -84,38 +140,98 @@ class ToolBox(Database, HasLogFunction):
         self._load_dict({"internal.home_dir": str(home_dir)})
         self._load_dict({"internal.work_dir": str(Path('.').resolve())})
         self._load_dict({"internal.job_dir": self.make_build_dir()})
-        self._load_dict({"internal.env": os.environ})
+        self.events = EventLog(
+            Path(self.get_db("internal.job_dir")) / "events.jsonl",
+            job=args.job)
+        self.events.activate()
+        self.profiler = Profiler(
+            args.profile,
+            Path(self.get_db("internal.job_dir")) / PROFILE_DIR)
+        self.running_tasks = RunningTasks()
+        self.memprofiler = MemoryProfiler(
+            args.memprofile,
+            Path(self.get_db("internal.job_dir")) / PROFILE_DIR)
+        self._load_dict({"internal.env": dict(os.environ)})
         self._load_dict({"internal.tools": {}})
-        self.restricted_ns = [
-            "jobs", "user", "tools", "toolbox", "files", "dirs", "filelists",
-            "dirlists"
-        ]
         # Populate Database
         self.populate_database()
+        self.seed_build_dir()
+        self.pruner = self.prune_build_dirs()
         atexit.register(self.exit)
 
+    @classmethod
+    def from_snapshot(cls, snapshot: DotDict, logger: Logger) -> 'ToolBox':
+        """Creates toolbox from an already populated database (see worker)
+        No build directory is made and no cleanup happens on exit
+        """
+        tb = cls.__new__(cls)
+        Database.__init__(tb, "internal")
+        tb._db = snapshot
+        tb._logger = logger
+        tb._log = logger.log
+        tb.loaded_configs = set()
+        tb.events = EventLog(None, job=tb.get_db("internal.args.job"))
+        tb.profiler = Profiler(None)
+        tb.memprofiler = MemoryProfiler(False)
+        tb.running_tasks = RunningTasks()
+        return tb
+
+    @classmethod
+    def work(cls,
+             address: str,
+             log_params: LoggerParams,
+             authkey: Optional[str] = None) -> int:
+        """Runs tasks published by a toolbox started w/ --distribute
+        :return Number of tasks run
+        """
+        logger = Logger(log_params)
+
+        def run(snapshot: DotDict, task: Task, index: int) -> None:
+            tb = cls.from_snapshot(snapshot, logger)
+            tb.setup_environment()
+            tb.run_task(task, index)
+
+        return TaskWorker(address, authkey).serve(run, log_params.name)
+
     def populate_database(self) -> dict:
         """Generates global database from config files and args"""
+        # Paths may have changed since the last run
+        clear_resolve_cache()
         # Load empty restricted namespaces (just so that they exist)
         for ns in self.restricted_ns:
             self.load_dict({f"{ns}": {}})
         # Run initial load to allow for resolving of tool paths
-        self.load_configs(False, False)
+        with self.populate_phase("initial_configs"):
+            self.load_configs(False, False)
         # Load all default property values for tools
-        self.load_tools()
+        with self.populate_phase("tools"):
+            self.load_tools()
+        self.memprofiler.snapshot("load_tools")
         # Load configs again to overwrite default values
-        self.load_configs()
+        with self.populate_phase("configs"):
+            self.load_configs()
         # Check jobs - Validate jobs yaml
-        self.validate_db(
-            os.path.join(self.get_db('internal.home_dir'),
-                         'toolbox/schemas/toolbox.yml'))
+        with self.populate_phase("validate"):
+            self.validate_db(
+                os.path.join(self.get_db('internal.home_dir'),
+                             'toolbox/schemas/toolbox.yml'))
+        self.memprofiler.snapshot("validate")
+
+    @contextmanager
+    def populate_phase(self, name: str) -> Iterator[None]:
+        """Traces and profiles a phase of populate_database"""
+        with self.events.span("populate", phase=name), \
+                self.profiler.phase(f"populate_{name}"):
+            yield
 
     def log(self,
             msg: str,
             level: LogLevel = LogLevel.INFO,
             prefix: Optional[str] = None) -> None:
         """Function for logging information"""
-        self._log(msg, level)
+        self._log(msg, level, prefix)
+        if self._logger.enabled(level):
+            self.events.emit("log", level=level.name, msg=msg)
 
     def load_configs(self,
                      error_on_unresolved: bool = True,
@@ -128,20 +244,22 @@ class ToolBox(Database, HasLogFunction):
         configs = configs + [autoload_file] if autoload_file else configs
         for config in configs:
             self.load_config(config)
+            rel_path = get_rel_path(config, self.get_db("internal.work_dir"))
+            self.memprofiler.snapshot(f'config "{rel_path}"')
             if print_info:
-                self.log(
-                    f'Loaded configuration file "{get_rel_path(config, self.get_db("internal.work_dir"))}"',
-                    LogLevel.INFO)
+                self.log(f'Loaded configuration file "{rel_path}"',
+                         LogLevel.INFO)
         self._db.resolve(error_on_unresolved)
+        self.memprofiler.snapshot("resolve")
 
     def load_config(self, config: Union[str, Path]):
         """Method for loading config to db. Exists in case this
         behavior needs to change in the future.
         """
-        with open(config, 'r') as fp:
-            data = yaml.load(fp, Loader=yaml.SafeLoader)
-            if data:
-                self.load_dict(data)
+        self.loaded_configs.add(str(Path(config).resolve()))
+        data = load_yaml(str(config))
+        if data:
+            self.load_dict(data)
 
     def load_tools(self):
         """Loads tools and schemas into database as well as default properties for tools"""
@@ -203,10 +321,14 @@ class ToolBox(Database, HasLogFunction):
 
     def make_build_dir(self):
         """Make build directory and symlink"""
-        date_str = datetime.now().strftime("%m-%d-%Y-%H-%M-%S")
+        date_str = datetime.now().strftime(BUILD_DIR_FORMAT)
         build_dir = Path(self.get_db("internal.args.build_dir")) / self.get_db(
             "internal.args.job") / date_str
         build_dir = build_dir.resolve()
+        previous = (build_dir.parent / 'current').resolve()
+        if previous.is_dir() and previous != build_dir:
+            self._load_dict({"internal.previous_job_dir": str(previous)})
+        self.build_lock = self.lock_build_dir(build_dir, fcntl.LOCK_SH)
         build_dir.mkdir(parents=True, exist_ok=True)
         unlink_missing_ok(build_dir.parent / 'current')
         (build_dir.parent / 'current').symlink_to(build_dir,
@@ -217,74 +339,760 @@ class ToolBox(Database, HasLogFunction):
                 build_dir.parents[1], target_is_directory=True)
         return str(build_dir)
 
+    def seed_build_dir(self) -> None:
+        """Populates the job dir w/ the files of the previous run ("current"
+        before this run) if toolbox.seed.enabled, so that tools can reuse
+        them. Files are reflinked where the filesystem supports it, else
+        hardlinked (toolbox.seed.hardlink, default) or copied. Hardlinks are
+        shared w/ the previous run: tools must replace (not modify) them.
+        Files written by toolbox itself (logs, events, profiles, metrics and
+        template manifests) are left out so that they are never shared.
+        """
+        cfg = self.get_db("toolbox").get("seed", {})
+        previous = self.get_db("internal").get("previous_job_dir")
+        if not cfg.get("enabled", False) or previous is None:
+            return
+
+        out_fname = self.get_db("internal.args.log_params").out_fname
+        owned = set(JOB_LOGS + JOB_LOG_DIRS)
+        if out_fname:
+            owned.add(os.path.basename(out_fname))
+
+        def exclude(rel: str) -> bool:
+            return rel in owned or rel.endswith(METRICS_SUFFIX)
+
+        with self.events.span("seed", src=previous):
+            counts = clone_tree(previous, self.get_db('internal.job_dir'),
+                                cfg.get("hardlink", True), exclude)
+        summary = ", ".join(f"{n} {method}" for method, n in counts.items())
+        self.log(f'Seeded job dir from "{previous}" ({summary or "empty"})')
+
+    def expired_build_dirs(self) -> List[Path]:
+        """Returns timestamped directories of the job that are neither kept
+        by toolbox.retention (keep: last N runs, max_age: runs newer than
+        this many days) nor in use (this run, "current" and the runs task
+        stamps restore outputs from). Nothing expires w/o a retention policy.
+        """
+        cfg = self.get_db("toolbox").get("retention", {})
+        keep, max_age = cfg.get("keep"), cfg.get("max_age")
+        if keep is None and max_age is None:
+            return []
+        job_dir = Path(self.get_db('internal.job_dir'))
+        runs = []
+        for d in job_dir.parent.iterdir():
+            if BUILD_DIR_PATTERN.fullmatch(d.name) and not d.is_symlink():
+                runs.append((datetime.strptime(d.name, BUILD_DIR_FORMAT), d))
+        runs = [d for _, d in sorted(runs, reverse=True)]
+        in_use = {job_dir, (job_dir.parent / 'current').resolve()}
+        for stamp in (job_dir.parent / 'stamps').glob('*.json'):
+            try:
+                with open(stamp, 'r') as fp:
+                    in_use.add(Path(json.load(fp)["job_dir"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        now = datetime.now()
+        expired = []
+        for i, d in enumerate(runs):
+            if d in in_use or (keep is not None and i < keep):
+                continue
+            age = now - datetime.strptime(d.name, BUILD_DIR_FORMAT)
+            if max_age is not None and age.total_seconds() < max_age * 86400:
+                continue
+            expired.append(d)
+        return expired
+
+    @staticmethod
+    def lock_build_dir(build_dir: Path, operation: int) -> Optional[io.IOBase]:
+        """Locks the lock file of a build dir (in LOCK_DIR). Every run holds
+        a shared lock on its build dir until it exits, so that other runs
+        only remove build dirs they can lock exclusively.
+        :param operation fcntl.LOCK_SH or LOCK_EX (w/o waiting)
+        :return Open lock file (None if it is locked by another run)
+        """
+        lock_file = build_dir.parent / LOCK_DIR / f"{build_dir.name}.lock"
+        lock_file.parent.mkdir(parents=True, exist_ok=True)
+        fp = open(lock_file, 'a')
+        try:
+            fcntl.flock(
+                fp, operation
+                if operation == fcntl.LOCK_SH else operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            fp.close()
+            return None
+        return fp
+
+    def prune_build_dirs(self) -> Optional[threading.Thread]:
+        """Removes expired build directories (see expired_build_dirs) in a
+        background thread so that the job does not wait for it. Build dirs
+        of runs that are still running (see lock_build_dir) are kept.
+        :return Thread removing the directories (None if nothing expired)
+        """
+        expired = self.expired_build_dirs()
+        if not expired:
+            return None
+        self.log(f"Removing {len(expired)} expired build directories")
+
+        def remove() -> None:
+            for d in expired:
+                lock = self.lock_build_dir(d, fcntl.LOCK_EX)
+                if lock is None:
+                    self.log(f'Keeping "{d}" of a running job',
+                             LogLevel.DEBUG)
+                    continue
+                with lock:
+                    try:
+                        remove_file_or_dir(str(d))
+                        os.remove(lock.name)
+                    except OSError as err:
+                        self.log(f'Cannot remove "{d}": {err}',
+                                 LogLevel.WARNING)
+
+        thread = threading.Thread(target=remove,
+                                  name="prune_build_dirs",
+                                  daemon=True)
+        thread.start()
+        return thread
+
     def cleanup(self):
         """Performs any actions required before exiting program"""
-        # Copy log file to build directory
-        if self.get_db("internal.args.log_params").out_fname:
-            shutil.copy(
-                self.get_db("internal.args.log_params").out_fname,
-                str(self.get_db('internal.job_dir')))
-
-    def run_task(self, task: Task) -> None:
-        """Runs the task (i.e. subcomponent of a job)"""
-        # Check to make sure that tool actually exists
+        self.events.flush()
+        self.profiler.write_summary(
+            Path(self.get_db('internal.job_dir')) / PROFILE_DIR /
+            'summary.txt')
+        # Copy log file to build directory (a new file, never an old one)
+        out_fname = self.get_db("internal.args.log_params").out_fname
+        if out_fname:
+            self._logger.flush()
+            dest = Path(self.get_db('internal.job_dir')) / Path(out_fname).name
+            unlink_missing_ok(dest)
+            shutil.copy(out_fname, str(dest))
+
+    def task_file(self, kind: str, task: Task, index: int) -> Path:
+        """Returns a file kept per task in the build directory of the job
+        (next to the timestamped directories) so that it persists between runs
+        """
+        job_build_dir = Path(self.get_db('internal.job_dir')).parent
+        return job_build_dir / kind / f'{index}_{task.tool}.json'
+
+    def stamp_file(self, task: Task, index: int) -> Path:
+        """Returns the stamp file of a task"""
+        return self.task_file('stamps', task, index)
+
+    def task_log_file(self, task: Task, index: int) -> Path:
+        """Returns the log file of a task in the job directory"""
+        return Path(self.get_db('internal.job_dir')
+                    ) / 'logs' / f'{index}_{task.tool}.log'
+
+    def history_file(self, task: Task, index: int) -> Path:
+        """Returns the file w/ the recorded durations of a task"""
+        return self.task_file('history', task, index)
+
+    def task_history(self, task: Task, index: int) -> dict:
+        """Returns recorded durations of task ({} if it never ran)"""
+        try:
+            with open(self.history_file(task, index), 'r') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return {}
+
+    def record_history(self, task: Task, index: int, duration: float,
+                       steps: dict) -> None:
+        """Blends durations of this run into the recorded durations"""
+        def blend(old: Optional[float], new: float) -> float:
+            if old is None:
+                return new
+            return HISTORY_WEIGHT * new + (1 - HISTORY_WEIGHT) * old
+
+        history = self.task_history(task, index)
+        old_steps = history.get("steps", {})
+        history = {
+            "duration": blend(history.get("duration"), duration),
+            "steps": {
+                step: blend(old_steps.get(step), t)
+                for step, t in steps.items()
+            },
+            "runs": history.get("runs", 0) + 1
+        }
+        fname = self.history_file(task, index)
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        with open(fname, 'w') as fp:
+            json.dump(history, fp, indent=2)
+
+    def task_stamp(self, task: Task, index: int, tool_class: type,
+                   reads: List[str]) -> dict:
+        """Hashes everything a task depends on: the resolved namespaces of
+        the tool and its super classes, their source, the shared namespaces
+        (SHARED_NAMESPACES and toolbox.export), the additional configs, the
+        contents of all files and directories referenced by the namespaces,
+        the stamps of the tasks it depends on (see upstream_stamps) and the
+        other namespaces the tool read (see hash_namespaces).
+        :param reads Other namespaces read by the tool (in its last run)
+        """
+        stamp = {"tools": {}, "configs": {}, "files": {}}
+        for c in tool_class.mro():
+            if not issubclass(c, Tool) or c == Tool:
+                continue
+            tool = self.get_db(f"internal.tools.{c.__name__}")
+            ns_dict = self.get_db(tool["namespace"])
+            stamp["tools"][c.__name__] = {
+                "namespace": hash_data(ns_dict),
+                "source": hash_dir(tool["path"])
+            }
+            stamp["files"].update(hash_referenced_files(ns_dict))
+        shared = {ns: self.get_db(ns) for ns in SHARED_NAMESPACES}
+        shared["toolbox.export"] = self.get_db("toolbox").get("export", {})
+        stamp["namespaces"] = {ns: hash_data(v) for ns, v in shared.items()}
+        stamp["files"].update(hash_referenced_files(shared))
+        for config in task.additional_configs or []:
+            stamp["configs"][config] = hash_file(config)
+        stamp["depends"] = self.upstream_stamps(task, index)
+        stamp["reads"] = self.hash_namespaces(reads)
+        return stamp
+
+    def read_candidates(self, tool_class: type) -> List[str]:
+        """Returns namespaces that are not always part of the stamp of a task
+        of tool_class (see task_stamp), i.e. those only stamped if read
+        """
+        stamped = set(SHARED_NAMESPACES) | {"internal", "toolbox"}
+        for c in tool_class.mro():
+            if issubclass(c, Tool) and c != Tool:
+                stamped.add(self.get_db(f"internal.tools.{c.__name__}")
+                            ["namespace"])
+        return [ns for ns in self._db.keys() if ns not in stamped]
+
+    def hash_namespaces(self, namespaces: List[str]) -> Dict[str, Any]:
+        """Hashes namespaces and the files they reference (None if missing)"""
+        hashes = {}
+        for ns in namespaces:
+            data = self._db.get(ns)
+            hashes[ns] = None if data is None else {
+                "data": hash_data(data),
+                "files": hash_referenced_files(data)
+            }
+        return hashes
+
+    def upstream_stamps(self, task: Task, index: int) -> Dict[str, Any]:
+        """Hashes the inputs of the tasks task depends on (from their stamps)
+        so that task reruns when they ran w/ other inputs. None for a task
+        w/o stamp, which makes task rerun (see run_task_steps).
+        """
+        job = self._db.get("jobs", {}).get(self.get_db("internal.args.job"))
+        if job is None:
+            return {}
+        tasks = [Task(**t) for t in job["tasks"]]
+        if index >= len(tasks) or tasks[index].tool != task.tool:
+            return {}
+        upstream = {}
+        for i in self.task_dependencies(tasks)[index]:
+            try:
+                with open(self.stamp_file(tasks[i], i), 'r') as fp:
+                    inputs = json.load(fp)["inputs"]
+            except (OSError, ValueError, KeyError):
+                inputs = None
+            upstream[f"{i}_{tasks[i].tool}"] = None if inputs is None else \
+                hash_data(inputs)
+        return upstream
+
+    def previous_reads(self, stamp_file: Path) -> List[str]:
+        """Returns the namespaces recorded as read in a stamp (see
+        task_stamp)
+        """
+        try:
+            with open(stamp_file, 'r') as fp:
+                return list(json.load(fp)["inputs"].get("reads", {}))
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def job_dir_state(self) -> Dict[str, tuple]:
+        """Maps files of the job directory (relative) to inode, ctime and size
+        ctime is used because copies may keep the mtime of their source.
+        Task logs, the event log and profiles are left out (they are no
+        outputs).
+        """
+        job_dir = self.get_db('internal.job_dir')
+        state = {}
+        for fname in dir_files(job_dir):
+            rel = os.path.relpath(fname, job_dir)
+            if rel in JOB_LOGS or re.fullmatch(r'logs/\d+_\w+\.log', rel):
+                continue
+            if rel.startswith(os.path.join(PROFILE_DIR, '')):
+                continue
+            st = os.stat(fname)
+            state[rel] = (st.st_ino, st.st_ctime_ns, st.st_size)
+        return state
+
+    def task_outputs(self, before: Dict[str, tuple]) -> List[str]:
+        """Returns files of the job directory created or changed since before
+        (see job_dir_state)
+        """
+        return [
+            rel for rel, sig in self.job_dir_state().items()
+            if before.get(rel) != sig
+        ]
+
+    def write_stamp(self, stamp_file: Path, stamp: dict,
+                    outputs: List[str]) -> None:
+        """Stamps task w/ its inputs and the outputs it left in the job dir"""
+        stamp_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(stamp_file, 'w') as fp:
+            json.dump(
+                {
+                    "inputs": stamp,
+                    "job_dir": self.get_db('internal.job_dir'),
+                    "outputs": outputs
+                },
+                fp,
+                indent=2)
+
+    def restore_task_outputs(self, stamp_file: Path, stamp: dict) -> bool:
+        """Copies outputs of the previous run of a task into the job dir
+        Outputs that already exist in the job dir are kept
+        :return False if the task must run (inputs changed or outputs gone)
+        """
+        if not stamp_file.is_file():
+            return False
+        with open(stamp_file, 'r') as fp:
+            previous = json.load(fp)
+        if previous.get("inputs") != stamp:
+            return False
+        src_dir = Path(previous["job_dir"])
+        job_dir = Path(self.get_db('internal.job_dir'))
+        if not all((src_dir / f).is_file() for f in previous["outputs"]):
+            return False
+        if src_dir != job_dir:
+            for f in previous["outputs"]:
+                if not (job_dir / f).exists():
+                    (job_dir / f).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copy2(src_dir / f, job_dir / f)
+            self.write_stamp(stamp_file, stamp, previous["outputs"])
+        return True
+
+    def step_cache(self) -> StepCache:
+        """Returns step cache configured through toolbox.cache"""
+        cfg = self.get_db("toolbox").get("cache", {})
+        return StepCache(cfg.get("dir", DEFAULT_CACHE_DIR),
+                         cfg.get("max_size", DEFAULT_CACHE_SIZE),
+                         cfg.get("hardlink", False))
+
+    def run_step(self, tool: Tool, step: Callable[[], None]) -> bool:
+        """Runs a single step of a tool
+        Outputs of cached steps are restored from the step cache on a hit
+        :return True if outputs were restored from the cache
+        """
+        spec = tool.get_cache_spec(step)
+        if spec is None:
+            step()
+            return False
+        cache = self.step_cache()
+        key = tool.cache_key(step, spec)
+        job_dir = self.get_db('internal.job_dir')
+        if cache.restore(key, job_dir):
+            self.log(f'Restored outputs of step "{step.__name__}" from cache')
+            return True
+        step()
+        cache.store(key, job_dir, list(spec.outputs))
+        return False
+
+    def check_task(self, task: Task) -> None:
+        """Check to make sure that tool actually exists"""
         if task.tool not in list(self.get_db('internal.tools').keys()):
             raise ToolBoxError(
                 f'Job "{self.get_db("internal.args.job")}" cannot find Tool "{task.tool}"'
             )
+
+    def run_task(self, task: Task, index: int = 0) -> None:
+        """Runs the task (i.e. subcomponent of a job)
+        Changes the task makes to the database do not affect later tasks.
+        Either the database is copied and restored ("copy" isolation) or the
+        task runs in a forked child ("fork" isolation).
+        """
+        self.check_task(task)
         # Issue starting log message
         self.log(
             f'Starting task "{task.tool}" of job "{self.get_db("internal.args.job")}".'
         )
+        if self.get_db("internal.args.isolation") == "fork":
+            self.join_task(task, *self.fork_task(task, index))
+            return
         # Save current state of database
-        original_db = copy.deepcopy(self._db)
-        # Load in additional configs and rerun db validation
-        if task.additional_configs:
-            for config in task.additional_configs:
-                self.load_config(config)
-                self.log(
-                    f'Additional configuration file "{config}" successfully loaded.'
-                )
-        self._db.resolve()
-        self.validate_db(
-            os.path.join(self.get_db('internal.home_dir'),
-                         'toolbox/schemas/toolbox.yml'))
-        # Instantiate tool class
-        tool_path = Path(self.get_db(f"internal.tools.{task.tool}.path"))
-        tool_module = importlib.import_module(tool_path.stem)
-        ToolClass = getattr(tool_module, task.tool)
-        tool = ToolClass(self, self.log)
-        if not isinstance(tool, Tool):
+        with self.events.span("snapshot", task=index, tool=task.tool):
+            original_db = copy.deepcopy(self._db)
+        try:
+            self.run_task_steps(task, index)
+        finally:
+            # Reload original contents of database
+            self._db = original_db
+
+    def fork_task(self, task: Task, index: int) -> Tuple[int, int]:
+        """Runs task in a forked child w/o waiting for it
+        On failure the child writes its formatted traceback and the pickled
+        exception (if it can be pickled) to a pipe
+        :return pid of child and read end of pipe (see join_task)
+        """
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self.events.flush()
+        rfd, wfd = os.pipe()
+        start = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            code = 0
+            try:
+                self.run_task_steps(task, index)
+            except BaseException as err:
+                code = 1
+                data = pickle.dumps(traceback.format_exc())
+                try:
+                    data += pickle.dumps(err)
+                except Exception:
+                    pass
+                with os.fdopen(wfd, 'wb') as fp:
+                    fp.write(data)
+            finally:
+                self.events.flush()
+                self._logger.flush()
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        os.close(wfd)
+        self.events.emit("snapshot",
+                         task=index,
+                         tool=task.tool,
+                         duration=time.perf_counter() - start)
+        return pid, rfd
+
+    def join_task(self, task: Task, pid: int, rfd: int) -> None:
+        """Waits for forked task and raises its exception again
+        The traceback of the child is attached as cause. Exceptions that
+        cannot be unpickled (e.g. w/ several required arguments) are raised
+        as ToolBoxError.
+        """
+        with os.fdopen(rfd, 'rb') as fp:
+            data = fp.read()
+        _, status = os.waitpid(pid, 0)
+        if data:
+            stream = io.BytesIO(data)
+            cause = ToolBoxError(
+                f'Task "{task.tool}" failed:\n{pickle.load(stream)}')
+            try:
+                err = pickle.load(stream)
+            except Exception:
+                raise cause from None
+            raise err from cause
+        code = os.waitstatus_to_exitcode(status)
+        if code:
+            raise ToolBoxError(f'Task "{task.tool}" exited with code {code}')
+
+    def run_task_steps(self, task: Task, index: int) -> None:
+        """Loads additional configs, instantiates the tool and runs its steps
+        Task is skipped if the stamp from its previous run is still valid
+        Start and end of the task and its steps are written to the event log
+        Messages of the task are written to its own log file (task_log_file)
+        Validation, import and steps of the task are traced as spans
+        Memory is snapshot before and after the task (see --memprofile)
+        The task, the import of its tool and its steps are profiled as phases
+        "task_<index>_<tool>", "import_..." and "step_<index>_<tool>_<step>"
+        """
+        start = time.perf_counter()
+        log_file = self.task_log_file(task, index)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        task_prefix = f"[{self.get_db('internal.args.job')}] [{task.tool}]"
+        name = f"{index}_{task.tool}"
+        with self.events.span("task", task=index, tool=task.tool) as span, \
+                self._logger.task(str(log_file), task_prefix), \
+                self.profiler.phase(f"task_{name}"), \
+                self.memprofiler.phase(f'task {index} "{task.tool}"'):
+            # Load in additional configs and rerun db validation
+            with self.events.span("validate"):
+                if task.additional_configs:
+                    for config in task.additional_configs:
+                        self.load_config(config)
+                        self.log(
+                            f'Additional configuration file "{config}" successfully loaded.'
+                        )
+                self._db.resolve()
+                self.validate_db(
+                    os.path.join(self.get_db('internal.home_dir'),
+                                 'toolbox/schemas/toolbox.yml'))
+            # Instantiate tool class
+            tool_path = Path(self.get_db(f"internal.tools.{task.tool}.path"))
+            with self.events.span("import"), \
+                    self.profiler.phase(f"import_{name}"):
+                tool_module = importlib.import_module(tool_path.stem)
+            ToolClass = getattr(tool_module, task.tool)
+            # Skip task if nothing changed since it last ran
+            stamp_file = self.stamp_file(task, index)
+            stamp = self.task_stamp(task, index, ToolClass,
+                                    self.previous_reads(stamp_file))
+            force = self.get_db("internal.args.force") or \
+                None in stamp["depends"].values()
+            if not force and self.restore_task_outputs(stamp_file, stamp):
+                self.log(f'Task "{task.tool}" is up to date. Skipping.')
+                span["status"] = "skipped"
+                return
+            unlink_missing_ok(stamp_file)
+            before = self.job_dir_state()
+            running = self.running_tasks.read()
+            # Hashed before the task may change them
+            candidates = self.hash_namespaces(self.read_candidates(ToolClass))
+            tool = ToolClass(self, self.log)
+            if not isinstance(tool, Tool):
+                raise ToolBoxError(
+                    f'Tool "{task.tool}" is not a sub-class of Tool.')
+            # Run steps within task [job] [tool] [step]
+            step_durations = {}
+            with self.events.span("steps"):
+                for step in tool.steps():
+                    tool.set_log_fn(
+                        functools.partial(self.log,
+                                          prefix=f"[{step.__name__}]"))
+                    self.log(f'Running step "{step.__name__}"')
+                    step_start = time.perf_counter()
+                    with self.events.span("step",
+                                          step=step.__name__) as step_span, \
+                            self.profiler.phase(f"step_{name}_{step.__name__}"):
+                        step_span["cached"] = self.run_step(tool, step)
+                    step_durations[step.__name__] = \
+                        time.perf_counter() - step_start
+            # Stamp task so that it can be skipped next time. Outputs are the
+            # changes to the job dir, which are only those of this task if
+            # no other task ran at the same time.
+            if self.running_tasks.overlapped(running):
+                self.log(f'Task "{task.tool}" ran concurrently w/ other '
+                         'tasks. Its outputs are unknown, so it is not stamped.')
+            else:
+                stamp["reads"] = {
+                    ns: h
+                    for ns, h in candidates.items()
+                    if ns in tool.read_namespaces
+                }
+                self.write_stamp(stamp_file, stamp,
+                                 self.task_outputs(before))
+            self.record_history(task, index,
+                                time.perf_counter() - start, step_durations)
+
+    def task_resources(self, task: Task) -> Resources:
+        """Returns resources of task. Task values override tool.yml values"""
+        tool = self.get_db(f"internal.tools.{task.tool}.resources") or {}
+        return Resources(
+            task.cpus if task.cpus is not None else tool.get("cpus", 1),
+            task.memory if task.memory is not None else tool.get("memory", 0))
+
+    def task_dependencies(self, tasks: List[Task]) -> Dict[int, List[int]]:
+        """Maps index of every task to the indices of the tasks it depends on
+        A task depends on every other task of the job that runs a tool listed
+        in its "depends"
+        """
+        depends = {}
+        for i, task in enumerate(tasks):
+            depends[i] = []
+            for tool in task.depends or []:
+                deps = [
+                    j for j, t in enumerate(tasks) if t.tool == tool and j != i
+                ]
+                if not deps:
+                    raise ToolBoxError(
+                        f'Task "{task.tool}" depends on "{tool}" which is not '
+                        f'a task of job "{self.get_db("internal.args.job")}"')
+                depends[i] += deps
+        return depends
+
+    def predicted_durations(self,
+                            tasks: List[Task]) -> Dict[int, Optional[float]]:
+        """Returns recorded durations of tasks (None if task never ran)"""
+        return {
+            i: self.task_history(t, i).get("duration")
+            for i, t in enumerate(tasks)
+        }
+
+    def report_durations(self, tasks: List[Task],
+                         predicted: Dict[int, Optional[float]],
+                         actual: Dict[int, float]) -> None:
+        """Logs predicted vs. actual duration of every task"""
+        lines = ["Task durations (predicted / actual):"]
+        for i, task in enumerate(tasks):
+            guess = "unknown" if predicted[i] is None else f"{predicted[i]:.2f}s"
+            lines.append(f'  "{task.tool}": {guess} / {actual[i]:.2f}s')
+        self.log("\n".join(lines))
+
+    def run_tasks_parallel(
+            self, tasks: List[Task], depends: Dict[int, List[int]],
+            predicted: Dict[int, Optional[float]]) -> Dict[int, float]:
+        """Runs tasks concurrently in forked children. Tasks are packed
+        within the cpus and memory of the machine (or of --cpus/--memory).
+        Ready tasks on the longest (predicted) critical path start first.
+        Tasks that never ran are assumed to take the mean of the others.
+        :return Actual duration of every task
+        """
+        for task in tasks:
+            self.check_task(task)
+        available = available_resources()
+        limits = Resources(
+            self.get_db("internal.args.cpus") or available.cpus,
+            self.get_db("internal.args.memory") or available.memory)
+        self.log(f"Running up to {self.get_db('internal.args.jobs')} tasks "
+                 f"w/ {limits.cpus} cpus and {limits.memory:.1f} GB memory")
+        sel = selectors.DefaultSelector()
+        started, actual = {}, {}
+
+        def start(i: int) -> None:
+            self.log(f'Starting task "{tasks[i].tool}" of job '
+                     f'"{self.get_db("internal.args.job")}".')
+            started[i] = time.perf_counter()
+            self.running_tasks.start()
+            pid, rfd = self.fork_task(tasks[i], i)
+            sel.register(rfd, selectors.EVENT_READ, (i, pid))
+
+        def wait() -> Tuple[int, Optional[Exception]]:
+            key = sel.select()[0][0]
+            sel.unregister(key.fd)
+            i, pid = key.data
+            try:
+                self.join_task(tasks[i], pid, key.fd)
+                actual[i] = time.perf_counter() - started[i]
+                return i, None
+            except Exception as err:
+                self.log(f'Task "{tasks[i].tool}" failed: {err}',
+                         LogLevel.ERROR)
+                return i, err
+            finally:
+                self.running_tasks.finish()
+
+        known = [d for d in predicted.values() if d is not None]
+        default = sum(known) / len(known) if known else 1.0
+        paths = critical_paths(
+            {i: default if d is None else d
+             for i, d in predicted.items()}, depends)
+        order = sorted(range(len(tasks)), key=lambda i: -paths[i])
+        scheduler = TaskScheduler(limits, self.get_db("internal.args.jobs"))
+        errors = scheduler.run(
+            [(i, self.task_resources(tasks[i])) for i in order],
+            start,
+            wait,
+            depends=depends)
+        if errors:
+            raise errors[min(errors)]
+        return actual
+
+    def distribute(self, tasks: List[Task]) -> None:
+        """Publishes tasks to workers and waits for their results"""
+        if any(task.depends for task in tasks):
             raise ToolBoxError(
-                f'Tool "{task.tool}" is not a sub-class of Tool.')
-        # Log step function for steps
-        def log_step(msg: str, step: str, level: LogLevel) -> None:
-            prefix = f"[{self.get_db('internal.args.job')}] [{task.tool}] [{step}] [%(levelname)s]"
-            self.log(msg, level, prefix)
-
-        # Run steps within task [job] [tool] [step]
-        for step in tool.steps():
-            log_fn = lambda msg, level: log_step(
-                msg=msg, step=step.__name__, level=level)
-            tool.set_log_fn(log_fn)
-            self.log(f'Running step "{step.__name__}"')
-            step()
-        # Reload original contents of database
-        self._db = original_db
+                "Task dependencies are not supported w/ --distribute")
+        address = self.get_db("internal.args.distribute")
+        self.log(f'Waiting for workers on "{address}"')
+        server = TaskServer(address, self._db, tasks, self.log)
+        errors = server.serve()
+        failed = [
+            f'"{tasks[i].tool}" ({err})' for i, err in sorted(errors.items())
+            if err
+        ]
+        if failed:
+            raise ToolBoxError(f'Tasks failed on workers: {", ".join(failed)}')
 
-    def execute(self):
-        """Runs the job!"""
+    def setup_environment(self) -> None:
+        """Adds tools to python path and exports environment variables"""
         # Load tools into python path
         for tool in list(self.get_db("internal.tools").keys()):
-            tool_path = Path(self.get_db(f"internal.tools.{tool}.path"))
-            sys.path.insert(1, str(tool_path.parent))
+            use_tool_path(self.get_db(f"internal.tools.{tool}.path"))
         # Export environment variables
         if "export" in self.get_db("toolbox"):
             for k, v in self.get_db("toolbox.export").items():
                 os.environ[k] = v
                 self.log(f"Exported: {k} = {v}")
-        # Run all tasks in job
+
+    def run_job(self) -> None:
+        """Runs all tasks in job
+        Paths resolved by an earlier run are forgotten (see resolve_path).
+        Afterwards the log messages of all tasks are merged into combined.log
+        and the spans of the event log are exported to trace.json (--trace)
+        """
+        job_dir = Path(self.get_db('internal.job_dir'))
+        clear_resolve_cache()
+        try:
+            with self.events.span("job"):
+                self.run_job_tasks()
+        finally:
+            self.events.flush()
+            self.events.write_log(job_dir / 'combined.log')
+            if self.get_db("internal.args.trace"):
+                self.events.write_trace(job_dir / 'trace.json')
+
+    def run_job_tasks(self) -> None:
+        """Runs tasks in order of their dependencies (see run_job)"""
         job = self.get_db(f'jobs.{self.get_db("internal.args.job")}')
-        for task in job["tasks"]:
-            self.run_task(Task(**task))
+        tasks = [Task(**task) for task in job["tasks"]]
+        if self.get_db("internal.args.distribute"):
+            self.distribute(tasks)
+            return
+        depends = self.task_dependencies(tasks)
+        predicted = self.predicted_durations(tasks)
+        if self.get_db("internal.args.jobs") > 1:
+            actual = self.run_tasks_parallel(tasks, depends, predicted)
+        else:
+            actual = {}
+            for i in topological_order(list(range(len(tasks))), depends):
+                start = time.perf_counter()
+                self.run_task(tasks[i], i)
+                actual[i] = time.perf_counter() - start
+        self.report_durations(tasks, predicted, actual)
+
+    def execute(self):
+        """Runs the job!"""
+        self.setup_environment()
+        self.run_job()
         self.cleanup()
+
+    def watched_files(self) -> List[str]:
+        """Returns all files the job depends on: loaded configs, autoload
+        config, tool sources/templates and files referenced by the database
+        """
+        files = set(self.loaded_configs)
+        files.add(os.path.join(self.get_db('internal.work_dir'), "toolbox.yml"))
+        for tool in self.get_db("internal.tools").values():
+            files.update(dir_files(tool["path"]))
+        db = {k: v for k, v in self._db.items() if k != "internal"}
+        files.update(str(Path(f).resolve()) for f in referenced_files(db))
+        return sorted(files)
+
+    def reload_database(self) -> None:
+        """Repopulates database (only changed configs are parsed again)"""
+        self._db = DotDict({"internal": self._db["internal"]})
+        self._load_dict({"internal.tools": {}})
+        self.loaded_configs = set()
+        self.populate_database()
+        self.setup_environment()
+
+    def watch(self) -> None:
+        """Runs job and reruns it whenever one of its inputs changes
+        Task stamps make sure only tasks whose inputs changed are rerun
+        """
+        watcher = make_watcher()
+        self.setup_environment()
+        while True:
+            try:
+                self.run_job()
+            except Exception as err:
+                self.log(f"Job failed: {err}", LogLevel.ERROR)
+            self.cleanup()
+            # Only first run is forced
+            self._load_dict({"internal.args.force": False})
+            while True:
+                self.log("Waiting for changes...")
+                try:
+                    changed = watcher.wait(self.watched_files())
+                except KeyboardInterrupt:
+                    return
+                for f in changed:
+                    self.log(f'Changed: "{f}"')
+                for tool in self.get_db("internal.tools").values():
+                    if any(f.startswith(os.path.join(tool["path"], ''))
+                           for f in changed):
+                        unload_modules(tool["path"])
+                try:
+                    self.reload_database()
+                    break
+                except Exception as err:
+                    self.log(f"Reloading configs failed: {err}",
+                             LogLevel.ERROR)
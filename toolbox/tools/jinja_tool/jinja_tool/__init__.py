@@ -8,106 +8,400 @@
 # Imports - standard library
 import os
 from abc import ABC, abstractmethod
-from typing import List, Callable, Any, Optional
+from typing import List, Callable, Any, Optional, Tuple, Dict
 from pathlib import Path
 import getpass
 from datetime import datetime
-import shutil
+import hashlib
+import json
+import tempfile
+import time
+import stat
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
 
 # Imports - 3rd party packages
 from jinja2 import StrictUndefined, FileSystemLoader, Environment
+from jinja2 import FileSystemBytecodeCache, BaseLoader, TemplateNotFound
+from jinja2.bccache import Bucket
 
 # Imports - local source
 from toolbox.database import Database
 from toolbox.logger import LogLevel, HasLogFunction
 from toolbox.tool import Tool, ToolError
-from toolbox.utils import Validator
+from toolbox.utils import Validator, hash_file, resolve_path, resolve_paths
+
+# Buffer size (bytes) of files rendered by render_to_file
+WRITE_BUFFER = 1 << 20
+# Umask if it cannot be read w/o changing it (see current_umask)
+DEFAULT_UMASK = 0o022
+
+
+def current_umask() -> int:
+    """Returns the umask of the process. Unlike os.umask, it does not
+    change it (not even briefly) under threads creating files.
+    """
+    try:
+        with open("/proc/self/status") as fp:
+            for line in fp:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    return DEFAULT_UMASK
+
+
+def rendered_mode(outfile: str) -> int:
+    """Returns the mode of a rendered file. Files created by tempfile are
+    private, so it keeps the mode of the existing outfile or gets the usual
+    mode of new files.
+    """
+    try:
+        return stat.S_IMODE(os.stat(outfile).st_mode)
+    except OSError:
+        return 0o666 & ~current_umask()
+
+
+@dataclass(frozen=True)
+class RenderJob:
+    """Template rendered to outfile w/ kwargs (see JinjaTool.render_many)"""
+    template: str
+    outfile: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class RenderResult:
+    """Outcome of a RenderJob
+    :param duration Seconds spent rendering and writing the file
+    :param error Exception raised while rendering (None on success)
+    :param written False if the file already had the rendered content
+    """
+    outfile: str
+    duration: float
+    error: Optional[BaseException] = None
+    written: bool = False
 
 
 def realpath_filter(text: str) -> str:
     """Realpath filter for jinja2
-    Resolves path and returns the absolute path
+    Resolves path and returns the absolute path (memoized per run)
     """
-    return str(Path(text).resolve())
+    return str(resolve_path(text))
 
 
 def realpath_join_filter(items: List[str], join_arg: str) -> str:
     """Realpath filter for jinja2
-    Resolves path and returns the absolute path
+    Resolves paths (memoized per run, large lists in parallel) and joins
+    the absolute paths w/ join_arg
+    """
+    return join_arg.join([str(p) for p in resolve_paths(items)])
+
+
+class SourceBytecodeCache(FileSystemBytecodeCache):
+    """Bytecode cache shared across runs and tasks
+    Buckets are keyed by template name, source and the options of the
+    environment that affect compilation (instead of the filename, which
+    changes with every job directory). Least recently used buckets are
+    evicted once the cache exceeds its size limit (see prune).
     """
-    return join_arg.join([str(Path(item).resolve()) for item in items])
+    def __init__(self, directory: str, max_size: int):
+        """
+        :param directory Location of the cache
+        :param max_size Size limit of the cache in MB
+        """
+        directory = Path(directory).expanduser().resolve()
+        directory.mkdir(parents=True, exist_ok=True)
+        super().__init__(str(directory))
+        self.max_size = max_size * 1024 * 1024
+
+    @staticmethod
+    def environment_key(env: Environment) -> str:
+        """Options of env that change the compiled code of a template"""
+        return repr((env.block_start_string, env.block_end_string,
+                     env.variable_start_string, env.variable_end_string,
+                     env.comment_start_string, env.comment_end_string,
+                     env.line_statement_prefix, env.line_comment_prefix,
+                     env.trim_blocks, env.lstrip_blocks,
+                     env.newline_sequence, env.keep_trailing_newline,
+                     env.optimized, sorted(env.extensions)))
+
+    def get_bucket(self, environment: Environment, name: str,
+                   filename: Optional[str], source: str) -> Bucket:
+        """Returns bucket keyed by name, source and environment"""
+        checksum = self.get_source_checksum(source)
+        key = hashlib.sha1(
+            f"{name}\0{checksum}\0{self.environment_key(environment)}".
+            encode()).hexdigest()
+        bucket = Bucket(environment, key, checksum)
+        self.load_bytecode(bucket)
+        return bucket
+
+    def load_bytecode(self, bucket: Bucket) -> None:
+        """Loads bucket and marks it as used (see prune)"""
+        super().load_bytecode(bucket)
+        if bucket.code is not None:
+            try:
+                os.utime(self._get_cache_filename(bucket))
+            except OSError:
+                pass
+
+    def prune(self) -> int:
+        """Evicts least recently used buckets until cache fits max_size
+        :return Number of evicted buckets
+        """
+        buckets = []
+        for f in Path(self.directory).glob(self.pattern % "*"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            buckets.append((st.st_mtime, st.st_size, f))
+        size = sum(b[1] for b in buckets)
+        evicted = 0
+        for _, fsize, f in sorted(buckets):
+            if size <= self.max_size:
+                break
+            try:
+                f.unlink()
+            except OSError:
+                pass
+            size -= fsize
+            evicted += 1
+        return evicted
+
+
+class TemplateLoader(BaseLoader):
+    """Loads templates in place w/o copying them
+    Additional template files (by file name) take precedence over the
+    templates directories, which are searched in the given order. The file
+    and hash of every loaded template are recorded (see used).
+    """
+    def __init__(self, dirs: List[str]):
+        """
+        :param dirs Templates directories in order of precedence
+        """
+        self.files: Dict[str, str] = {}
+        self.dirs = FileSystemLoader(dirs)
+        self.used: Dict[str, Dict[str, str]] = {}
+
+    def add_files(self, files: List[str]) -> None:
+        """Adds template files (later files take precedence)"""
+        for f in files:
+            f = Path(f).resolve()
+            if not f.is_file():
+                raise ToolError(f'Jinja tool cannot find file "{f}"')
+            self.files[f.name] = str(f)
+
+    def get_source(self, environment: Environment,
+                   template: str) -> Tuple[str, str, Callable[[], bool]]:
+        """Returns source, file and up-to-date check of template"""
+        if template in self.files:
+            fname = self.files[template]
+            try:
+                mtime = os.path.getmtime(fname)
+                with open(fname, 'r') as fp:
+                    source = fp.read()
+            except OSError:
+                raise TemplateNotFound(template)
+
+            def uptodate() -> bool:
+                try:
+                    return os.path.getmtime(fname) == mtime
+                except OSError:
+                    return False
+        else:
+            source, fname, uptodate = self.dirs.get_source(
+                environment, template)
+        self.used[template] = {
+            "file": fname,
+            "sha256": hashlib.sha256(source.encode()).hexdigest()
+        }
+        return source, fname, uptodate
+
+    def list_templates(self) -> List[str]:
+        """Returns names of all templates"""
+        return sorted(set(self.files) | set(self.dirs.list_templates()))
 
 
 class JinjaTool(Tool):
     """Base jinja Tool w/ render function. Still Abstract"""
     def __init__(self, db: Database, log: Callable[[str, LogLevel], None]):
         """Creates a jinja2 environment for this module
-        :param package The package that this module resides in
-        :param templates The path to the templates dir relative to the package
+        Templates are loaded from where they are: additional templates
+        first, then the templates dirs of the tools (subclasses first)
         """
         super(JinjaTool, self).__init__(db, log)
-        # Create templates dir in job dir
-        self.templates_dir = os.path.join(self.get_db("internal.job_dir"),
-                                          "jinja_templates")
-        Path(self.templates_dir).mkdir(parents=True, exist_ok=True)
-        # Add all tool templates
+        # Templates of all tools in order of the MRO
+        dirs = []
         for t in self.tools:
             d = os.path.join(self.get_db(f'internal.tools.{t}.path'),
                              "templates")
             if os.path.isdir(d):
-                self.add_jinja_templates([str(f) for f in Path(d).glob("*")])
+                dirs.append(d)
+        self.loader = TemplateLoader(dirs)
         # Add additional templates
         self.add_jinja_templates(
             self.get_db(
                 self.get_namespace("JinjaTool") + ".additional_templates"))
         # Create environment
-        fsl = FileSystemLoader([self.templates_dir])
-        self.env = Environment(loader=fsl,
+        self.env = Environment(loader=self.loader,
                                undefined=StrictUndefined,
                                trim_blocks=True,
-                               lstrip_blocks=True)
+                               lstrip_blocks=True,
+                               bytecode_cache=self.bytecode_cache())
         # Add some filters (names are same as ansible filters...)
         self.env.filters["realpath"] = realpath_filter
         self.env.filters["realpathjoin"] = realpath_join_filter
 
+    def bytecode_cache(self) -> Optional[SourceBytecodeCache]:
+        """Returns bytecode cache configured through the jinja namespace
+        (None if bytecode_cache_dir is empty)
+        """
+        ns = self.get_namespace("JinjaTool")
+        directory = self.get_db(f"{ns}.bytecode_cache_dir")
+        if not directory:
+            return None
+        cache = SourceBytecodeCache(directory,
+                                    self.get_db(f"{ns}.bytecode_cache_size"))
+        cache.prune()
+        return cache
+
     def add_jinja_templates(self, files: List[str]):
-        """Adds templates to jinja directories portion of database"""
-        # Check to make sure they are actually directories
-        for f in files:
-            f = Path(f).resolve()
-            if not f.is_file():
-                raise ToolError(f'Jinja tool cannot find file "{f}"')
-            shutil.copy(str(f), os.path.join(self.templates_dir, f.name))
+        """Adds template files that take precedence over templates dirs"""
+        self.loader.add_files(files)
+
+    @property
+    def manifest_file(self) -> str:
+        """Files and hashes of the templates used by this tool"""
+        return os.path.join(self.get_db("internal.job_dir"),
+                            "jinja_templates", f"{type(self).__name__}.json")
+
+    def write_manifest(self) -> None:
+        """Writes files and hashes of all templates used so far (replaces
+        the manifest instead of truncating it)
+        """
+        Path(self.manifest_file).parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w',
+                                         dir=os.path.dirname(
+                                             self.manifest_file),
+                                         delete=False) as fp:
+            json.dump(self.loader.used, fp, indent=2, sort_keys=True)
+        os.replace(fp.name, self.manifest_file)
 
     def render_to_file(self, template: str, outfile: str, **kwargs: Any):
-        """Gets template from environment and renders
+        """Renders template to outfile chunk by chunk (see render)
+        The whole output is never held in memory. It is written to a
+        temporary file that replaces outfile once rendering succeeded.
+        Unchanged files are left untouched (their mtime is kept).
         :param template template to be used
         :param outfile Name/path of output file
         :param kwargs Key word arguments to be passed to jinja2 template
         """
-        with open(outfile, 'w') as fp:
-            fp.write(self.render(template, **kwargs))
+        self.write_rendered(template, outfile,
+                            {**kwargs, **self.shared_context()})
+        self.write_manifest()
+
+    def render_many(self,
+                    jobs: List[RenderJob],
+                    max_workers: Optional[int] = None) -> List[RenderResult]:
+        """Renders many templates to files concurrently (see render_to_file)
+        The shared context (included namespaces, user name, date) is built
+        once for all jobs. A failed job does not stop the others.
+        :param jobs Templates, output files and their kwargs
+        :param max_workers Number of threads (default of ThreadPoolExecutor
+        if None)
+        :return Duration and error of every job (same order as jobs)
+        """
+        shared = self.shared_context()
+
+        def run(job: RenderJob) -> RenderResult:
+            start = time.perf_counter()
+            try:
+                written = self.write_rendered(job.template, job.outfile, {
+                    **job.kwargs,
+                    **shared
+                })
+            except Exception as err:
+                return RenderResult(job.outfile,
+                                    time.perf_counter() - start, err)
+            return RenderResult(job.outfile,
+                                time.perf_counter() - start,
+                                written=written)
+
+        with ThreadPoolExecutor(max_workers) as pool:
+            results = list(pool.map(run, jobs))
+        self.write_manifest()
+        for r in results:
+            if r.error is not None:
+                self.log(f'Failed to render file "{r.outfile}": {r.error}',
+                         LogLevel.ERROR)
+        return results
+
+    def write_rendered(self, template: str, outfile: str,
+                       context: dict) -> bool:
+        """Streams template rendered w/ context into outfile (atomically)
+        :return False if outfile already had the rendered content
+        """
+        template = self.env.get_template(Path(template).name)
+        outfile = os.path.abspath(outfile)
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(outfile),
+                                        prefix=f".{os.path.basename(outfile)}.",
+                                        suffix=".tmp")
+        try:
+            with open(fd, 'w', buffering=WRITE_BUFFER) as fp:
+                for chunk in template.generate(**context):
+                    fp.write(chunk)
+            written = not self.same_contents(tmp_file, outfile)
+            if written:
+                os.chmod(tmp_file, rendered_mode(outfile))
+                os.replace(tmp_file, outfile)
+            else:
+                os.unlink(tmp_file)
+        except BaseException:
+            if os.path.exists(tmp_file):
+                os.unlink(tmp_file)
+            raise
         rel_outfile = os.path.relpath(outfile,
                                       self.get_db("internal.work_dir"))
-        self.log(f'Successfully rendered file "{rel_outfile}"')
+        self.log(f'Rendered file "{rel_outfile}" '
+                 f'({"written" if written else "unchanged"})')
+        return written
 
-    def render(self, template: str, **kwargs: Any):
+    @staticmethod
+    def same_contents(new_file: str, old_file: str) -> bool:
+        """True if old_file exists and has the contents of new_file"""
+        try:
+            if os.path.getsize(new_file) != os.path.getsize(old_file):
+                return False
+        except OSError:
+            return False
+        return hash_file(new_file) == hash_file(old_file)
+
+    def render(self, template: str, **kwargs: Any) -> str:
         """Gets template from environment and renders
+        Files and hashes of the used templates are written to manifest_file
         :param template template to be used
-        :param outfile Name/path of output file
+        :param kwargs Key word arguments to be passed to jinja2 template
         """
-        # Defaults
-        kwargs.update({"_tab": 4 * ' '})
-        # Always pass username and date
-        uname = getpass.getuser()
-        date = datetime.now().strftime("%m/%d/%Y-%H:%M:%S")
         template = self.env.get_template(Path(template).name)
-        included_ns = self.get_db(
-            self.get_namespace("JinjaTool") + ".included_namespaces")
-        included_ns_dict = {}
-        for ns in included_ns:
-            included_ns_dict[ns] = self.get_db(ns)
-        return template.render(**kwargs,
-                               **included_ns_dict,
-                               _uname=uname,
-                               _date=date)
+        text = template.render({**kwargs, **self.shared_context()})
+        # Record templates (incl. extended/included ones) for reproducibility
+        self.write_manifest()
+        return text
+
+    def shared_context(self) -> dict:
+        """Variables passed to every template: included namespaces, tab,
+        user name and date (override kwargs of the same name)
+        The date is the current time unless jinja.date sets a fixed value
+        (so that outputs only change if their inputs do)
+        """
+        ns = self.get_namespace("JinjaTool")
+        included_ns = self.get_db(f"{ns}.included_namespaces")
+        context = {n: self.get_db(n) for n in included_ns}
+        date = self.get_db(f"{ns}.date")
+        if date == "now":
+            date = datetime.now().strftime("%m/%d/%Y-%H:%M:%S")
+        # Always pass username and date
+        context.update(_tab=4 * ' ', _uname=getpass.getuser(), _date=date)
+        return context
@@ -6,7 +6,8 @@
 """Docstring for module path_helper"""
 
 # Imports - standard library
-from typing import Tuple, Callable, Optional, List, Any, Union
+from typing import Tuple, Callable, Optional, List, Any, Union, Dict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import os
 import sys
@@ -15,6 +16,17 @@ import getpass
 from datetime import datetime
 import glob
 import shutil
+import copy
+import hashlib
+import json
+import asyncio
+import time
+import itertools
+import collections
+import contextlib
+import stat
+import fcntl
+import tempfile
 
 # Imports - 3rd party packages
 import yaml
@@ -24,6 +36,7 @@ from yamale.schema import Schema
 from jinja2 import Environment, StrictUndefined, PackageLoader
 
 # Imports - local source
+from .events import active_log
 
 
 def print_divider(msg, length=40):
@@ -34,9 +47,60 @@ def print_divider(msg, length=40):
     print(f"{add_length//2*'='} {msg} {post_length*'='}")
 
 
+RESOLVE_BATCH = 256  # Lists w/ more paths are resolved by a thread pool
+RESOLVE_THREADS = 16  # Threads resolving paths concurrently
+# Resolved path and file mode by absolute (unresolved) path. Only existing
+# paths are kept. Cleared at the start of every run (clear_resolve_cache).
+_RESOLVED: Dict[str, Tuple[Path, int]] = {}
+
+
+def clear_resolve_cache() -> None:
+    """Forgets all resolved paths (see resolve_path)"""
+    _RESOLVED.clear()
+
+
+def stat_resolved(path: Union[str, Path]) -> Tuple[Path, Optional[int]]:
+    """Resolves path and returns it w/ its file mode (None if missing)
+    Results of existing paths are memoized until clear_resolve_cache
+    """
+    key = os.path.join(os.getcwd(), path)
+    hit = _RESOLVED.get(key)
+    if hit is not None:
+        return hit
+    rp = Path(key).resolve()
+    try:
+        mode = rp.stat().st_mode
+    except OSError:
+        return rp, None
+    _RESOLVED[key] = (rp, mode)
+    return rp, mode
+
+
+def resolve_path(path: Union[str, Path]) -> Path:
+    """Memoized Path(path).resolve() (see stat_resolved)"""
+    return stat_resolved(path)[0]
+
+
+def resolve_paths(paths: List[Union[str, Path]]) -> List[Path]:
+    """Resolves many paths (see resolve_path)
+    Lists longer than RESOLVE_BATCH are resolved in batches by a thread
+    pool, which overlaps the syscalls (e.g. on NFS)
+    """
+    if len(paths) > RESOLVE_BATCH:
+        batches = [
+            paths[i:i + RESOLVE_BATCH]
+            for i in range(0, len(paths), RESOLVE_BATCH)
+        ]
+        with ThreadPoolExecutor(RESOLVE_THREADS) as pool:
+            for _ in pool.map(lambda b: [stat_resolved(p) for p in b],
+                              batches):
+                pass
+    return [resolve_path(p) for p in paths]
+
+
 def get_rel_path(path: str, path_rel_to: str):
-    return os.path.relpath(str(Path(path).resolve()),
-                           str(Path(path_rel_to).resolve()))
+    return os.path.relpath(str(resolve_path(path)),
+                           str(resolve_path(path_rel_to)))
 
 
 def remove_file_or_dir(path: str):
@@ -62,11 +126,270 @@ def unlink_missing_ok(dirname: Path) -> None:
         pass
 
 
+# ioctl of Linux that makes dst share the extents of src (copy on write)
+FICLONE = 0x40049409
+CLONE_THREADS = 16  # Threads walking and cloning trees concurrently
+
+
+def reflink_file(src: str, dst: str) -> None:
+    """Creates dst as copy on write clone of src (raises OSError if the
+    filesystem does not support it, e.g. ext4 or across devices)
+    """
+    with open(src, 'rb') as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                     stat.S_IMODE(os.fstat(fsrc.fileno()).st_mode))
+        try:
+            fcntl.ioctl(fd, FICLONE, fsrc.fileno())
+        except OSError:
+            os.close(fd)
+            os.remove(dst)
+            raise
+        os.close(fd)
+    shutil.copystat(src, dst)
+
+
+def unshare_file(path: str) -> None:
+    """Replaces a hardlinked file by a private copy so that it can be
+    modified in place (e.g. appended to) w/o changing its other links
+    """
+    try:
+        if os.stat(path).st_nlink < 2:
+            return
+    except FileNotFoundError:
+        return
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or None)
+    os.close(fd)
+    try:
+        shutil.copy2(path, tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def clone_tree(src: str,
+               dst: str,
+               hardlink: bool = True,
+               exclude: Optional[Callable[[str], bool]] = None) -> Dict[str, int]:
+    """Recreates the tree of src in dst w/o copying file contents where
+    possible: files are reflinked, hardlinked (if hardlink, once reflinks
+    failed) or copied. Hardlinked files are shared w/ src, so writing them
+    in place changes src as well. Symlinks are recreated as they are.
+    Directories are scanned (os.scandir) and files cloned by a thread pool.
+    Existing files of dst are kept.
+    :param exclude Paths (relative to src) that are not cloned
+    :return Number of files by method ("reflink", "hardlink", "copy")
+    """
+    counts = collections.Counter()
+    reflink = [True]
+
+    def clone(rel: str) -> str:
+        s, d = os.path.join(src, rel), os.path.join(dst, rel)
+        if reflink[0]:
+            try:
+                reflink_file(s, d)
+                return "reflink"
+            except FileExistsError:
+                return "exists"
+            except OSError:
+                reflink[0] = False
+        try:
+            if hardlink:
+                os.link(s, d)
+                return "hardlink"
+            if not os.path.exists(d):
+                shutil.copy2(s, d)
+                return "copy"
+        except FileExistsError:
+            pass
+        except OSError:
+            if not os.path.exists(d):
+                shutil.copy2(s, d)
+                return "copy"
+        return "exists"
+
+    def scan(rel: str) -> Tuple[List[str], List[str]]:
+        subdirs, files = [], []
+        with os.scandir(os.path.join(src, rel)) as it:
+            for entry in it:
+                path = os.path.join(rel, entry.name)
+                if exclude is not None and exclude(path):
+                    continue
+                if entry.is_symlink():
+                    try:
+                        os.symlink(os.readlink(entry.path),
+                                   os.path.join(dst, path))
+                    except FileExistsError:
+                        pass
+                elif entry.is_dir():
+                    os.makedirs(os.path.join(dst, path), exist_ok=True)
+                    subdirs.append(path)
+                else:
+                    files.append(path)
+        return subdirs, files
+
+    os.makedirs(dst, exist_ok=True)
+    with ThreadPoolExecutor(CLONE_THREADS) as pool:
+        level = [""]
+        while level:
+            scanned = list(pool.map(scan, level))
+            level = [d for subdirs, _ in scanned for d in subdirs]
+            files = [f for _, fs in scanned for f in fs]
+            counts.update(pool.map(clone, files))
+    counts.pop("exists", None)
+    return dict(counts)
+
+
+class FileCache:
+    """Memoizes a function of a file until the file changes on disk
+    Cached values are shared so callers must not modify them
+    """
+    def __init__(self, fn: Callable[[str], Any]):
+        self.fn = fn
+        self._cache = {}
+
+    def __call__(self, fname: str) -> Any:
+        fname = os.path.realpath(fname)
+        st = os.stat(fname)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._cache.get(fname)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        value = self.fn(fname)
+        self._cache[fname] = (stamp, value)
+        return value
+
+    def clear(self) -> None:
+        """Drops all cached values"""
+        self._cache.clear()
+
+
+def _load_yaml(fname: str) -> Any:
+    """Loads a yaml file"""
+    with open(fname, 'r') as fp:
+        return yaml.load(fp, Loader=yaml.SafeLoader)
+
+
+load_yaml = FileCache(_load_yaml)
+
+
+def hash_file(path: str) -> str:
+    """Returns the sha256 hex digest of the contents of a file"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_dir(path: str) -> str:
+    """Returns a sha256 hex digest of all file names and contents in a dir
+    Compiled python caches are ignored
+    """
+    h = hashlib.sha256()
+    for fname in dir_files(path):
+        h.update(os.path.relpath(fname, path).encode())
+        h.update(hash_file(fname).encode())
+    return h.hexdigest()
+
+
+def hash_data(data: Any) -> str:
+    """Returns a sha256 hex digest of any json serializable object
+    Objects that are not serializable are hashed using their string
+    """
+    dump = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(dump.encode()).hexdigest()
+
+
+def referenced_files(data: Any) -> List[str]:
+    """Returns every string in data that is a file
+    :param data Arbitrarily nested dicts/lists (i.e. a namespace)
+    """
+    if isinstance(data, str):
+        return [data] if os.path.isfile(data) else []
+    elif isinstance(data, list):
+        return [f for item in data for f in referenced_files(item)]
+    elif isinstance(data, dict):
+        return [f for value in data.values() for f in referenced_files(value)]
+    return []
+
+
+def referenced_dirs(data: Any) -> List[str]:
+    """Returns every string in data that is a directory
+    :param data Arbitrarily nested dicts/lists (i.e. a namespace)
+    """
+    if isinstance(data, str):
+        return [data] if os.path.isdir(data) else []
+    elif isinstance(data, list):
+        return [d for item in data for d in referenced_dirs(item)]
+    elif isinstance(data, dict):
+        return [d for value in data.values() for d in referenced_dirs(value)]
+    return []
+
+
+def hash_referenced_files(data: Any) -> dict:
+    """Hashes the contents of every string in data that is a file or dir
+    :param data Arbitrarily nested dicts/lists (i.e. a namespace)
+    :return Dictionary mapping file/dir name to sha256 hex digest
+    """
+    hashes = {f: hash_file(f) for f in referenced_files(data)}
+    hashes.update({d: hash_dir(d) for d in referenced_dirs(data)})
+    return hashes
+
+
+def dir_files(path: str) -> List[str]:
+    """Returns all files in a directory (compiled python caches ignored)"""
+    fnames = []
+    for root, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if d != "__pycache__")
+        fnames += [os.path.join(root, f) for f in sorted(files)]
+    return fnames
+
+
+def dir_signature(path: str) -> tuple:
+    """Returns mtime and size of all files in a directory"""
+    signature = []
+    for fname in dir_files(path):
+        st = os.stat(fname)
+        signature.append((fname, st.st_mtime_ns, st.st_size))
+    return tuple(signature)
+
+
+def unload_modules(path: str) -> None:
+    """Removes all modules loaded from files in path from sys.modules"""
+    prefix = os.path.join(path, '')
+    for name, module in list(sys.modules.items()):
+        fname = getattr(module, "__file__", None) or ""
+        if fname.startswith(prefix):
+            del sys.modules[name]
+
+
+def use_tool_path(path: str) -> None:
+    """Makes "import <name of path>" import the tool in path
+    The parent of path is moved to the front of the search path and a
+    module of the same name imported from elsewhere (e.g. the same tool of
+    another checkout, imported by a daemon) is unloaded w/ its submodules.
+    """
+    parent, name = os.path.split(os.path.abspath(path))
+    if parent in sys.path:
+        sys.path.remove(parent)
+    sys.path.insert(1, parent)
+    module = sys.modules.get(name)
+    if module is None:
+        return
+    fname = getattr(module, "__file__", None) or ""
+    if not fname.startswith(os.path.join(os.path.abspath(path), '')):
+        for loaded in list(sys.modules):
+            if loaded == name or loaded.startswith(f"{name}."):
+                del sys.modules[loaded]
+
+
 def check_files(
         fnames: List[str],
         action: Optional[Callable[[str], Any]] = None) -> Optional[List[Path]]:
     """Checks to see if files exist"""
     if fnames:
+        resolve_paths([f for f in fnames if f and isinstance(f, str)])
         checked_fnames = [check_file(fname, action) for fname in fnames]
         return_files = [fname for fname in checked_fnames if fname]
         if return_files:
@@ -79,6 +402,7 @@ def check_dirs(
         action: Optional[Callable[[str], Any]] = None) -> Optional[List[Path]]:
     """Checks to see if dir exists"""
     if dirs:
+        resolve_paths([d for d in dirs if d and isinstance(d, str)])
         checked_dirs = [check_dir(directory, action) for directory in dirs]
         return_dirs = [directory for directory in checked_dirs if directory]
         if return_dirs:
@@ -114,16 +438,49 @@ def check_and_resolve(rel_path: str, files: bool,
     :return Either a Path object or None
     '''
     if rel_path and isinstance(rel_path, str):
-        rp = Path(rel_path).resolve()
-        if files and rp.is_file():
+        rp, mode = stat_resolved(rel_path)
+        if mode is None:
+            return None
+        if files and stat.S_ISREG(mode):
             return rp
-        elif dirs and rp.is_dir():
+        elif dirs and stat.S_ISDIR(mode):
             return rp
     return None
 
 
+STREAM_LIMIT = 1 << 20  # Longest line (bytes) streamed from a binary
+TAIL_LINES = 50  # Lines of output shown when a binary fails
+TAIL_BYTES = 1 << 16  # Max bytes read from the end of a log for the tail
+
+
+def tail_file(fname: str, lines: int = TAIL_LINES) -> str:
+    """Returns the last lines of a file w/o reading the whole file"""
+    with open(fname, 'rb') as fp:
+        fp.seek(0, os.SEEK_END)
+        fp.seek(max(0, fp.tell() - TAIL_BYTES))
+        tail = collections.deque(fp, maxlen=lines)
+    return b''.join(tail).decode(errors='replace')
+
+
+class BinaryError(subprocess.CalledProcessError):
+    """Nonzero exit of a binary. Message includes the tail of its log"""
+    def __init__(self, returncode: int, cmd: List[str],
+                 log_file: Optional[str]):
+        output = tail_file(log_file) if log_file else None
+        super().__init__(returncode, cmd, output)
+        self.log_file = log_file
+
+    def __str__(self) -> str:
+        msg = super().__str__()
+        if self.log_file:
+            msg += f'\nLog file "{self.log_file}" ends with:\n{self.output}'
+        return msg
+
+
 class BinaryDriver:
     """Good mixin with tools to keep track of options and run binary files"""
+    _invocations = itertools.count()
+
     def __init__(self, binary: str):
         """Initialize with name of path to binary"""
         self.__binary = binary
@@ -152,10 +509,195 @@ class BinaryDriver:
         options = ' '.join(self.__options)
         return f"{self.__binary} {options}"
 
-    def execute(self, directory: str = None):
-        """Actually executes"""
-        subprocess.run([self.__binary] + self.__options,
-                       cwd=directory).check_returncode()
+    def execute(self,
+                directory: str = None,
+                log_dir: Optional[str] = None,
+                metrics_file: Optional[str] = None):
+        """Actually executes
+        :param directory Working directory of the binary
+        :param log_dir Output is written to a new log file in log_dir
+        instead of the console. Only the tail is read back on failure.
+        :param metrics_file Wall time, cpu time and peak rss of the child
+        are appended to this file (json lines)
+        Both default to those of the tool (see Tool.binary_log_dir and
+        Tool.metrics_file) if mixed into a Tool. Pass "" to disable them.
+        """
+        cmd = [self.__binary] + self.__options
+        log_file, metrics_file = self._outputs(log_dir, metrics_file)
+        start = time.monotonic()
+        with (open(log_file, 'wb')
+              if log_file else contextlib.nullcontext()) as out:
+            proc = subprocess.Popen(
+                cmd,
+                cwd=directory,
+                stdout=out,
+                stderr=subprocess.STDOUT if out else None)
+            try:
+                _, status, usage = os.wait4(proc.pid, 0)
+            except BaseException:
+                proc.kill()
+                proc.wait()
+                raise
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        self._trace(proc.pid, start, proc.returncode)
+        self._record(metrics_file, cmd, directory, log_file, proc.returncode,
+                     start, usage)
+        if proc.returncode:
+            raise BinaryError(proc.returncode, cmd, log_file)
+
+    async def execute_async(self,
+                            directory: str = None,
+                            log: Optional[Callable[[str, Any], None]] = None,
+                            timeout: Optional[float] = None,
+                            log_dir: Optional[str] = None,
+                            metrics_file: Optional[str] = None) -> int:
+        """Executes w/o blocking the event loop
+        :param directory Working directory of the binary
+        :param log Log function (msg, LogLevel) that receives stdout (INFO)
+        and stderr (WARNING) line by line. Console is inherited if None
+        and there is no log file.
+        :param timeout Seconds after which the binary is killed
+        :param log_dir Output is also written to a new log file in log_dir
+        :param metrics_file Same as execute
+        :return Return code (BinaryError raised if nonzero)
+        """
+        from .logger import LogLevel
+        cmd = [self.__binary] + self.__options
+        log_file, metrics_file = self._outputs(log_dir, metrics_file)
+        pipe = None if log is None and log_file is None else subprocess.PIPE
+        loop = asyncio.get_running_loop()
+        name = Path(self.__binary).name
+        start = time.monotonic()
+        with (open(log_file, 'wb')
+              if log_file else contextlib.nullcontext()) as out:
+            proc = subprocess.Popen(cmd,
+                                    cwd=directory,
+                                    stdout=pipe,
+                                    stderr=pipe)
+            # Reaped in a thread (not by asyncio) to get its resource usage
+            waiter = loop.run_in_executor(None, os.wait4, proc.pid, 0)
+            coros = [asyncio.shield(waiter)]
+            if pipe is not None:
+                coros += [
+                    self._stream(proc.stdout, name, log, LogLevel.INFO, out),
+                    self._stream(proc.stderr, name, log, LogLevel.WARNING,
+                                 out)
+                ]
+            try:
+                await asyncio.wait_for(asyncio.gather(*coros), timeout)
+            except BaseException:
+                if not waiter.done():
+                    proc.kill()
+                await waiter
+                raise
+            finally:
+                if waiter.done() and not waiter.exception():
+                    _, status, usage = waiter.result()
+                    proc.returncode = os.waitstatus_to_exitcode(status)
+                self._trace(proc.pid, start, proc.returncode)
+        self._record(metrics_file, cmd, directory, log_file, proc.returncode,
+                     start, usage)
+        if proc.returncode:
+            raise BinaryError(proc.returncode, cmd, log_file)
+        return proc.returncode
+
+    def _outputs(self, log_dir: Optional[str],
+                 metrics_file: Optional[str]) -> Tuple[Optional[str], ...]:
+        """Returns the log file and metrics file of an execution"""
+        from .tool import Tool
+        if isinstance(self, Tool):
+            log_dir = self.binary_log_dir if log_dir is None else log_dir
+            metrics_file = (self.metrics_file
+                            if metrics_file is None else metrics_file)
+        if not log_dir:
+            return None, metrics_file or None
+        Path(log_dir).mkdir(parents=True, exist_ok=True)
+        count = next(BinaryDriver._invocations)
+        log_file = os.path.join(
+            log_dir, f"{Path(self.__binary).name}.{os.getpid()}.{count}.log")
+        return log_file, metrics_file or None
+
+    @staticmethod
+    def _record(metrics_file: Optional[str], cmd: List[str],
+                directory: Optional[str], log_file: Optional[str],
+                returncode: int, start: float, usage: Any) -> None:
+        """Appends the resource usage of a child to the metrics file"""
+        if not metrics_file:
+            return
+        metrics = {
+            "command": cmd,
+            "directory": directory,
+            "log_file": log_file,
+            "returncode": returncode,
+            "wall_time": time.monotonic() - start,
+            "user_time": usage.ru_utime,
+            "system_time": usage.ru_stime,
+            "max_rss_kb": usage.ru_maxrss
+        }
+        unshare_file(metrics_file)
+        with open(metrics_file, 'a') as fp:
+            fp.write(json.dumps(metrics) + '\n')
+
+    def _trace(self, pid: int, start: float,
+               returncode: Optional[int]) -> None:
+        """Adds child to the event log of the running toolbox (if any)"""
+        events = active_log()
+        if events is not None:
+            events.emit("binary",
+                        duration=time.monotonic() - start,
+                        binary=Path(self.__binary).name,
+                        child=pid,
+                        returncode=returncode)
+
+    @staticmethod
+    async def _stream(pipe: Any, name: str,
+                      log: Optional[Callable[[str, Any], None]], level: Any,
+                      out: Optional[Any]) -> None:
+        """Sends every line of pipe to the log function and log file"""
+        loop = asyncio.get_running_loop()
+        stream = asyncio.StreamReader(limit=STREAM_LIMIT)
+        transport, _ = await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stream), pipe)
+        try:
+            while True:
+                line = await stream.readline()
+                if not line:
+                    break
+                if out is not None:
+                    out.write(line)
+                if log is not None:
+                    log(f"[{name}] {line.decode(errors='replace').rstrip()}",
+                        level)
+        finally:
+            transport.close()
+
+def execute_concurrently(drivers: List[BinaryDriver],
+                         max_jobs: Optional[int] = None,
+                         directory: str = None,
+                         log: Optional[Callable[[str, Any], None]] = None,
+                         timeout: Optional[float] = None,
+                         fail_fast: bool = True) -> List[Any]:
+    """Executes many binaries concurrently w/ at most max_jobs at a time
+    :param drivers Binaries to be executed
+    :param max_jobs Concurrency limit (defaults to number of cpus)
+    :param directory Working directory of the binaries
+    :param log Log function that receives the output of all binaries
+    :param timeout Timeout (seconds) of each binary
+    :param fail_fast Kills all binaries once one fails. Otherwise all
+    binaries run and the exceptions are returned in place of return codes.
+    :return Return code (or exception) of every driver
+    """
+    async def run_all():
+        semaphore = asyncio.Semaphore(max_jobs or os.cpu_count() or 1)
+
+        async def run(driver: BinaryDriver):
+            async with semaphore:
+                return await driver.execute_async(directory, log, timeout)
+
+        return await asyncio.gather(*(run(d) for d in drivers),
+                                    return_exceptions=not fail_fast)
+
+    return asyncio.run(run_all())
 
 
 class Anything(Validator):
@@ -200,6 +742,19 @@ class YamaleValidator:
     validators[Anything.tag] = Anything
     validators[File.tag] = File
     validators[Directory.tag] = Directory
+    schemas = FileCache(
+        lambda fname: yamale.make_schema(fname,
+                                         validators=YamaleValidator.validators))
+    datas = FileCache(yamale.make_data)
+
+    @classmethod
+    def make_schema(cls, schema_fname: str, includes: dict = None) -> Schema:
+        """Returns schema of file (cached unless includes are added)"""
+        if includes is None:
+            return cls.schemas(schema_fname)
+        schema = yamale.make_schema(schema_fname, validators=cls.validators)
+        schema.add_include(includes)
+        return schema
 
     @classmethod
     def validate_files(cls,
@@ -207,13 +762,11 @@ class YamaleValidator:
                        schema_fname: str,
                        includes: dict = None) -> Union[str, dict]:
         """Uses yamale to calidate yaml file"""
-        schema = yamale.make_schema(schema_fname, validators=cls.validators)
-        if includes is not None:
-            schema.add_include(includes)
-        data = yamale.make_data(yaml_fname)
+        schema = cls.make_schema(schema_fname, includes)
+        data = cls.datas(yaml_fname)
         try:
             yamale.validate(schema, data)
-            return data[0][0]
+            return copy.deepcopy(data[0][0])
         except ValueError as err:
             return str(err)
 
@@ -239,9 +792,7 @@ class YamaleValidator:
                                 schema_fname: str,
                                 includes: dict = None) -> Union[str, dict]:
         """Uses yamale to validate dictionary"""
-        schema = yamale.make_schema(schema_fname, validators=cls.validators)
-        if includes is not None:
-            schema.add_include(includes)
+        schema = cls.make_schema(schema_fname, includes)
         data = [(data, '')]
         try:
             yamale.validate(schema, data)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Author: Erik Anderson
+# Email: erik.francis.anderson@gmail.com
+# Date: 10/19/2026
+"""Waits for changes of files (inotify w/ polling fallback)"""
+
+# Imports - standard library
+from typing import List, Set, Optional
+import os
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+
+# Imports - 3rd party packages
+
+# Imports - local source
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+           | IN_CREATE | IN_DELETE)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class PollingWatcher:
+    """Detects changes by comparing mtime and size of files"""
+    def __init__(self, interval: float = 1.0, settle: float = 0.2):
+        """
+        :param interval Seconds between polls
+        :param settle Seconds that changes are collected for after the first
+        """
+        self.interval = interval
+        self.settle = settle
+
+    @staticmethod
+    def signature(fname: str) -> Optional[tuple]:
+        """Returns mtime and size of file (None if missing)"""
+        try:
+            st = os.stat(fname)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def wait(self, files: List[str]) -> Set[str]:
+        """Blocks until at least one of files changes
+        :return All changed files
+        """
+        signatures = {f: self.signature(f) for f in files}
+        while True:
+            time.sleep(self.interval)
+            changed = {f for f in files if self.signature(f) != signatures[f]}
+            if changed:
+                time.sleep(self.settle)
+                return changed
+
+
+class InotifyWatcher(PollingWatcher):
+    """Detects changes w/ inotify on the parent directories of the files
+    Directories are watched so that editors that replace files are handled
+    """
+    def __init__(self, settle: float = 0.2):
+        super().__init__(settle=settle)
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.libc.inotify_init1.argtypes = [ctypes.c_int]
+        self.libc.inotify_add_watch.argtypes = [
+            ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32
+        ]
+
+    @staticmethod
+    def available() -> bool:
+        """True if inotify can be used"""
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c'))
+            return hasattr(libc, "inotify_init1")
+        except OSError:
+            return False
+
+    def wait(self, files: List[str]) -> Set[str]:
+        """Blocks until at least one of files changes
+        :return All changed files
+        """
+        files = {os.path.abspath(f) for f in files}
+        fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            dirs = {}
+            for d in {os.path.dirname(f) for f in files}:
+                wd = self.libc.inotify_add_watch(fd, d.encode(), IN_MASK)
+                if wd >= 0:
+                    dirs[wd] = d
+            changed = set()
+            timeout = None
+            while True:
+                if not select.select([fd], [], [], timeout)[0]:
+                    if changed:
+                        return changed
+                    continue
+                changed |= self._read_events(fd, dirs) & files
+                if changed:
+                    timeout = self.settle
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read_events(fd: int, dirs: dict) -> Set[str]:
+        """Returns paths of all pending inotify events"""
+        data = os.read(fd, 1 << 16)
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0').decode()
+            offset += length
+            if wd in dirs:
+                paths.add(os.path.join(dirs[wd], name))
+        return paths
+
+
+def make_watcher() -> PollingWatcher:
+    """Returns inotify watcher if available else polling watcher"""
+    if InotifyWatcher.available():
+        return InotifyWatcher()
+    return PollingWatcher()